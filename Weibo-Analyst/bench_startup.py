@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+各步骤模块的启动耗时测试
+
+每次在全新的 Python 进程中导入模块（与脚本运行、spawn 工作进程的情况相同），
+取多次运行的中位数；可选列出 -X importtime 统计中最耗时的导入。
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (步骤目录, 模块名)
+MODULES = [
+    ("step2_cut_words", "cut_words"),
+    ("step2_cut_words", "dat_segmenter"),
+    ("step3_word_cloud", "keyword_rank"),
+    ("step3_word_cloud", "word_cloud"),
+    ("step4_sentiments", "bayes_scorer"),
+    ("step4_sentiments", "data_evaluation"),
+    ("step4_sentiments", "sentiment_charts"),
+    ("step5_LDA", "lda_topic_trainer"),
+]
+
+# 额外的启动动作：导入后立即执行，计入耗时
+ACTIONS = {
+    "sentiment_charts": "mod.setup_chinese_font()",
+}
+
+PROBE = """
+import time, json
+t0 = time.perf_counter()
+import importlib
+mod = importlib.import_module({module!r})
+t1 = time.perf_counter()
+{action}
+t2 = time.perf_counter()
+print(json.dumps([t1 - t0, t2 - t1]))
+"""
+
+
+def measure(step_dir, module, action="pass"):
+    """在新进程中导入模块，返回 (导入耗时, 额外动作耗时)"""
+    code = PROBE.format(module=module, action=action)
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.join(BASE_DIR, step_dir),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(step_dir, module, n=10):
+    """-X importtime 中累计耗时最多的 n 个导入"""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         cwd=os.path.join(BASE_DIR, step_dir), capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative, name = [p.strip() for p in line.split("|")]
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='各步骤模块启动耗时测试')
+    parser.add_argument('--repeat', type=int, default=5, help='每个模块测试次数（取中位数）')
+    parser.add_argument('--modules', nargs='+', default=None,
+                        help='只测试指定模块（默认全部）')
+    parser.add_argument('--importtime', action='store_true',
+                        help='列出每个模块最耗时的导入')
+    args = parser.parse_args()
+
+    print(f"{'模块':<22}{'导入(s)':>10}{'启动动作(s)':>14}")
+    for step_dir, module in MODULES:
+        if args.modules and module not in args.modules:
+            continue
+        try:
+            runs = [measure(step_dir, module, ACTIONS.get(module, "pass")) for _ in range(args.repeat)]
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<22}{'失败':>10}  {e.stderr.strip().splitlines()[-1] if e.stderr else ''}")
+            continue
+        imp = statistics.median(r[0] for r in runs)
+        act = statistics.median(r[1] for r in runs)
+        print(f"{module:<22}{imp:>10.3f}{act:>14.3f}")
+        if args.importtime:
+            for cumulative, name in top_imports(step_dir, module):
+                print(f"    {cumulative / 1e6:8.3f}s  {name}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分词引擎基准测试：双数组Trie vs jieba.cut
+
+jieba 按 cut_words.py 的方式加载项目词典，双数组由同样加载的词典编译，比较加载内存、每秒处理评论数，并逐条核对分词结果。
+"""
+import os
+import time
+import logging
+import argparse
+import tracemalloc
+
+from dat_segmenter import DATSegmenter, SCRIPT_DIR, load_user_dicts
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+DEFAULT_CORPUS = [
+    os.path.join(SCRIPT_DIR, "..", "step2_comment_segmentation", "weibo_comments", "all_comments.txt"),
+    os.path.join(SCRIPT_DIR, "..", "step4_sentiments", "model_evaluation", "eva_data.dat"),
+]
+
+
+def load_corpus(paths, repeat=1):
+    """读取测试语料；已分词文件去掉空格还原为原始评论"""
+    comments = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                text = line.strip().replace(' ', '')
+                if text:
+                    comments.append(text)
+    return comments * repeat
+
+
+def measure(label, build):
+    """统计构建/加载分词器的耗时与 Python 堆内存"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    logging.info(f"📦 {label} 加载: {elapsed:.2f}s | 常驻 {current/2**20:.1f} MB | 峰值 {peak/2**20:.1f} MB")
+    return obj
+
+
+def run(label, cut_all, comments):
+    start = time.perf_counter()
+    results = cut_all(comments)
+    elapsed = time.perf_counter() - start
+    logging.info(f"⚡ {label}: {len(comments)/elapsed:,.0f} 条评论/秒 ({elapsed:.2f}s)")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='双数组Trie分词引擎基准测试')
+    parser.add_argument('--corpus', nargs='+', default=DEFAULT_CORPUS,
+                        help='测试语料文件，每行一条评论')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='语料重复次数，用于放大测试规模')
+    parser.add_argument('--no-hmm', action='store_true',
+                        help='关闭 HMM 未登录词识别')
+    args = parser.parse_args()
+    hmm = not args.no_hmm
+
+    import jieba
+    jieba.setLogLevel(logging.WARNING)
+
+    def build_jieba():
+        # 与 cut_words.py 的 jieba 引擎相同：默认主词典 + 按顺序加载项目词典
+        tokenizer = jieba.Tokenizer()
+        tokenizer.initialize()
+        load_user_dicts(tokenizer)
+        return tokenizer
+
+    tokenizer = measure("jieba", build_jieba)
+    segmenter = measure("双数组Trie", DATSegmenter.load)
+
+    comments = load_corpus(args.corpus, args.repeat)
+    logging.info(f"📊 测试语料: {len(comments)} 条评论")
+
+    expected = run("jieba.cut", lambda cs: [list(tokenizer.cut(c, HMM=hmm)) for c in cs], comments)
+    single = run("DATSegmenter.cut", lambda cs: [segmenter.lcut(c, HMM=hmm) for c in cs], comments)
+    batch = run("DATSegmenter.cut_batch", lambda cs: segmenter.cut_batch(cs, HMM=hmm), comments)
+
+    mismatched = [(c, e, s) for c, e, s in zip(comments, expected, single) if e != s]
+    mismatched += [(c, e, s) for c, e, s in zip(comments, expected, batch) if e != s]
+    if mismatched:
+        logging.error(f"❌ 分词结果不一致: {len(mismatched)} 条")
+        for comment, e, s in mismatched[:5]:
+            logging.error(f"  {comment}\n    jieba: {'/'.join(e)}\n    DAT:   {'/'.join(s)}")
+    else:
+        logging.info("✅ 分词结果与 jieba 完全一致")
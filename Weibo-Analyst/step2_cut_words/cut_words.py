@@ -7,6 +7,7 @@ import jieba
 import pymysql
 import logging
 import os
+import argparse
 
 # 日志配置
 logging.basicConfig(
@@ -25,26 +26,29 @@ DB_CONFIG = {
 }
 
 # 加载词典和停用词
-def load_resources():
-    """加载分词词典和停用词"""
+def load_resources(engine='jieba'):
+    """加载分词词典和停用词，返回 (停用词, 分词函数)"""
     try:
-        jieba.load_userdict("SogouLabDic.txt")
-        jieba.load_userdict("dict_baidu_utf8.txt")
-        jieba.load_userdict("dict_pangu.txt")
-        jieba.load_userdict("dict_sougou_utf8.txt")
-        jieba.load_userdict("dict_tencent_utf8.txt")
-        jieba.load_userdict("my_dict.txt")
+        if engine == 'dat':
+            # 双数组Trie引擎直接加载编译好的合并词典
+            from dat_segmenter import DATSegmenter
+            cut = DATSegmenter.load().cut
+        else:
+            # 与编译双数组词典使用同一份词典列表和加载方式
+            from dat_segmenter import load_user_dicts
+            load_user_dicts(jieba.dt)
+            cut = jieba.cut
         logging.info("✅ 自定义词典加载成功")
         
         with open('Stopword.txt', 'r', encoding='utf-8') as f:
             stopwords = {line.strip() for line in f}
         logging.info(f"✅ 停用词表加载成功，共 {len(stopwords)} 个停用词")
-        return stopwords
+        return stopwords, cut
     except Exception as e:
         logging.error(f"❌ 资源加载失败: {e}")
-        return None
+        return None, None
 
-def process_comments(weibo_ids, stopwords):
+def process_comments(weibo_ids, stopwords, cut=jieba.cut):
     """处理指定微博的评论"""
     try:
         # 创建存储目录
@@ -70,7 +74,7 @@ def process_comments(weibo_ids, stopwords):
                 with open(output_file, "w", encoding='utf-8') as fo:
                     for i, comment in enumerate(comments):
                         text = comment['comment']
-                        seg_list = jieba.cut(text)
+                        seg_list = cut(text)
                         
                         # 过滤停用词并写入文件
                         filtered_words = [word for word in seg_list if word.strip() and word not in stopwords]
@@ -95,6 +99,11 @@ def process_comments(weibo_ids, stopwords):
         return False
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='微博评论分词处理')
+    parser.add_argument('--engine', choices=['jieba', 'dat'], default='jieba',
+                        help='分词引擎：jieba 或双数组Trie (dat)')
+    args = parser.parse_args()
+    
     # 需要处理的微博ID列表（与爬虫一致）
     weibo_ids = [101, 102, 103, 104, 105]
     
@@ -103,12 +112,12 @@ if __name__ == '__main__':
     logging.info("="*60)
     
     # 加载词典资源
-    stopwords = load_resources()
+    stopwords, cut = load_resources(args.engine)
     if not stopwords:
         exit(1)
     
     # 处理评论
-    if process_comments(weibo_ids, stopwords):
+    if process_comments(weibo_ids, stopwords, cut):
         logging.info("\n🎉 所有微博评论分词处理完成!")
     else:
         logging.error("\n❌ 处理过程中遇到错误")
\ No newline at end of file
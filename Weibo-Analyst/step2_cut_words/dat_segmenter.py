@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+双数组Trie分词引擎
+
+把 jieba 主词典与项目词典合并后编译成紧凑的双数组Trie (base/check 数组)，
+按与 jieba 相同的最大概率路径 + HMM 未登录词规则分词，输出与按同样方式加载
+项目词典的 jieba 一致，但无需为每个前缀构建 Python 字典。
+"""
+import os
+import re
+import logging
+from array import array
+from math import log
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 项目词典，按顺序用 jieba.load_userdict 加载（cut_words.py 的 jieba 引擎与编译双数组共用）
+PROJECT_DICTS = [
+    "SogouLabDic.txt",
+    "dict_baidu_utf8.txt",
+    "dict_pangu.txt",
+    "dict_sougou_utf8.txt",
+    "dict_tencent_utf8.txt",
+    "my_dict.txt",
+]
+
+# 编译结果缓存与合并词表（jieba 词典格式，便于查看合并后的词频）
+DEFAULT_CACHE = os.path.join(SCRIPT_DIR, "merged_dict.npz")
+DEFAULT_MERGED_TXT = os.path.join(SCRIPT_DIR, "merged_dict.txt")
+
+# 缓存格式版本：词典合并规则改变时递增，旧缓存在 load 时自动重新编译
+CACHE_VERSION = 3
+
+# 与 jieba 相同的分块规则
+re_han = re.compile("([\\u4E00-\\u9FD5a-zA-Z0-9+#&\\._%\\-]+)", re.U)
+re_skip = re.compile("(\r\n|\\s)", re.U)
+re_eng = re.compile('[a-zA-Z0-9]', re.U)
+
+# logp 数组中非词节点的占位值（真实词的对数概率总是 <= 0）
+NOT_A_WORD = 1.0
+
+# 构建时一个空位连续失败多少次后不再尝试
+MAX_SLOT_FAILS = 8
+
+
+def iter_dict_entries(path, use_freq=True):
+    """逐行解析词典：词 [词频] [词性]，兼容制表符分隔和 BOM"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.lstrip('\ufeff').split()
+            if not parts:
+                continue
+            freq = None
+            if use_freq and len(parts) > 1 and parts[1].isdigit():
+                freq = int(parts[1])
+            yield parts[0], freq
+
+
+def load_user_dicts(tokenizer, dict_dir=SCRIPT_DIR, dict_files=PROJECT_DICTS):
+    """按顺序把项目词典加载进 jieba 分词器（jieba.dt 或 jieba.Tokenizer），不存在的文件跳过"""
+    for filename in dict_files:
+        path = os.path.join(dict_dir, filename)
+        if not os.path.exists(path):
+            logging.warning(f"⚠️ 词典文件不存在，跳过: {path}")
+            continue
+        tokenizer.load_userdict(path)
+        logging.info(f"📖 合并词典 {filename}: 累计 {len(tokenizer.FREQ)} 个词条")
+
+
+def dict_signature(dict_dir=SCRIPT_DIR, dict_files=PROJECT_DICTS):
+    """词典来源的签名：jieba 版本 + 各项目词典的大小与修改时间（不存在记为空），任一变化都需要重新编译"""
+    import jieba
+
+    stats = [jieba.__version__]
+    for filename in dict_files:
+        path = os.path.join(dict_dir, filename)
+        if os.path.exists(path):
+            st = os.stat(path)
+            stats.append(f"{filename}:{st.st_size}:{st.st_mtime_ns}")
+        else:
+            stats.append(f"{filename}:")
+    return "|".join(stats)
+
+
+def merge_dictionaries(dict_dir=SCRIPT_DIR, dict_files=PROJECT_DICTS):
+    """合并 jieba 主词典与项目词典，返回 ({词: 词频}, 总词频)
+
+    直接用 jieba.Tokenizer 按 load_user_dicts 加载，词频、补全词频的规则与总词频都与 jieba 引擎相同
+    （jieba 的用户词典以空格分隔词频，制表符分隔的 SogouLabDic 整行被当作一个词，词频按 suggest_freq 补全）。
+    总词频包含被覆盖的旧词频，不等于各词词频之和；含分块字符以外字符的词不会被匹配，
+    只计入总词频，不进入词表。
+    """
+    import jieba
+
+    tokenizer = jieba.Tokenizer()
+    tokenizer.initialize()
+    logging.info(f"📖 jieba 主词典: {len(tokenizer.FREQ)} 个词条")
+    load_user_dicts(tokenizer, dict_dir, dict_files)
+    words_freq = {w: f for w, f in tokenizer.FREQ.items() if f > 0 and re_han.fullmatch(w)}
+    return words_freq, tokenizer.total
+
+
+def save_merged_txt(words_freq, path=DEFAULT_MERGED_TXT):
+    """把合并词典写成 jieba 主词典格式"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for word, f_ in words_freq.items():
+            f.write(f"{word} {f_}\n")
+    return path
+
+
+def build_double_array(words_freq, total=None):
+    """把 {词: 词频} 编译为双数组Trie
+
+    字符按码点编号 (1..A)，词表按字符串排序后逐层分配 base；
+    check[t] 记录父节点编号，logp[t] 记录该词的对数概率。
+    不同节点可以共用同一个 base，转移是否有效只由 check 判定。
+    """
+    chars = sorted({ch for word in words_freq for ch in word})
+    code = {ch: i + 1 for i, ch in enumerate(chars)}
+    keys = sorted(words_freq)
+    total = total or sum(words_freq.values())
+    logtotal = log(total)
+
+    size = 1 << 16
+    base = [0] * size
+    check = [-1] * size
+    logp = [NOT_A_WORD] * size
+    # 空闲槽位组成双向链表，查找 base 时只遍历空位
+    nxt = list(range(1, size + 1))
+    prv = list(range(-1, size - 1))
+    head = 1
+    fails = {}
+    max_index = 0
+
+    def grow():
+        nonlocal size
+        old = size
+        size *= 2
+        base.extend([0] * old)
+        check.extend([-1] * old)
+        logp.extend([NOT_A_WORD] * old)
+        nxt.extend(range(old + 1, size + 1))
+        prv.extend(range(old - 1, size - 1))
+
+    def take(pos):
+        nonlocal head
+        p, n = prv[pos], nxt[pos]
+        if p >= 0:
+            nxt[p] = n
+        if pos == head:
+            head = n
+        if n < size:
+            prv[n] = p
+
+    check[0] = 0
+    take(0)
+    stack = [(0, 0, len(keys), 0)]
+    while stack:
+        node, lo, hi, depth = stack.pop()
+        # 排序后最短的键在最前，长度等于深度即为当前节点对应的词
+        if len(keys[lo]) == depth:
+            logp[node] = log(words_freq[keys[lo]]) - logtotal
+            lo += 1
+        if lo >= hi:
+            continue
+
+        # 按当前深度的字符分组子节点
+        children = []
+        i = lo
+        while i < hi:
+            c = code[keys[i][depth]]
+            j = i + 1
+            while j < hi and code[keys[j][depth]] == c:
+                j += 1
+            children.append((c, i, j))
+            i = j
+
+        first, last = children[0][0], children[-1][0]
+        pos = head
+        while True:
+            while pos >= size:
+                grow()
+            b = pos - first
+            if b >= 1:
+                while b + last >= size:
+                    grow()
+                if all(check[b + c] == -1 for c, _, _ in children[1:]):
+                    break
+            n = nxt[pos]
+            # 反复放不下子节点的空位直接放弃，以少量空洞换取线性的构建时间
+            fails[pos] = fails.get(pos, 0) + 1
+            if fails[pos] >= MAX_SLOT_FAILS:
+                take(pos)
+            pos = n
+
+        base[node] = b
+        for c, l, h in children:
+            check[b + c] = node
+            take(b + c)
+        max_index = max(max_index, b + last)
+        for c, l, h in reversed(children):
+            stack.append((b + c, l, h, depth + 1))
+    check[0] = -1
+
+    # 末尾留出一个完整字母表的空间，查找时无需做越界判断
+    n = max_index + len(chars) + 2
+    pad = max(0, n - size)
+    base = np.array(base[:n] + [0] * pad, dtype=np.int32)
+    check = np.array(check[:n] + [-1] * pad, dtype=np.int32)
+    logp = np.array(logp[:n] + [NOT_A_WORD] * pad, dtype=np.float64)
+    return np.array(chars), base, check, logp, total
+
+
+class DATSegmenter:
+    """基于双数组Trie的 jieba 兼容分词器"""
+
+    def __init__(self, chars, base, check, logp, total):
+        self.code = {str(ch): i + 1 for i, ch in enumerate(chars)}
+        # array.array 的逐元素访问远快于 numpy 标量索引
+        self.base = array('i', np.asarray(base, dtype=np.int32).tobytes())
+        self.check = array('i', np.asarray(check, dtype=np.int32).tobytes())
+        self.logp = array('d', np.asarray(logp, dtype=np.float64).tobytes())
+        self.total = int(total)
+        self.min_logp = -log(self.total)  # 未登录单字按词频1计
+        self._finalseg = None
+
+    @classmethod
+    def compile(cls, dict_dir=SCRIPT_DIR, cache_path=DEFAULT_CACHE, merged_txt=None):
+        """从词典编译双数组并写入缓存"""
+        signature = dict_signature(dict_dir)
+        words_freq, total = merge_dictionaries(dict_dir)
+        if merged_txt:
+            save_merged_txt(words_freq, merged_txt)
+        chars, base, check, logp, total = build_double_array(words_freq, total)
+        if cache_path:
+            np.savez(cache_path, chars=chars, base=base, check=check,
+                     logp=logp, total=np.int64(total), version=np.int64(CACHE_VERSION),
+                     signature=np.str_(signature))
+            logging.info(f"💾 双数组词典已保存: {cache_path} ({len(base)} 个槽位, {len(words_freq)} 个词)")
+        return cls(chars, base, check, logp, total)
+
+    @classmethod
+    def load(cls, cache_path=DEFAULT_CACHE, dict_dir=SCRIPT_DIR):
+        """加载编译好的双数组，缓存不存在、版本过旧或词典文件有改动时先编译"""
+        if not os.path.exists(cache_path):
+            logging.info("🔨 未找到双数组词典缓存，开始编译...")
+            return cls.compile(dict_dir, cache_path)
+        with np.load(cache_path) as data:
+            if 'version' not in data or int(data['version']) != CACHE_VERSION:
+                reason = "双数组词典缓存版本过旧"
+            elif str(data['signature']) != dict_signature(dict_dir):
+                reason = "词典文件已改动"
+            else:
+                return cls(data['chars'], data['base'], data['check'],
+                           data['logp'], data['total'])
+        logging.info(f"🔨 {reason}，重新编译...")
+        return cls.compile(dict_dir, cache_path)
+
+    def word_logp(self, word):
+        """返回词的对数概率，不在词典中返回 None"""
+        s = 0
+        base, check = self.base, self.check
+        for ch in word:
+            c = self.code.get(ch)
+            if c is None:
+                return None
+            t = base[s] + c
+            if check[t] != s:
+                return None
+            s = t
+        lp = self.logp[s]
+        return None if lp == NOT_A_WORD else lp
+
+    def _route(self, sentence):
+        """自后向前计算最大概率路径，直接在Trie上前向匹配，不生成DAG"""
+        N = len(sentence)
+        code_get = self.code.get
+        codes = [code_get(ch, 0) for ch in sentence]
+        base, check, logp = self.base, self.check, self.logp
+        min_logp = self.min_logp
+        route_p = [0.0] * (N + 1)
+        route_x = [0] * (N + 1)
+        for idx in range(N - 1, -1, -1):
+            best_p = None
+            best_x = idx
+            s = 0
+            j = idx
+            while j < N:
+                c = codes[j]
+                if not c:
+                    break
+                t = base[s] + c
+                if check[t] != s:
+                    break
+                s = t
+                lp = logp[s]
+                if lp != NOT_A_WORD:
+                    p = lp + route_p[j + 1]
+                    # 与 jieba 的 max((p, x)) 一致：概率相同取更长的词
+                    if best_p is None or p >= best_p:
+                        best_p = p
+                        best_x = j
+                j += 1
+            if best_p is None:
+                best_p = min_logp + route_p[idx + 1]
+            route_p[idx] = best_p
+            route_x[idx] = best_x
+        return route_x
+
+    def _hmm_cut(self, buf):
+        if self._finalseg is None:
+            from jieba import finalseg
+            self._finalseg = finalseg
+        return self._finalseg.cut(buf)
+
+    def _cut_block(self, sentence):
+        """等价于 jieba 的 __cut_DAG：连续单字交给 HMM 识别未登录词"""
+        route_x = self._route(sentence)
+        x = 0
+        buf = ''
+        N = len(sentence)
+        while x < N:
+            y = route_x[x] + 1
+            l_word = sentence[x:y]
+            if y - x == 1:
+                buf += l_word
+            else:
+                if buf:
+                    yield from self._flush(buf)
+                    buf = ''
+                yield l_word
+            x = y
+        if buf:
+            yield from self._flush(buf)
+
+    def _flush(self, buf):
+        if len(buf) == 1:
+            yield buf
+        elif self.word_logp(buf) is None:
+            yield from self._hmm_cut(buf)
+        else:
+            yield from buf
+
+    def _cut_block_no_hmm(self, sentence):
+        """等价于 jieba 的 __cut_DAG_NO_HMM：连续英文数字合并"""
+        route_x = self._route(sentence)
+        x = 0
+        buf = ''
+        N = len(sentence)
+        while x < N:
+            y = route_x[x] + 1
+            l_word = sentence[x:y]
+            if len(l_word) == 1 and re_eng.match(l_word):
+                buf += l_word
+            else:
+                if buf:
+                    yield buf
+                    buf = ''
+                yield l_word
+            x = y
+        if buf:
+            yield buf
+
+    def cut(self, sentence, HMM=True):
+        """与 jieba.cut(sentence, HMM=HMM) 相同的精确模式分词"""
+        cut_block = self._cut_block if HMM else self._cut_block_no_hmm
+        for blk in re_han.split(sentence):
+            if not blk:
+                continue
+            if re_han.match(blk):
+                yield from cut_block(blk)
+            else:
+                for x in re_skip.split(blk):
+                    if re_skip.match(x):
+                        yield x
+                    else:
+                        yield from x
+
+    def lcut(self, sentence, HMM=True):
+        return list(self.cut(sentence, HMM))
+
+    def cut_batch(self, sentences, HMM=True, cache_size=100000):
+        """批量分词，返回与输入顺序一致的词列表
+
+        微博评论中重复的短句和表情文字很多，按汉字块缓存路径结果。
+        """
+        cut_block = self._cut_block if HMM else self._cut_block_no_hmm
+        cache = {}
+        results = []
+        for sentence in sentences:
+            words = []
+            for blk in re_han.split(sentence):
+                if not blk:
+                    continue
+                if re_han.match(blk):
+                    seg = cache.get(blk)
+                    if seg is None:
+                        seg = tuple(cut_block(blk))
+                        if len(cache) < cache_size:
+                            cache[blk] = seg
+                    words.extend(seg)
+                else:
+                    for x in re_skip.split(blk):
+                        if re_skip.match(x):
+                            words.append(x)
+                        else:
+                            words.extend(x)
+            results.append(words)
+        return results
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    # 编译双数组词典，同时输出合并后的词表
+    DATSegmenter.compile(merged_txt=DEFAULT_MERGED_TXT)
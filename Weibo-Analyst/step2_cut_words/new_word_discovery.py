@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于统计的新词发现
+
+在评论语料上建立后缀数组，统计 n-gram 词频、内部凝固度 (PMI) 和左右邻字熵，
+输出可直接追加到 my_dict.txt 的候选新词。
+"""
+import os
+import re
+import logging
+import argparse
+from math import log
+
+import numpy as np
+
+from dat_segmenter import PROJECT_DICTS, SCRIPT_DIR, iter_dict_entries
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+# 数据库配置（与爬虫一致）
+DB_CONFIG = {
+    'host': 'host.docker.internal',
+    'user': 'root',
+    'password': '12345abc',
+    'db': 'weibo_comments',
+    'charset': 'utf8mb4'
+}
+
+DEFAULT_INPUT = os.path.join(SCRIPT_DIR, "..", "step2_comment_segmentation", "weibo_comments", "all_comments.txt")
+
+# 原始评论中的噪声与非中文片段
+re_noise = re.compile(r'https?://\S+|www\.\S+|\[.*?\]|#.*?#|@\S+')
+re_non_han = re.compile(r'[^\u4e00-\u9fa5]+')
+
+
+def iter_file_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def iter_db_comments(batch_size=5000):
+    """流式读取数据库中所有 comments_* 表的原始评论"""
+    import pymysql
+    with pymysql.connect(**DB_CONFIG) as db:
+        with db.cursor() as cursor:
+            cursor.execute("SHOW TABLES LIKE 'comments_%'")
+            tables = [row[0] for row in cursor.fetchall()]
+        for table in tables:
+            logging.info(f"📊 读取评论表: {table}")
+            with db.cursor(pymysql.cursors.SSCursor) as cursor:
+                cursor.execute(f"SELECT comment FROM `{table}`")
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for (comment,) in rows:
+                        if comment:
+                            yield comment
+
+
+def iter_segments(lines, unit):
+    """把语料切成互不相连的单元序列：char 模式按非中文字符断开，token 模式按空格分词"""
+    for line in lines:
+        if unit == 'token':
+            tokens = line.split()
+            if tokens:
+                yield tokens
+        else:
+            for seg in re_non_han.split(re_noise.sub(' ', line)):
+                if seg:
+                    yield seg
+
+
+def encode_corpus(segments):
+    """编码为整数序列，每个片段末尾放一个唯一的分隔符，使 n-gram 不会跨片段"""
+    vocab = {}
+    ids = []
+    n_segments = 0
+    for seg in segments:
+        for u in seg:
+            i = vocab.get(u)
+            if i is None:
+                i = vocab[u] = len(vocab)
+            ids.append(i)
+        ids.append(-1 - n_segments)
+        n_segments += 1
+    text = np.array(ids, dtype=np.int64)
+    # 分隔符编号排在所有单元之后且互不相同
+    sep = text < 0
+    text[sep] = len(vocab) - 1 - text[sep]
+    id2unit = [None] * len(vocab)
+    for u, i in vocab.items():
+        id2unit[i] = u
+    return text, id2unit, n_segments
+
+
+def suffix_array(text, depth):
+    """前缀倍增构建后缀数组，只需保证前 depth 个单元有序"""
+    n = len(text)
+    _, rank = np.unique(text, return_inverse=True)
+    rank = rank.astype(np.int64)
+    sa = np.argsort(rank, kind='stable')
+    k = 1
+    while k < depth:
+        nxt = np.zeros(n, dtype=np.int64)
+        nxt[:n - k] = rank[k:] + 1
+        key = rank * (n + 1) + nxt
+        sa = np.argsort(key, kind='stable')
+        sorted_key = key[sa]
+        new_rank = np.empty(n, dtype=np.int64)
+        new_rank[sa] = np.concatenate(([0], np.cumsum(sorted_key[1:] != sorted_key[:-1])))
+        rank = new_rank
+        if rank.max() == n - 1:
+            break
+        k *= 2
+    return sa
+
+
+def capped_lcp(text, sa, depth):
+    """相邻后缀的最长公共前缀，最多比较 depth 个单元；lcp[0] = -1"""
+    n = len(text)
+    padded = np.concatenate((text, np.full(depth, -1, dtype=np.int64)))
+    lcp = np.zeros(n, dtype=np.int64)
+    alive = np.ones(n - 1, dtype=bool)
+    for j in range(depth):
+        alive &= padded[sa[1:] + j] == padded[sa[:-1] + j]
+        lcp[1:] += alive
+    lcp[0] = -1
+    return lcp
+
+
+def ngram_stats(text, max_len, min_count):
+    """在后缀数组上统计 1..max_len 元组的词频与右邻熵
+
+    返回 {n: (起始位置, 词频, 右邻熵)}；同一 n-gram 的所有出现在后缀数组中连续，
+    其右邻单元也已排好序，因此熵可由 lcp 分段直接向量化计算。
+    """
+    sa = suffix_array(text, max_len + 1)
+    lcp = capped_lcp(text, sa, max_len + 1)
+    N = len(text)
+    stats = {}
+    for n in range(1, max_len + 1):
+        group_starts = np.flatnonzero(lcp < n)
+        counts = np.diff(np.append(group_starts, N))
+        run_starts = np.flatnonzero(lcp < n + 1)
+        run_counts = np.diff(np.append(run_starts, N)).astype(np.float64)
+        group_of_run = np.flatnonzero(lcp[run_starts] < n)
+        clogc = np.add.reduceat(run_counts * np.log(run_counts), group_of_run)
+        entropy = np.log(counts) - clogc / counts
+        keep = counts >= min_count
+        stats[n] = (sa[group_starts[keep]], counts[keep], entropy[keep])
+    return stats
+
+
+def discover(segments, max_len=4, min_count=5, min_pmi=3.0, min_entropy=1.0,
+             known=(), stopwords=()):
+    """计算候选新词，按 词频 × 凝固度 × 自由度 排序"""
+    text, id2unit, n_segments = encode_corpus(segments)
+    n_units = len(text) - n_segments
+    logging.info(f"📚 语料: {n_segments} 个片段, {n_units} 个单元, {len(id2unit)} 种单元")
+    if n_units == 0:
+        return []
+
+    right = ngram_stats(text, max_len, min_count)
+    # 反转语料后的右邻熵即原语料的左邻熵
+    rev_text = text[::-1].copy()
+    left = ngram_stats(rev_text, max_len, min_count)
+
+    counts = {}
+    right_h = {}
+    for n, (pos, cnt, ent) in right.items():
+        for p, c, h in zip(pos.tolist(), cnt.tolist(), ent.tolist()):
+            key = tuple(text[p:p + n].tolist())
+            counts[key] = c
+            right_h[key] = h
+    left_h = {}
+    for n, (pos, cnt, ent) in left.items():
+        if n < 2:
+            continue
+        for p, h in zip(pos.tolist(), ent.tolist()):
+            left_h[tuple(rev_text[p:p + n].tolist()[::-1])] = h
+
+    sep_base = len(id2unit)
+    logn = log(n_units)
+    candidates = []
+    for key, c in counts.items():
+        n = len(key)
+        if n < 2 or max(key) >= sep_base or key not in left_h:
+            continue
+        units = [id2unit[i] for i in key]
+        if units[0] in stopwords or units[-1] in stopwords:
+            continue
+        word = ''.join(units)
+        if word in known:
+            continue
+        # 凝固度取所有二分切法中最小的点互信息
+        pmi = min(
+            log(c) + logn - log(counts[key[:i]]) - log(counts[key[i:]])
+            for i in range(1, n)
+        )
+        freedom = min(left_h[key], right_h[key])
+        if pmi < min_pmi or freedom < min_entropy:
+            continue
+        score = log(c) * pmi * freedom
+        candidates.append((word, c, pmi, left_h[key], right_h[key], score))
+
+    candidates.sort(key=lambda x: -x[5])
+    return candidates
+
+
+def load_known_words(dict_dir=SCRIPT_DIR):
+    """已收录的词：项目词典 + jieba 主词典"""
+    known = set()
+    for filename in PROJECT_DICTS:
+        path = os.path.join(dict_dir, filename)
+        if os.path.exists(path):
+            known.update(word for word, _ in iter_dict_entries(path, False))
+    try:
+        import jieba
+        with jieba.get_dict_file() as f:
+            for line in f:
+                known.add(line.decode('utf-8').split(' ', 1)[0])
+    except ImportError:
+        logging.warning("⚠️ 未安装 jieba，仅以项目词典过滤已知词")
+    return known
+
+
+def load_stopwords(path=os.path.join(SCRIPT_DIR, 'Stopword.txt')):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='微博评论新词发现')
+    parser.add_argument('--input', type=str, default=DEFAULT_INPUT,
+                        help='评论文件，每行一条（默认 all_comments.txt）')
+    parser.add_argument('--from_db', action='store_true',
+                        help='直接从数据库 comments_* 表读取原始评论')
+    parser.add_argument('--unit', choices=['char', 'token'], default=None,
+                        help='统计单元：原始文本用 char，已分词文件用 token（默认按输入自动选择）')
+    parser.add_argument('--max_len', type=int, default=4, help='候选词最大单元数')
+    parser.add_argument('--min_count', type=int, default=5, help='最小词频')
+    parser.add_argument('--min_pmi', type=float, default=3.0, help='最小凝固度')
+    parser.add_argument('--min_entropy', type=float, default=1.0, help='最小左右邻熵')
+    parser.add_argument('--top', type=int, default=200, help='输出候选词数量')
+    parser.add_argument('--output', type=str, default=os.path.join(SCRIPT_DIR, 'new_words.txt'),
+                        help='候选词输出文件（用户词典格式）')
+    parser.add_argument('--append', action='store_true',
+                        help='把候选词追加到 my_dict.txt')
+    args = parser.parse_args()
+
+    if args.from_db:
+        lines = iter_db_comments()
+        unit = args.unit or 'char'
+    else:
+        lines = iter_file_lines(args.input)
+        unit = args.unit or 'token'
+
+    known = load_known_words()
+    with open(os.path.join(SCRIPT_DIR, 'my_dict.txt'), 'r', encoding='utf-8') as f:
+        my_words = {line.split()[0] for line in f if line.strip()}
+    known |= my_words
+
+    candidates = discover(iter_segments(lines, unit), args.max_len, args.min_count,
+                          args.min_pmi, args.min_entropy, known, load_stopwords())
+    candidates = candidates[:args.top]
+    logging.info(f"✅ 发现 {len(candidates)} 个候选新词")
+
+    # 用户词典格式：不写词频，由 jieba.suggest_freq 自动给出能切分出该词的词频
+    with open(args.output, 'w', encoding='utf-8') as f:
+        for word, c, pmi, hl, hr, score in candidates:
+            f.write(f"{word}\n")
+    with open(os.path.splitext(args.output)[0] + '_stats.tsv', 'w', encoding='utf-8') as f:
+        f.write("word\tcount\tpmi\tleft_entropy\tright_entropy\tscore\n")
+        for row in candidates:
+            f.write("{}\t{}\t{:.3f}\t{:.3f}\t{:.3f}\t{:.3f}\n".format(*row))
+    logging.info(f"💾 结果保存至: {args.output}")
+
+    for word, c, pmi, hl, hr, score in candidates[:20]:
+        logging.info(f"  {word}\t词频={c}\tPMI={pmi:.2f}\t左熵={hl:.2f}\t右熵={hr:.2f}")
+
+    if args.append:
+        with open(os.path.join(SCRIPT_DIR, 'my_dict.txt'), 'a', encoding='utf-8') as f:
+            for word, *_ in candidates:
+                f.write(f"\n{word}")
+        logging.info(f"📝 已追加 {len(candidates)} 个新词到 my_dict.txt")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+稀疏共现图 TextRank 关键词排序
+
+预处理输出的评论文件已经分好词（每行一条评论，空格分隔），这里直接在词序列上
+按窗口统计共现，构建 scipy 稀疏矩阵，用稀疏矩阵-向量乘迭代 PageRank，
+不再像 jieba.analyse.textrank 那样重新分词并用 Python 字典建图。
+"""
+import os
+import json
+import hashlib
+
+import numpy as np
+from scipy import sparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, 'cache')
+
+# 与 jieba.analyse.textrank 默认值相同的词性
+DEFAULT_POS = ('ns', 'n', 'vn', 'v')
+
+
+def pos_filter(vocab, allowPOS):
+    """按 jieba 词典中的词性过滤词表（只查表，不重新分词）
+
+    词典中没有的词多为新词、人名，予以保留。
+    """
+    from jieba import posseg
+    tag_tab = posseg.dt.word_tag_tab
+    allow = set(allowPOS)
+    return np.array([tag_tab.get(w, 'n') in allow for w in vocab.tolist()], dtype=bool)
+
+
+def build_cooccurrence(lines, window=5, min_len=2, allowPOS=DEFAULT_POS):
+    """构建词共现矩阵
+
+    与 jieba 一致，窗口按原始词序列计数（被过滤的短词也占位），
+    但只在同一条评论内统计，不跨行建边。
+    返回 (词表, 对称的 csr 共现矩阵)。
+    """
+    tokens = []
+    line_ids = []
+    for i, line in enumerate(lines):
+        words = line.split()
+        tokens.extend(words)
+        line_ids.extend([i] * len(words))
+    if not tokens:
+        return [], sparse.csr_matrix((0, 0))
+
+    vocab, ids = np.unique(np.array(tokens), return_inverse=True)
+    line_ids = np.array(line_ids)
+    keep = np.char.str_len(vocab) >= min_len
+    if allowPOS:
+        keep &= pos_filter(vocab, allowPOS)
+    valid = keep[ids]
+
+    rows, cols = [], []
+    for k in range(1, window):
+        same = (line_ids[:-k] == line_ids[k:]) & valid[:-k] & valid[k:]
+        rows.append(ids[:-k][same])
+        cols.append(ids[k:][same])
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    n = len(vocab)
+    data = np.ones(len(rows), dtype=np.float64)
+    cm = sparse.coo_matrix((data, (rows, cols)), shape=(n, n)).tocsr()
+    return vocab, (cm + cm.T).tocsr()
+
+
+def pagerank(graph, d=0.85, max_iter=100, tol=1e-6):
+    """加权无向图上的 PageRank，按 jieba 的方式归一化到 (0, 1]"""
+    n = graph.shape[0]
+    out_sum = np.asarray(graph.sum(axis=1)).ravel()
+    active = out_sum > 0
+    inv = np.zeros(n)
+    inv[active] = 1.0 / out_sum[active]
+    # M[i, j] = w(j, i) / out(j)，每次迭代一次稀疏矩阵-向量乘
+    transition = (graph.T @ sparse.diags(inv)).tocsr()
+    ws = np.full(n, 1.0 / max(n, 1))
+    for _ in range(max_iter):
+        new_ws = (1 - d) + d * (transition @ ws)
+        new_ws[~active] = 0.0
+        delta = np.abs(new_ws - ws).max()
+        ws = new_ws
+        if delta < tol:
+            break
+    ws = ws[active]
+    if ws.size == 0:
+        return active, ws
+    min_rank, max_rank = ws.min(), ws.max()
+    return active, (ws - min_rank / 10.0) / (max_rank - min_rank / 10.0)
+
+
+def textrank(lines, topK=50, window=5, withWeight=True, allowPOS=DEFAULT_POS):
+    """对分好词的评论序列做 TextRank，返回与 jieba.analyse.textrank 相同形式的结果"""
+    vocab, graph = build_cooccurrence(lines, window, allowPOS=allowPOS)
+    if len(vocab) == 0:
+        return []
+    active, weights = pagerank(graph)
+    words = vocab[active]
+    order = np.argsort(-weights, kind='stable')[:topK]
+    if withWeight:
+        return [(str(words[i]), float(weights[i])) for i in order]
+    return [str(words[i]) for i in order]
+
+
+def textrank_cached(text, topK=50, window=5, allowPOS=DEFAULT_POS, cache_dir=CACHE_DIR):
+    """按文件内容哈希缓存 TextRank 结果，输入未变时直接读取"""
+    digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+    params = hashlib.sha1(repr((topK, window, allowPOS)).encode('utf-8')).hexdigest()[:8]
+    cache_path = os.path.join(cache_dir, f"textrank_{digest}_{params}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return [tuple(item) for item in json.load(f)]
+
+    result = textrank(text.splitlines(), topK=topK, window=window, allowPOS=allowPOS)
+    os.makedirs(cache_dir, exist_ok=True)
+    # 先写临时文件再替换，并行渲染时其它进程不会读到写了一半的缓存
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    return result
@@ -4,137 +4,121 @@
 Created on Thu Dec 21 15:06:18 2017
 @author: Ming JIN
 """
-import jieba.analyse
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.font_manager import FontProperties  
-from wordcloud import WordCloud, ImageColorGenerator
-from PIL import Image
+# matplotlib / wordcloud / PIL 在用到的函数内导入，导入本模块和启动工作进程都不必付出这部分开销
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import glob
+import json
 import os
 import argparse
 
+from keyword_rank import textrank_cached
+
 # ===== 获取脚本所在目录 =====
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# ===== 创建输出目录 =====
+# ===== 默认输出目录 =====
 OUTPUT_DIR = os.path.join(SCRIPT_DIR, 'output')  # 在脚本目录下创建output文件夹
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# 设置中文字体 - 使用绝对路径
-font_path = os.path.join(SCRIPT_DIR, 'Songti.ttc')
-if not os.path.exists(font_path):
-    print(f"警告：字体文件未找到: {font_path}")
-    print("请确保Songti.ttc字体文件存在于脚本目录")
-font = FontProperties(fname=font_path) if os.path.exists(font_path) else None
+
+# 中文字体与背景图片 - 使用绝对路径
+FONT_PATH = os.path.join(SCRIPT_DIR, 'Songti.ttc')
+BACKGROUND_IMG = os.path.join(SCRIPT_DIR, 'background.png')
 bar_width = 0.5
 
-# ===== 添加命令行参数解析 =====
-parser = argparse.ArgumentParser(description='微博评论词云生成工具')
-parser.add_argument('--input_dir', type=str, default='/workspace/step2_comment_segmentation/weibo_comments',
-                    help='预处理输出目录，包含评论文件')
-args = parser.parse_args()
+# 匹配预处理脚本生成的所有评论文件
+PATTERNS = ['comments_*.txt', 'all_comments.txt']
 
-DATA_DIR = args.input_dir
+# 每个进程只加载一次的渲染资源（背景蒙版、配色器、字体）
+_resources = {}
 
-# 如果找不到文件，显示错误信息
-if not os.path.exists(DATA_DIR):
-    print(f"错误：输入目录不存在: {DATA_DIR}")
-    print("请检查以下情况:")
-    print("1. 确保已运行预处理脚本")
-    print("2. 检查 --input_dir 参数是否正确")
-    exit(1)
 
-# 定义要处理的文件列表
-file_list = []
-# 匹配预处理脚本生成的所有评论文件
-patterns = ['comments_*.txt', 'all_comments.txt']
-for pattern in patterns:
-    file_list.extend(glob.glob(os.path.join(DATA_DIR, pattern)))
-
-# 如果找不到文件，显示错误信息
-if not file_list:
-    print(f"错误：在 {DATA_DIR} 找不到任何数据文件！")
-    print("请检查以下情况:")
-    print("1. 确保已运行预处理脚本")
-    print("2. 检查 --input_dir 参数是否正确")
-    print("3. 预处理输出目录应包含 comments_*.txt 或 all_comments.txt 文件")
-    print(f"目录内容: {os.listdir(DATA_DIR)}")
-    exit(1)
-
-print(f"找到 {len(file_list)} 个数据文件:")
-for i, path in enumerate(file_list, 1):
-    print(f"{i}. {os.path.abspath(path)}")
-
-# 背景图片路径 - 使用绝对路径
-background_img = os.path.join(SCRIPT_DIR, 'background.png')
-print(f"背景图片路径: {background_img}")
-
-# 处理每个文件
-for file_path in file_list:
-    # 读取文件内容
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lyric = f.read()
-    except UnicodeDecodeError:
-        try:
-            with open(file_path, 'r', encoding='gbk') as f:
-                lyric = f.read()
-        except Exception as e:
-            print(f"无法读取文件 {file_path}: {str(e)}")
-            continue
-    except Exception as e:
-        print(f"读取文件 {file_path} 出错: {str(e)}")
-        continue
-    
-    # 提取关键词
-    try:
-        result = jieba.analyse.textrank(lyric, topK=50, withWeight=True)
-        keywords = dict()
-        for i in result:
-            keywords[i[0]] = i[1]
-    except Exception as e:
-        print(f"处理文件 {file_path} 时出错: {str(e)}")
-        continue
-    
-    print(f"\n处理文件: {os.path.basename(file_path)} - 找到 {len(keywords)} 个关键词")
-    
-    # 生成文件名前缀
-    file_id = os.path.basename(file_path).split('.')[0]
-    
-    # ========== 生成词云 ==========
+def load_resources(font_path=FONT_PATH, background_img=BACKGROUND_IMG):
+    """加载并缓存渲染资源，同一进程内重复调用直接返回缓存"""
+    key = (font_path, background_img)
+    if key in _resources:
+        return _resources[key]
+    import numpy as np
+    from matplotlib.font_manager import FontProperties
+    from wordcloud import ImageColorGenerator
+    from PIL import Image
+
+    if not os.path.exists(font_path):
+        print(f"警告：字体文件未找到: {font_path}")
+        print("请确保Songti.ttc字体文件存在于脚本目录")
+        font_path = None
+    font = FontProperties(fname=font_path) if font_path else None
+
     graph = None
+    image_color = None
     try:
         if os.path.exists(background_img):
-            image = Image.open(background_img)
-            graph = np.array(image)
+            with Image.open(background_img) as image:
+                graph = np.array(image)
             print(f"使用背景图片: {background_img}")
         else:
             print(f"警告：背景图片 {background_img} 未找到，使用纯色背景")
     except Exception as e:
         print(f"加载背景图片出错: {str(e)}，使用纯色背景")
-    
+    if graph is not None:
+        try:
+            image_color = ImageColorGenerator(graph)
+        except Exception as e:
+            print(f"创建配色器出错: {str(e)}，使用默认颜色")
+
+    res = {'font_path': font_path, 'font': font, 'mask': graph, 'color_func': image_color}
+    _resources[key] = res
+    return res
+
+
+def find_input_files(data_dir):
+    """查找预处理输出目录中的评论文件"""
+    file_list = []
+    for pattern in PATTERNS:
+        file_list.extend(glob.glob(os.path.join(data_dir, pattern)))
+    return file_list
+
+
+def read_text(file_path):
+    """读取文件内容，UTF-8 失败时尝试 GBK"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(file_path, 'r', encoding='gbk') as f:
+            return f.read()
+
+
+def extract_keywords(text, topK=50):
+    """提取关键词（输入已分词，直接在共现稀疏矩阵上做 TextRank，结果按内容哈希缓存）"""
+    return dict(textrank_cached(text, topK=topK))
+
+
+def render_cloud(file_id, keywords, output_dir=OUTPUT_DIR, res=None):
+    """生成词云图，返回输出路径"""
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+    res = res or load_resources()
+    font = res['font']
     try:
         wc = WordCloud(
-            font_path=font_path if os.path.exists(font_path) else None,
+            font_path=res['font_path'],
             background_color='White',
             max_words=50,
-            mask=graph,
+            mask=res['mask'],
             width=1600,
             height=900
         )
         wc.generate_from_frequencies(keywords)
-        
-        if graph is not None:
+
+        if res['color_func'] is not None:
             try:
-                image_color = ImageColorGenerator(graph)
-                wc_image = wc.recolor(color_func=image_color)
+                wc_image = wc.recolor(color_func=res['color_func'])
             except Exception as e:
                 print(f"重新着色出错: {str(e)}，使用默认颜色")
                 wc_image = wc
         else:
             wc_image = wc
-        
+
         plt.figure(figsize=(16, 9))
         plt.imshow(wc_image)
         plt.axis("off")
@@ -143,26 +127,107 @@ for file_path in file_list:
             plt.title(title, fontproperties=font, fontsize=16)
         else:
             plt.title(title, fontsize=16)
-        
+
         # 保存词云图到输出目录
-        cloud_output = os.path.join(OUTPUT_DIR, f'output_cloud_{file_id}.png')
+        cloud_output = os.path.join(output_dir, f'output_cloud_{file_id}.png')
         plt.savefig(cloud_output, bbox_inches='tight', dpi=300)
         print(f"词云图已保存至: {cloud_output}")
-        plt.close()
+        return cloud_output
     except Exception as e:
         print(f"生成词云时出错: {str(e)}")
+        return None
+    finally:
         plt.close()
-    
-    # ========== 生成条形图 ==========
-    if not keywords:
-        print("没有关键词数据，跳过条形图生成")
-        continue
-        
+
+
+def export_layout(wc, keywords, path):
+    """导出词云布局 (词、位置、字号、方向、颜色)，供前端按同样布局在浏览器端绘制"""
+    items = []
+    for (word, weight), font_size, (row, col), orientation, color in wc.layout_:
+        items.append({
+            'word': word,
+            'weight': keywords.get(word, weight),
+            'x': int(col),
+            'y': int(row),
+            'font_size': int(font_size),
+            'vertical': orientation is not None,
+            'color': color,
+        })
+    layout = {'width': wc.width, 'height': wc.height, 'scale': wc.scale, 'words': items}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(layout, f, ensure_ascii=False)
+    return path
+
+
+def render_cloud_fast(file_id, keywords, output_dir=OUTPUT_DIR, res=None,
+                      fmt='png', scale=1.0, layout_json=False):
+    """直接输出 WordCloud 位图，标题用 PIL 绘制，不经 matplotlib 重采样
+
+    scale 控制输出分辨率（相对 1600x900 或背景图尺寸的倍数），fmt 支持 png/webp。
+    """
+    from wordcloud import WordCloud
+    from PIL import Image, ImageDraw, ImageFont
+    res = res or load_resources()
+    try:
+        wc = WordCloud(
+            font_path=res['font_path'],
+            background_color='White',
+            max_words=50,
+            mask=res['mask'],
+            width=1600,
+            height=900,
+            scale=scale
+        )
+        wc.generate_from_frequencies(keywords)
+        if res['color_func'] is not None:
+            try:
+                wc.recolor(color_func=res['color_func'])
+            except Exception as e:
+                print(f"重新着色出错: {str(e)}，使用默认颜色")
+        cloud = wc.to_image()
+
+        # 在顶部加一条标题栏
+        title = f"关键词词云 - {file_id}"
+        font_size = max(12, int(32 * scale))
+        try:
+            title_font = ImageFont.truetype(res['font_path'], font_size) if res['font_path'] \
+                else ImageFont.load_default()
+        except OSError:
+            title_font = ImageFont.load_default()
+        band = font_size * 2
+        image = Image.new('RGB', (cloud.width, cloud.height + band), 'white')
+        image.paste(cloud, (0, band))
+        draw = ImageDraw.Draw(image)
+        text_width = draw.textlength(title, font=title_font)
+        draw.text(((cloud.width - text_width) / 2, font_size / 2), title, fill='black', font=title_font)
+
+        cloud_output = os.path.join(output_dir, f'output_cloud_{file_id}.{fmt}')
+        if fmt == 'webp':
+            image.save(cloud_output, format='WEBP', quality=90, method=4)
+        else:
+            image.save(cloud_output, format='PNG', optimize=True)
+        print(f"词云图已保存至: {cloud_output}")
+
+        if layout_json:
+            layout_output = os.path.join(output_dir, f'output_cloud_{file_id}.json')
+            export_layout(wc, keywords, layout_output)
+            print(f"词云布局已保存至: {layout_output}")
+        return cloud_output
+    except Exception as e:
+        print(f"生成词云时出错: {str(e)}")
+        return None
+
+
+def render_barchart(file_id, keywords, output_dir=OUTPUT_DIR, res=None):
+    """生成关键词条形图，返回输出路径"""
+    import matplotlib.pyplot as plt
+    res = res or load_resources()
+    font = res['font']
     try:
         X = list(keywords.keys())
         Y = list(keywords.values())
         num = len(X)
-        
+
         plt.figure(figsize=(28, 10))
         plt.bar(range(num), Y, tick_label=X, width=bar_width)
         plt.xticks(rotation=50, fontsize=20)
@@ -176,15 +241,139 @@ for file_path in file_list:
             plt.title(title, fontproperties=font, fontsize=30)
         else:
             plt.title(title, fontsize=30)
-        
+
         # 保存条形图到输出目录
-        bar_output = os.path.join(OUTPUT_DIR, f'output_barchart_{file_id}.jpg')
+        bar_output = os.path.join(output_dir, f'output_barchart_{file_id}.jpg')
         plt.savefig(bar_output, bbox_inches='tight', dpi=360)
         print(f"条形图已保存至: {bar_output}")
-        plt.close()
+        return bar_output
     except Exception as e:
         print(f"生成条形图时出错: {str(e)}")
+        return None
+    finally:
         plt.close()
 
-print("\n所有文件处理完成!")
-print(f"输出文件保存在: {os.path.abspath(OUTPUT_DIR)}")
+
+def process_file(file_path, output_dir=OUTPUT_DIR, fast=False, fmt='png',
+                 scale=1.0, layout_json=False, font_path=FONT_PATH, background_img=BACKGROUND_IMG):
+    """处理单个评论文件：提取关键词并生成词云和条形图
+
+    fast=True 时词云走 PIL 直出路径（见 render_cloud_fast）。
+    字体与背景图按 (font_path, background_img) 从本进程的资源缓存中取得。
+
+    返回 (文件路径, 词云路径, 条形图路径)，失败的步骤对应 None。
+    """
+    try:
+        text = read_text(file_path)
+    except Exception as e:
+        print(f"无法读取文件 {file_path}: {str(e)}")
+        return file_path, None, None
+
+    try:
+        keywords = extract_keywords(text)
+    except Exception as e:
+        print(f"处理文件 {file_path} 时出错: {str(e)}")
+        return file_path, None, None
+
+    print(f"\n处理文件: {os.path.basename(file_path)} - 找到 {len(keywords)} 个关键词")
+
+    # 生成文件名前缀
+    file_id = os.path.basename(file_path).split('.')[0]
+    res = load_resources(font_path, background_img)
+    if fast:
+        cloud_output = render_cloud_fast(file_id, keywords, output_dir, res,
+                                         fmt=fmt, scale=scale, layout_json=layout_json)
+    else:
+        cloud_output = render_cloud(file_id, keywords, output_dir, res)
+
+    if not keywords:
+        print("没有关键词数据，跳过条形图生成")
+        return file_path, cloud_output, None
+    bar_output = render_barchart(file_id, keywords, output_dir, res)
+    return file_path, cloud_output, bar_output
+
+
+def _init_worker(font_path, background_img):
+    """进程池初始化：每个工作进程预先加载一次字体、蒙版和配色器"""
+    load_resources(font_path, background_img)
+
+
+def render_all(file_list, output_dir=OUTPUT_DIR, workers=1,
+               font_path=FONT_PATH, background_img=BACKGROUND_IMG, **render_opts):
+    """批量渲染；workers > 1 时使用进程池并行处理各文件
+
+    render_opts 透传给 process_file（fast / fmt / scale / layout_json）。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    task = partial(process_file, output_dir=output_dir, font_path=font_path,
+                   background_img=background_img, **render_opts)
+    if workers <= 1 or len(file_list) <= 1:
+        _init_worker(font_path, background_img)
+        return [task(path) for path in file_list]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_list)),
+                             initializer=_init_worker,
+                             initargs=(font_path, background_img)) as pool:
+        return list(pool.map(task, file_list))
+
+
+def main():
+    # ===== 命令行参数解析 =====
+    parser = argparse.ArgumentParser(description='微博评论词云生成工具')
+    parser.add_argument('--input_dir', type=str, default='/workspace/step2_comment_segmentation/weibo_comments',
+                        help='预处理输出目录，包含评论文件')
+    parser.add_argument('--output_dir', type=str, default=OUTPUT_DIR,
+                        help='词云和条形图输出目录')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='并行渲染的进程数，1 表示串行')
+    parser.add_argument('--fast', action='store_true',
+                        help='词云直接由 PIL 输出，不经 matplotlib 重绘')
+    parser.add_argument('--format', choices=['png', 'webp'], default=None,
+                        help='快速模式下词云的图片格式，默认 png（指定时自动启用 --fast）')
+    parser.add_argument('--scale', type=float, default=None,
+                        help='快速模式下词云的分辨率倍数，默认 1.0（指定时自动启用 --fast）')
+    parser.add_argument('--layout_json', action='store_true',
+                        help='快速模式下同时导出词云布局 JSON（自动启用 --fast）')
+    args = parser.parse_args()
+
+    # 这些选项只在快速模式下生效，单独指定时视为要求快速模式
+    if args.format is not None or args.scale is not None or args.layout_json:
+        args.fast = True
+
+    DATA_DIR = args.input_dir
+
+    # 如果找不到文件，显示错误信息
+    if not os.path.exists(DATA_DIR):
+        print(f"错误：输入目录不存在: {DATA_DIR}")
+        print("请检查以下情况:")
+        print("1. 确保已运行预处理脚本")
+        print("2. 检查 --input_dir 参数是否正确")
+        exit(1)
+
+    # 定义要处理的文件列表
+    file_list = find_input_files(DATA_DIR)
+
+    # 如果找不到文件，显示错误信息
+    if not file_list:
+        print(f"错误：在 {DATA_DIR} 找不到任何数据文件！")
+        print("请检查以下情况:")
+        print("1. 确保已运行预处理脚本")
+        print("2. 检查 --input_dir 参数是否正确")
+        print("3. 预处理输出目录应包含 comments_*.txt 或 all_comments.txt 文件")
+        print(f"目录内容: {os.listdir(DATA_DIR)}")
+        exit(1)
+
+    print(f"找到 {len(file_list)} 个数据文件:")
+    for i, path in enumerate(file_list, 1):
+        print(f"{i}. {os.path.abspath(path)}")
+    print(f"背景图片路径: {BACKGROUND_IMG}")
+
+    render_all(file_list, args.output_dir, args.workers, fast=args.fast,
+               fmt=args.format or 'png', scale=args.scale or 1.0, layout_json=args.layout_json)
+
+    print("\n所有文件处理完成!")
+    print(f"输出文件保存在: {os.path.abspath(args.output_dir)}")
+
+
+if __name__ == '__main__':
+    main()
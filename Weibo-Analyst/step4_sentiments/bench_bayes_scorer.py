@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量化贝叶斯打分器 vs SnowNLP：结果一致性检查与吞吐量对比
+"""
+import os
+import time
+import logging
+import argparse
+
+import numpy as np
+
+from bayes_scorer import BayesScorer, PROJECT_MODEL, SCRIPT_DIR, jieba_tokenize
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+DEFAULT_CORPUS = [
+    os.path.join(SCRIPT_DIR, "model_evaluation", "eva_data.dat"),
+    os.path.join(SCRIPT_DIR, "train_model", "negative_dict.txt"),
+    os.path.join(SCRIPT_DIR, "train_model", "positive_dict.txt"),
+]
+
+
+def load_texts(paths):
+    texts = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.extend(line.strip() for line in f if line.strip())
+    return texts
+
+
+def timed(label, func, n):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    logging.info(f"⚡ {label}: {n/elapsed:,.0f} 条/秒 ({elapsed:.2f}s)")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='情感打分器一致性与吞吐量测试')
+    parser.add_argument('--model', type=str, default=PROJECT_MODEL,
+                        help='SnowNLP marshal 模型路径（不含 .3 后缀）')
+    parser.add_argument('--corpus', nargs='+', default=DEFAULT_CORPUS,
+                        help='测试文本文件，每行一条')
+    parser.add_argument('--tolerance', type=float, default=1e-9,
+                        help='与 SnowNLP 结果允许的最大绝对误差')
+    args = parser.parse_args()
+
+    texts = load_texts(args.corpus)
+    n = len(texts)
+    logging.info(f"📊 测试文本: {n} 条")
+
+    from snownlp import SnowNLP, sentiment
+    sentiment.load(args.model)
+    expected = timed("SnowNLP 逐条打分",
+                     lambda: np.array([SnowNLP(t).sentiments for t in texts]), n)
+
+    scorer = BayesScorer.load_marshal(args.model)
+    tokens = timed("SnowNLP 分词", lambda: [scorer.tokenizer(t) for t in texts], n)
+    vectorized = timed("BayesScorer 矩阵打分（已分词）", lambda: scorer.score_tokens(tokens), n)
+    timed("BayesScorer 端到端", lambda: scorer.score(texts), n)
+
+    diff = np.abs(vectorized - expected).max()
+    if diff <= args.tolerance:
+        logging.info(f"✅ 与 SnowNLP 结果一致 (最大误差 {diff:.2e})")
+    else:
+        logging.error(f"❌ 与 SnowNLP 结果不一致 (最大误差 {diff:.2e})")
+
+    # jieba 分词版本：速度更快，但分词与训练时不同，报告判定一致率
+    fast = BayesScorer.load_marshal(args.model, tokenizer=jieba_tokenize)
+    fast.score(texts[:10])  # 预热 jieba 词典
+    fast_scores = timed("BayesScorer + jieba 分词", lambda: fast.score(texts), n)
+    agree = np.mean((fast_scores >= 0.5) == (expected >= 0.5))
+    logging.info(f"📊 jieba 分词版本与 SnowNLP 判定一致率: {agree:.2%}")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词典打分器 vs 贝叶斯模型：吞吐量与判定一致率对比（model_evaluation/eva_data.dat）
+"""
+import os
+import time
+import logging
+import argparse
+
+import numpy as np
+
+from bayes_scorer import BayesScorer, PROJECT_MODEL, SCRIPT_DIR
+from lexicon_scorer import LexiconScorer, POSITIVE_DICT, NEGATIVE_DICT
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+EVA_DATA = os.path.join(SCRIPT_DIR, "model_evaluation", "eva_data.dat")
+EVA_LABEL = os.path.join(SCRIPT_DIR, "model_evaluation", "eva_label.dat")
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f]
+
+
+def timed(label, func, n):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    logging.info(f"⚡ {label}: {n/elapsed:,.0f} 条/秒 ({elapsed:.3f}s)")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='词典打分器与贝叶斯模型对比')
+    parser.add_argument('--model', type=str, default=PROJECT_MODEL,
+                        help='SnowNLP marshal 模型路径（不含 .3 后缀）')
+    parser.add_argument('--data', type=str, default=EVA_DATA, help='评测文本，每行一条')
+    parser.add_argument('--labels', type=str, default=EVA_LABEL, help='评测标签 (1 / -1)')
+    parser.add_argument('--repeat', type=int, default=20,
+                        help='吞吐量测试时重复评测文本的次数（评测集较小）')
+    args = parser.parse_args()
+
+    texts = read_lines(args.data)
+    labels = np.array([int(l) for l in read_lines(args.labels)[:len(texts)]])
+    texts = texts[:len(labels)]
+    logging.info(f"📊 评测文本: {len(texts)} 条，吞吐量测试 {len(texts) * args.repeat} 条")
+
+    start = time.perf_counter()
+    lexicon = LexiconScorer.from_dicts(POSITIVE_DICT, NEGATIVE_DICT)
+    logging.info(f"⏱️ 词典自动机构建: {time.perf_counter() - start:.3f}s")
+    bayes = BayesScorer.load_marshal(args.model)
+
+    big = texts * args.repeat
+    timed("LexiconScorer 打分", lambda: lexicon.score(big), len(big))
+    timed("BayesScorer 端到端", lambda: bayes.score(big), len(big))
+
+    lex_scores = lexicon.score(texts)
+    bayes_scores = bayes.score(texts)
+    lex_pred = np.where(lex_scores >= 0.5, 1, -1)
+    bayes_pred = np.where(bayes_scores >= 0.5, 1, -1)
+
+    covered = lex_scores != 0.5
+    logging.info(f"📊 词典命中覆盖率: {covered.mean():.2%}")
+    logging.info(f"📊 与贝叶斯模型判定一致率: {np.mean(lex_pred == bayes_pred):.2%} "
+                 f"(命中部分 {np.mean(lex_pred[covered] == bayes_pred[covered]):.2%})")
+    logging.info(f"📊 准确率: 词典 {np.mean(lex_pred == labels):.2%}, 贝叶斯 {np.mean(bayes_pred == labels):.2%}")
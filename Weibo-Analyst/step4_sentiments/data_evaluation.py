@@ -6,105 +6,29 @@
 import os
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# 导入其他模块
-from snownlp import SnowNLP
-import matplotlib.pyplot as plt
+# 导入其他模块（绘图在 sentiment_charts 中进行，matplotlib 只在绘图时导入）
 import logging
 import pymysql
-import numpy as np
-import matplotlib as mpl
-import warnings
+import multiprocessing as mp
+import argparse
+from collections import deque
 
-# -------------------- 全局字体配置 --------------------
-# 禁用所有 matplotlib 警告
-warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib")
-warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib.font_manager")
+from bayes_scorer import BayesScorer
+from lexicon_scorer import LexiconScorer
+from score_cache import ScoreCache, DEFAULT_CACHE_PATH, text_key
+from sentiment_stats import SentimentAggregator
+from sentiment_charts import RESULTS_DIR, save_summary, render_charts
 
-# 设置默认字体
-mpl.rcParams['font.family'] = 'sans-serif'
-mpl.rcParams['font.sans-serif'] = ['DejaVu Sans']
-mpl.rcParams['axes.unicode_minus'] = False
-
-# 字体路径配置
-FONT_PATHS = [
-    os.path.join(SCRIPT_DIR, "fonts", "msyh.ttf"),
-    os.path.join(SCRIPT_DIR, "fonts", "simhei.ttf"),
-    os.path.join(SCRIPT_DIR, "msyh.ttf"),
-    "/usr/share/fonts/truetype/microsoft/msyh.ttf",
-    "/usr/share/fonts/truetype/msyh.ttf",
-    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
-    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"
-]
-
-# 备选字体列表
-CHINESE_FONTS = [
-    'WenQuanYi Micro Hei', 
-    'WenQuanYi Zen Hei', 
-    'Noto Sans CJK SC',
-    'Microsoft YaHei', 
-    'SimHei', 
-    'KaiTi', 
-    'SimSun',
-    'DejaVu Sans'
-]
-
-def setup_chinese_font():
-    """配置中文字体支持"""
-    import matplotlib.font_manager as fm
-    from matplotlib import rcParams
-    
-    # 尝试多种字体路径
-    for font_path in FONT_PATHS:
-        if os.path.exists(font_path):
-            try:
-                # 注册字体
-                fm.fontManager.addfont(font_path)
-                font_prop = fm.FontProperties(fname=font_path)
-                font_name = font_prop.get_name()
-                
-                # 设置全局字体
-                rcParams['font.family'] = 'sans-serif'
-                rcParams['font.sans-serif'] = [font_name]
-                rcParams['axes.unicode_minus'] = False
-                
-                logging.info(f"✅ 使用中文字体文件: {font_path}")
-                return font_prop
-            except Exception as e:
-                logging.warning(f"⚠️ 字体文件 {font_path} 加载失败: {str(e)}")
-    
-    # 尝试使用系统字体
-    available_fonts = fm.get_font_names()
-    for font_name in CHINESE_FONTS:
-        if font_name in available_fonts:
-            try:
-                rcParams['font.family'] = 'sans-serif'
-                rcParams['font.sans-serif'] = [font_name]
-                rcParams['axes.unicode_minus'] = False
-                logging.info(f"✅ 使用系统字体: {font_name}")
-                return fm.FontProperties(family=font_name)
-            except:
-                continue
-    
-    # 使用通用回退方案
-    logging.warning("⚠️ 使用通用回退字体 DejaVu Sans")
-    rcParams['font.family'] = 'sans-serif'
-    rcParams['font.sans-serif'] = ['DejaVu Sans']
-    rcParams['axes.unicode_minus'] = False
-    return fm.FontProperties(family='DejaVu Sans')
-
-# 日志配置
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(os.path.join(SCRIPT_DIR, "sentiment_analysis.log"))
-    ]
-)
-
-# 初始化字体
-chinese_font = setup_chinese_font()
-# -------------------- 字体配置结束 --------------------
+def setup_logging():
+    """日志配置（作为脚本运行时调用，导入本模块不会改动日志设置）"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler(os.path.join(SCRIPT_DIR, "sentiment_analysis.log"))
+        ]
+    )
 
 # 数据库配置
 DB_CONFIG = {
@@ -116,17 +40,162 @@ DB_CONFIG = {
     'cursorclass': pymysql.cursors.DictCursor
 }
 
-def analyze_sentiment(weibo_ids):
-    """分析指定微博评论的情感倾向（适配实际数据库结构）"""
+# 情感模型：None 表示 SnowNLP 自带模型（与 SnowNLP(content).sentiments 一致）；
+# .smodel 文件为只读 mmap 格式（bayes_scorer.py 导出），各进程共享内存且启动更快
+SENTIMENT_MODEL = None
+
+# 打分方式：bayes 为贝叶斯模型；lexicon 为词典自动机（更快，仅作粗略极性信号）
+ENGINES = ('bayes', 'lexicon')
+
+# 每个进程只加载一次的打分器
+_scorer = None
+
+
+def _init_worker(model_path=SENTIMENT_MODEL, engine='bayes'):
+    """工作进程初始化：加载一次情感模型"""
+    global _scorer
+    if engine == 'lexicon':
+        _scorer = LexiconScorer.from_dicts()
+    elif model_path and model_path.endswith('.smodel'):
+        _scorer = BayesScorer.load_mmap(model_path)
+    else:
+        _scorer = BayesScorer.load_marshal(model_path)
+
+
+def _score_chunk(texts):
+    """对一批评论打分，空评论返回 None，保持输入顺序
+
+    整批打分出错时退回逐条打分，出错的评论记录日志并返回 None，不影响同批的其他评论
+    """
+    scores = [None] * len(texts)
+    valid = [i for i, t in enumerate(texts) if t and t.strip()]
+    if not valid:
+        return scores
+    try:
+        values = _scorer.score([texts[i] for i in valid]).tolist()
+    except Exception as e:
+        logging.warning(f"⚠️ 整批打分失败，改为逐条打分: {str(e)}")
+        values = []
+        for i in valid:
+            try:
+                values.append(float(_scorer.score([texts[i]])[0]))
+            except Exception as e:
+                logging.error(f"❌ 分析评论失败: {str(e)}")
+                values.append(None)
+    for i, v in zip(valid, values):
+        scores[i] = v
+    return scores
+
+
+def imap_bounded(pool, func, items, max_pending):
+    """按顺序返回结果的 imap，最多同时挂起 max_pending 个任务
+
+    Pool.imap 会在后台线程里一次性读完输入，这里限制在途的块数，
+    使读取数据库的速度跟随打分速度，内存占用有界。
+    items 产生 (参数, 附带信息)，返回 (结果, 附带信息)。
+    """
+    pending = deque()
+    for arg, meta in items:
+        pending.append((pool.apply_async(func, (arg,)), meta))
+        if len(pending) >= max_pending:
+            result, meta = pending.popleft()
+            yield result.get(), meta
+    while pending:
+        result, meta = pending.popleft()
+        yield result.get(), meta
+
+
+def score_chunks(chunks, pool=None, max_pending=2, cache=None):
+    """逐块打分并按原顺序返回 (分数列表, 点赞数列表)
+
+    chunks 产生 (评论列表, 点赞数列表)，点赞数原样随分数返回。
+    有缓存时先在主进程批量查询，只把未命中的评论交给打分进程，结果批量写回缓存。
+    """
+    def prepare():
+        for texts, likes in chunks:
+            if cache is None:
+                yield texts, (likes, None, None)
+                continue
+            keys = [text_key(t) if t and t.strip() else None for t in texts]
+            cached = cache.lookup(k for k in keys if k is not None)
+            missing = [t for t, k in zip(texts, keys) if k is not None and k not in cached]
+            yield missing, (likes, keys, cached)
+
+    if pool is not None:
+        results = imap_bounded(pool, _score_chunk, prepare(), max_pending)
+    else:
+        results = ((_score_chunk(arg), meta) for arg, meta in prepare())
+
+    for new_scores, (likes, keys, cached) in results:
+        if cache is None:
+            yield new_scores, likes
+            continue
+        scores = []
+        fresh = {}
+        it = iter(new_scores)
+        hits = 0
+        for k in keys:
+            if k is None:
+                scores.append(None)
+            elif k in cached:
+                scores.append(cached[k])
+                hits += 1
+            else:
+                # 未命中的评论按出现顺序依次取回分数
+                score = next(it)
+                if score is not None:  # 打分失败的评论不写入缓存
+                    fresh[k] = score
+                scores.append(score)
+        cache.record(hits, len(keys) - keys.count(None) - hits)
+        if fresh:
+            cache.store(fresh.items())
+        yield scores, likes
+
+
+def iter_comment_chunks(table_name, content_column, like_column=None, chunk_size=500):
+    """用独立连接和流式游标分块读取 (评论列表, 点赞数列表)，不把整表读入内存
+
+    表中没有点赞列时点赞数全部记为 0。
+    """
+    like_expr = like_column or "0"
+    with pymysql.connect(**dict(DB_CONFIG, cursorclass=pymysql.cursors.SSCursor)) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {content_column}, {like_expr} FROM {table_name}")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [row[0] for row in rows], [row[1] or 0 for row in rows]
+
+
+def analyze_sentiment(weibo_ids, workers=1, chunk_size=500, cache_path=DEFAULT_CACHE_PATH,
+                      engine='bayes'):
+    """分析指定微博评论的情感倾向（适配实际数据库结构）
+
+    workers > 1 时评论按块流式分发到进程池打分，结果按原顺序返回并逐块汇总。
+    cache_path 不为空时按 (模型指纹, 文本哈希) 缓存分数，只对新评论打分。
+    engine 为 lexicon 时用词典自动机代替贝叶斯模型打分。
+    返回各微博的结构化汇总结果列表（出错时返回 None），饼图由 sentiment_charts.render_charts 另行绘制。
+    """
+    pool = None
+    cache = None
+    results = []
     try:
         # 确保输出目录存在
-        output_dir = os.path.join(SCRIPT_DIR, "sentiment_results")
+        output_dir = RESULTS_DIR
         os.makedirs(output_dir, exist_ok=True)
         
         # 连接数据库
         db = pymysql.connect(**DB_CONFIG)
         cursor = db.cursor()
         
+        # 打分进程池（每个进程加载一次模型）；单进程时在本进程加载
+        _init_worker(SENTIMENT_MODEL, engine)
+        if workers > 1:
+            pool = mp.Pool(workers, initializer=_init_worker, initargs=(SENTIMENT_MODEL, engine))
+        if cache_path:
+            cache = ScoreCache(_scorer.fingerprint(), cache_path)
+        
         # 遍历每个微博ID
         for weibo_id in weibo_ids:
             logging.info(f"🔍 开始分析微博ID: {weibo_id}")
@@ -157,101 +226,48 @@ def analyze_sentiment(weibo_ids):
                 continue
                 
             logging.info(f"📝 使用评论内容列: {content_column}")
+            like_column = 'like_count' if 'like_count' in columns else None
             
-            # 构建查询
-            sql = f"SELECT {content_column} FROM {table_name}"
-            
+            # 流式分块打分，单次遍历汇总计数、均值方差、分位数及点赞加权统计
+            stats = SentimentAggregator()
             try:
-                cursor.execute(sql)
-                comments = cursor.fetchall()
-                logging.info(f"📊 找到 {len(comments)} 条评论")
+                chunks = iter_comment_chunks(table_name, content_column, like_column, chunk_size)
+                for scores, likes in score_chunks(chunks, pool, workers * 2, cache):
+                    stats.update(scores, likes)
+                    logging.info(f"📊 已处理 {stats.total_comments} 条评论")
             except pymysql.Error as e:
                 logging.error(f"❌ 查询评论表 {table_name} 失败: {str(e)}")
                 continue
             
-            if not comments:
+            total_comments = stats.total_comments
+            total = stats.total
+            positive, neutral, negative = stats.positive, stats.neutral, stats.negative
+            if not total_comments:
                 logging.warning(f"⚠️ 微博ID {weibo_id} 没有找到评论")
                 continue
-                
-            # 分析情感
-            sentiments = []
-            for i, comment in enumerate(comments):
-                try:
-                    content = comment[content_column]
-                    if not content.strip():
-                        continue
-                        
-                    s = SnowNLP(content)
-                    sentiments.append(s.sentiments)
-                    
-                    # 每处理100条评论输出一次进度
-                    if (i + 1) % 100 == 0:
-                        logging.info(f"📊 已处理 {i+1}/{len(comments)} 条评论")
-                except Exception as e:
-                    logging.error(f"❌ 分析评论失败: {str(e)}")
-                    continue
             
             # 计算平均情感值
-            if not sentiments:
+            if not total:
                 logging.warning(f"⚠️ 微博ID {weibo_id} 没有有效的情感分析结果")
                 continue
                 
-            avg_sentiment = np.mean(sentiments)
-            logging.info(f"📊 微博ID {weibo_id} 平均情感值: {avg_sentiment:.4f}")
-            
-            # 分类情感
-            positive = sum(1 for s in sentiments if s > 0.6)
-            neutral = sum(1 for s in sentiments if 0.4 <= s <= 0.6)
-            negative = sum(1 for s in sentiments if s < 0.4)
-            total = len(sentiments)
-            
-            # 绘制饼图
-            labels = ['正面', '中性', '负面']
-            sizes = [positive, neutral, negative]
-            colors = ['#66b3ff', '#99ff99', '#ff9999']
-            
-            plt.figure(figsize=(8, 6), dpi=100)
+            summary = stats.summary()
+            avg_sentiment = summary['mean']
+            logging.info(f"📊 微博ID {weibo_id} 平均情感值: {avg_sentiment:.4f} "
+                         f"(点赞加权: {summary['weighted_mean']:.4f})")
+            if cache is not None:
+                cache.report()
             
-            # 使用更简洁的百分比显示
-            def format_percent(p):
-                return f'{p:.1f}%'
-            
-            wedges, texts, autotexts = plt.pie(
-                sizes, 
-                labels=labels, 
-                colors=colors, 
-                autopct=format_percent,
-                shadow=True, 
-                startangle=90
-            )
-            
-            # 在饼图中心添加总数信息
-            plt.text(0, 0, f'总评论数: {total}', 
-                     ha='center', va='center', 
-                     fontsize=12)
-            
-            plt.axis('equal')
-            plt.title(f'微博ID {weibo_id} 评论情感分布', fontsize=14)
-            
-            # 添加图例
-            plt.legend(wedges, labels,
-                      title="情感分类",
-                      loc="center left",
-                      bbox_to_anchor=(1, 0, 0.5, 1))
-            
-            # 保存图表
-            output_path = os.path.join(output_dir, f"sentiment_{weibo_id}.png")
-            plt.tight_layout()
-            plt.savefig(output_path, bbox_inches='tight', dpi=300)
-            plt.close()
-            logging.info(f"💾 保存情感分析图表至: {output_path}")
+            # 先输出结构化结果，饼图在分析结束、数据库连接关闭后统一绘制
+            results.append(dict(summary, weibo_id=weibo_id))
+            save_summary(results[-1], output_dir)
             
             # 保存原始数据
             data_path = os.path.join(output_dir, f"sentiment_data_{weibo_id}.txt")
             with open(data_path, 'w', encoding='utf-8') as f:
                 f.write(f"微博ID: {weibo_id}\n")
-                f.write(f"评论数量: {len(comments)}\n")
-                f.write(f"有效评论: {len(sentiments)}\n")
+                f.write(f"评论数量: {total_comments}\n")
+                f.write(f"有效评论: {total}\n")
                 f.write(f"正面评论: {positive}\n")
                 f.write(f"中性评论: {neutral}\n")
                 f.write(f"负面评论: {negative}\n")
@@ -260,20 +276,53 @@ def analyze_sentiment(weibo_ids):
                 f.write(f"正面 (>0.6): {positive/total*100:.2f}% ({positive})\n")
                 f.write(f"中性 (0.4-0.6): {neutral/total*100:.2f}% ({neutral})\n")
                 f.write(f"负面 (<0.4): {negative/total*100:.2f}% ({negative})\n")
+                f.write(f"\n情感值标准差: {summary['std']:.4f}\n")
+                f.write("情感值分位数: " + ", ".join(
+                    f"P{float(q)*100:.0f}={v:.4f}" for q, v in summary['quantiles'].items()) + "\n")
+                f.write("\n点赞加权 (权重 = 1 + 点赞数):\n")
+                f.write(f"加权平均情感值: {summary['weighted_mean']:.4f}\n")
+                f.write(f"加权标准差: {summary['weighted_std']:.4f}\n")
+                f.write("加权分位数: " + ", ".join(
+                    f"P{float(q)*100:.0f}={v:.4f}" for q, v in summary['weighted_quantiles'].items()) + "\n")
+                w_pos, w_neu, w_neg = summary['weighted_shares']
+                f.write(f"加权分布: 正面 {w_pos*100:.2f}%, 中性 {w_neu*100:.2f}%, 负面 {w_neg*100:.2f}%\n")
         
-        return True
+        return results
         
     except Exception as e:
         logging.error(f"❌ 情感分析过程中出错: {str(e)}")
         import traceback
         logging.error(traceback.format_exc())
-        return False
+        return None
     finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if cache is not None:
+            cache.close()
         if 'db' in locals() and db.open:
             db.close()
             logging.info("🔌 数据库连接已关闭")
         
 if __name__ == '__main__':
+    setup_logging()
+    parser = argparse.ArgumentParser(description='微博评论情感分析')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='打分进程数，1 表示在当前进程打分')
+    parser.add_argument('--chunk_size', type=int, default=500,
+                        help='每次分发给进程的评论条数')
+    parser.add_argument('--cache_path', type=str, default=DEFAULT_CACHE_PATH,
+                        help='情感分数缓存文件 (SQLite)')
+    parser.add_argument('--no_cache', action='store_true',
+                        help='不使用分数缓存，全部重新打分')
+    parser.add_argument('--engine', choices=ENGINES, default='bayes',
+                        help='打分方式：bayes 贝叶斯模型，lexicon 词典自动机（无需分词，更快）')
+    parser.add_argument('--render_workers', type=int, default=1,
+                        help='分析结束后绘制饼图的进程数')
+    parser.add_argument('--force_render', action='store_true',
+                        help='汇总未变化时也重新绘制饼图')
+    args = parser.parse_args()
+    
     # 需要分析的微博ID列表
     weibo_ids = [1, 2, 3, 4, 5]
     
@@ -283,7 +332,11 @@ if __name__ == '__main__':
     logging.info(f"脚本所在目录: {SCRIPT_DIR}")
     logging.info("="*60)
     
-    if analyze_sentiment(weibo_ids):
+    cache_path = None if args.no_cache else args.cache_path
+    results = analyze_sentiment(weibo_ids, args.workers, args.chunk_size, cache_path, args.engine)
+    if results is not None:
+        # 绘图不在分析关键路径上：数据库连接已关闭，按批绘制（可并行），汇总未变化的跳过
+        render_charts(results, RESULTS_DIR, args.render_workers, args.force_render)
         logging.info("\n🎉 所有微博情感分析完成!")
     else:
         logging.error("\n❌ 处理过程中遇到错误")
\ No newline at end of file
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词典情感打分（Aho-Corasick 自动机）
+
+把正面/负面词典、否定词和程度副词编译成一个 Aho-Corasick 自动机，
+对原始评论单次线性扫描、无需分词即可得到情感倾向，
+适合只需要粗略极性信号的大批量场景（比贝叶斯模型快，但精度更低）。
+"""
+import os
+import hashlib
+import logging
+
+import numpy as np
+from scipy.special import expit
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+POSITIVE_DICT = os.path.join(SCRIPT_DIR, "train_model", "positive_dict.txt")
+NEGATIVE_DICT = os.path.join(SCRIPT_DIR, "train_model", "negative_dict.txt")
+
+# 否定词：翻转其后最近一个情感词的极性
+NEGATION_WORDS = (
+    '不', '没', '没有', '无', '非', '未', '别', '莫', '勿', '不是', '并不',
+    '并没有', '毫不', '从不', '从未', '绝不', '不太', '不怎么', '不够',
+)
+
+# 程度副词及倍数：放大其后最近一个情感词的权重
+INTENSIFIER_WORDS = {
+    '极其': 2.0, '极度': 2.0, '最': 2.0, '超级': 2.0, '太': 1.8, '非常': 1.8,
+    '特别': 1.8, '十分': 1.8, '真是': 1.5, '超': 1.5, '很': 1.5, '挺': 1.3,
+    '真': 1.3, '好': 1.2, '更': 1.2, '比较': 1.1, '有点': 0.8, '有些': 0.8, '稍微': 0.6,
+}
+
+# 修饰词与情感词之间最多相隔的字符数
+MAX_GAP = 2
+
+# 模式种类
+SENTIMENT, NEGATION, INTENSIFIER = 0, 1, 2
+
+
+def load_lexicon(path):
+    """读取词典，每行一个词或短语，去掉其中的空白"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            word = ''.join(line.split()).lstrip('\ufeff')
+            if word:
+                yield word
+
+
+class LexiconScorer:
+    """Aho-Corasick 词典打分器
+
+    自动机状态用 dict 转移表 + 失配指针表示，每个状态预先记下以它结尾的最长模式，
+    扫描时每个字符 O(1) 取得候选匹配，按"最左最长、互不重叠"挑出词，
+    再把否定词/程度副词作用到紧随其后的情感词上。
+    打分 = sigmoid(Σ 极性 × 权重)，无命中时为 0.5，取值区间与贝叶斯模型一致。
+    """
+
+    def __init__(self, polarity, negations=NEGATION_WORDS,
+                 intensifiers=INTENSIFIER_WORDS, max_gap=MAX_GAP):
+        self.max_gap = max_gap
+        # 模式表：(长度, 种类, 数值)；情感词的数值为极性权重
+        self.patterns = []
+        words = {}
+        for word, value in sorted(intensifiers.items()):
+            words[word] = (INTENSIFIER, value)
+        for word in sorted(negations):
+            words[word] = (NEGATION, -1.0)
+        # 情感词覆盖同名修饰词（如"不好"作为整体是负面词）
+        for word, value in sorted(polarity.items()):
+            if value:
+                words[word] = (SENTIMENT, value)
+        self._build(words)
+
+    @classmethod
+    def from_dicts(cls, positive_path=POSITIVE_DICT, negative_path=NEGATIVE_DICT, **kwargs):
+        """由正面/负面词典构造；同时出现在两个词典中的词按出现次数相抵"""
+        polarity = {}
+        for word in load_lexicon(positive_path):
+            polarity[word] = polarity.get(word, 0) + 1
+        for word in load_lexicon(negative_path):
+            polarity[word] = polarity.get(word, 0) - 1
+        polarity = {w: float(np.sign(v)) for w, v in polarity.items() if v}
+        return cls(polarity, **kwargs)
+
+    def _build(self, words):
+        goto = [{}]
+        terminal = [-1]
+        for word, (kind, value) in words.items():
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    terminal.append(-1)
+                state = nxt
+            terminal[state] = len(self.patterns)
+            self.patterns.append((len(word), kind, value))
+
+        # 广度优先计算失配指针；out[s] 为以状态 s 结尾的最长模式
+        fail = [0] * len(goto)
+        out = list(terminal)
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if state else 0
+                if out[nxt] < 0:
+                    out[nxt] = out[fail[nxt]]
+        self.goto = goto
+        self.fail = fail
+        self.out = out
+        self.n_states = len(goto)
+        logging.info(f"🔤 词典自动机: {len(self.patterns)} 个模式, {self.n_states} 个状态")
+
+    def fingerprint(self):
+        """模式表指纹，用于分数缓存"""
+        h = hashlib.sha1(b'lexicon')
+        h.update(repr((self.max_gap, self.patterns)).encode('utf-8'))
+        h.update(repr([sorted(g.items()) for g in self.goto]).encode('utf-8'))
+        return h.hexdigest()
+
+    def matches(self, text):
+        """单次扫描，返回最左最长、互不重叠的匹配 [(起点, 终点, 模式编号)]；空白字符被跳过"""
+        goto, fail, out, patterns = self.goto, self.fail, self.out, self.patterns
+        accepted = []
+        state = 0
+        pos = 0
+        for ch in text:
+            if ch.isspace():
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            pos += 1
+            pid = out[state]
+            if pid < 0:
+                continue
+            start = pos - patterns[pid][0]
+            # 新匹配覆盖之前的匹配时替换之，部分重叠时保留先出现的
+            while accepted and start <= accepted[-1][0]:
+                accepted.pop()
+            if accepted and start < accepted[-1][1]:
+                continue
+            accepted.append((start, pos, pid))
+        return accepted
+
+    def raw_score(self, text):
+        """情感词极性加权和，正数偏正面、负数偏负面"""
+        patterns = self.patterns
+        total = 0.0
+        sign = 1.0
+        boost = 1.0
+        last_end = None
+        for start, end, pid in self.matches(text):
+            _, kind, value = patterns[pid]
+            if last_end is not None and start - last_end > self.max_gap:
+                sign, boost = 1.0, 1.0
+            if kind == SENTIMENT:
+                total += sign * boost * value
+                sign, boost = 1.0, 1.0
+                last_end = None
+                continue
+            if kind == NEGATION:
+                sign = -sign
+            else:
+                boost *= value
+            last_end = end
+        return total
+
+    def score(self, texts):
+        """批量打分，返回 [0, 1] 区间的正面倾向数组"""
+        return expit(np.fromiter((self.raw_score(t) for t in texts),
+                                 dtype=np.float64, count=len(texts)))
@@ -1,51 +1,227 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+情感模型评测
 
+每个打分引擎对评测集批量打分一次，之后的阈值扫描、精确率/召回率/F1、
+混淆矩阵和 ROC/AUC 都在 NumPy 数组上向量化计算；
+同时记录模型加载时间和打分吞吐量，便于比较不同引擎的速度与质量。
+"""
 import os
+import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing as mp
 
-# 获取当前文件所在目录
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
+import numpy as np
+from scipy.stats import rankdata
 
-# 配置结果文件路径（在本目录）
-result_path = os.path.join(current_dir, "eva_result.dat")
-print(f"结果文件将保存至: {result_path}")
+# 获取当前文件所在目录及父目录（step4_sentiments）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
 
-# 配置数据文件路径（使用相对路径）
+# 配置数据与结果文件路径（在本目录）
 eva_data_path = os.path.join(current_dir, "eva_data.dat")
 eva_label_path = os.path.join(current_dir, "eva_label.dat")
+result_path = os.path.join(current_dir, "eva_result.dat")
+report_path = os.path.join(current_dir, "eva_report.json")
+sweep_path = os.path.join(current_dir, "eva_sweep.csv")
 
-# 获取父目录路径（step4_sentiments）
-parent_dir = os.path.dirname(current_dir)
+# 位于 train_model 文件夹中的模型（marshal 格式及其导出的只读 mmap 格式）
+MODEL_PATH = os.path.join(parent_dir, "train_model", "my_sentiment.marshal")
+MMAP_MODEL_PATH = os.path.join(parent_dir, "train_model", "my_sentiment.smodel")
+
+ENGINES = ('snownlp', 'bayes', 'mmap', 'lexicon')
+
+
+def load_engine(name, model_path=MODEL_PATH):
+    """加载打分引擎，返回 texts -> 正面概率数组 的函数
+
+    mmap 引擎在 model_path 为 .smodel 文件时使用它，否则使用默认的 MMAP_MODEL_PATH
+    """
+    if name == 'snownlp':
+        from snownlp import sentiment, SnowNLP
+        sentiment.load(model_path)
+        return lambda texts: np.array([SnowNLP(t).sentiments for t in texts])
+    if name == 'bayes':
+        from bayes_scorer import BayesScorer
+        return BayesScorer.load_marshal(model_path).score
+    if name == 'mmap':
+        from bayes_scorer import BayesScorer
+        path = model_path if model_path and model_path.endswith('.smodel') else MMAP_MODEL_PATH
+        return BayesScorer.load_mmap(path).score
+    if name == 'lexicon':
+        from lexicon_scorer import LexiconScorer
+        return LexiconScorer.from_dicts().score
+    raise ValueError(f"未知的打分引擎: {name}")
+
+
+def read_lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f]
+
+
+def read_pairs(data_path, label_path):
+    """按行配对读取评测文本与标签，行数不同时报错；任一侧为空行的样本整对跳过"""
+    texts, labels = read_lines(data_path), read_lines(label_path)
+    if len(texts) != len(labels):
+        raise ValueError(f"评测文本与标签行数不一致: {data_path} {len(texts)} 行, {label_path} {len(labels)} 行")
+    pairs = [(t, int(l)) for t, l in zip(texts, labels) if t and l]
+    return [t for t, _ in pairs], np.array([l for _, l in pairs], dtype=np.int64)
+
+
+def confusion_counts(scores, labels, thresholds):
+    """所有阈值下的 TP/FP/FN/TN，形如 (阈值数,)；正类为标签 1"""
+    pred = scores[None, :] >= thresholds[:, None]
+    pos = labels == 1
+    tp = (pred & pos).sum(axis=1)
+    fp = (pred & ~pos).sum(axis=1)
+    fn = pos.sum() - tp
+    tn = (~pos).sum() - fp
+    return tp, fp, fn, tn
+
+
+def safe_div(a, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    return np.divide(a, b, out=np.zeros_like(a), where=b > 0)
+
+
+def threshold_sweep(scores, labels, thresholds):
+    """向量化阈值扫描，返回各阈值下的指标数组"""
+    tp, fp, fn, tn = confusion_counts(scores, labels, thresholds)
+    precision = safe_div(tp, tp + fp)
+    recall = safe_div(tp, tp + fn)
+    f1 = safe_div(2 * precision * recall, precision + recall)
+    # 负类的指标（评测集中负面评论占多数）
+    neg_precision = safe_div(tn, tn + fn)
+    neg_recall = safe_div(tn, tn + fp)
+    neg_f1 = safe_div(2 * neg_precision * neg_recall, neg_precision + neg_recall)
+    return {
+        'threshold': thresholds,
+        'precision': precision, 'recall': recall, 'f1': f1,
+        'neg_precision': neg_precision, 'neg_recall': neg_recall, 'neg_f1': neg_f1,
+        'macro_f1': (f1 + neg_f1) / 2,
+        'accuracy': safe_div(tp + tn, tp + fp + fn + tn),
+        'tpr': recall, 'fpr': safe_div(fp, fp + tn),
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+    }
+
+
+def roc_auc(scores, labels):
+    """AUC = Mann-Whitney U / (正例数 × 负例数)，并列分数取平均秩"""
+    pos = labels == 1
+    n_pos, n_neg = pos.sum(), (~pos).sum()
+    if not n_pos or not n_neg:
+        return float('nan')
+    ranks = rankdata(scores)
+    return float((ranks[pos].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+
+def evaluate(name, texts, labels, thresholds, model_path=MODEL_PATH, repeat=1):
+    """加载并评测一个引擎，返回 (汇总指标, 扫描结果, 分数)"""
+    # 加载时间包含首次打分的预热（分词模型等按需加载的资源）
+    start = time.perf_counter()
+    score = load_engine(name, model_path)
+    score(texts[:1])
+    load_time = time.perf_counter() - start
+
+    batch = texts * repeat
+    start = time.perf_counter()
+    scores = np.asarray(score(batch), dtype=np.float64)[:len(texts)]
+    score_time = time.perf_counter() - start
+
+    sweep = threshold_sweep(scores, labels, thresholds)
+    at_half = int(np.argmin(np.abs(thresholds - 0.5)))
+    best = int(np.argmax(sweep['macro_f1']))
+
+    def point(i):
+        return {
+            'threshold': float(thresholds[i]),
+            'accuracy': float(sweep['accuracy'][i]),
+            'precision': float(sweep['precision'][i]),
+            'recall': float(sweep['recall'][i]),
+            'f1': float(sweep['f1'][i]),
+            'neg_precision': float(sweep['neg_precision'][i]),
+            'neg_recall': float(sweep['neg_recall'][i]),
+            'neg_f1': float(sweep['neg_f1'][i]),
+            'macro_f1': float(sweep['macro_f1'][i]),
+            # 混淆矩阵：行为真实 [正, 负]，列为预测 [正, 负]
+            'confusion': [[int(sweep['tp'][i]), int(sweep['fn'][i])],
+                          [int(sweep['fp'][i]), int(sweep['tn'][i])]],
+        }
+
+    summary = {
+        'engine': name,
+        'load_time': load_time,
+        'throughput': len(batch) / score_time if score_time > 0 else float('inf'),
+        'auc': roc_auc(scores, labels),
+        'at_0.5': point(at_half),
+        'best_macro_f1': point(best),
+    }
+    return summary, sweep, scores
+
+
+def print_summary(s):
+    print(f"\n==== {s['engine']} ====")
+    print(f"模型加载: {s['load_time']:.3f}s, 打分吞吐量: {s['throughput']:,.0f} 条/秒")
+    print(f"ROC AUC: {s['auc']:.4f}")
+    for key, title in (('at_0.5', '阈值 0.5'), ('best_macro_f1', '最佳阈值 (macro F1)')):
+        p = s[key]
+        (tp, fn), (fp, tn) = p['confusion']
+        print(f"[{title} = {p['threshold']:.2f}] 准确率 {p['accuracy']:.2%}, "
+              f"正类 P/R/F1 {p['precision']:.3f}/{p['recall']:.3f}/{p['f1']:.3f}, "
+              f"负类 P/R/F1 {p['neg_precision']:.3f}/{p['neg_recall']:.3f}/{p['neg_f1']:.3f}, "
+              f"macro F1 {p['macro_f1']:.3f}")
+        print(f"    混淆矩阵  预测正  预测负\n    真实正  {tp:6d}  {fn:6d}\n    真实负  {fp:6d}  {tn:6d}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='情感模型评测与引擎对比')
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=['mmap'],
+                        help='参与评测的打分引擎')
+    parser.add_argument('--model', type=str, default=MODEL_PATH,
+                        help='SnowNLP marshal 模型路径（不含 .3 后缀）；mmap 引擎可指定 .smodel 文件')
+    parser.add_argument('--steps', type=int, default=101, help='阈值扫描点数（0~1 均匀分布）')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='测吞吐量时重复评测集的次数（评测集较小时可调大）')
+    args = parser.parse_args()
+
+    texts, labels = read_pairs(eva_data_path, eva_label_path)
+    n = len(texts)
+    thresholds = np.linspace(0, 1, args.steps)
+    print(f"评测样本: {n} 条 (正面 {int((labels == 1).sum())}, 负面 {int((labels != 1).sum())})")
+
+    summaries = []
+    with open(sweep_path, "w", encoding="utf-8", newline="") as f_sweep:
+        writer = csv.writer(f_sweep)
+        columns = ['threshold', 'accuracy', 'precision', 'recall', 'f1',
+                   'neg_precision', 'neg_recall', 'neg_f1', 'macro_f1', 'tpr', 'fpr']
+        writer.writerow(['engine'] + columns)
+        for i, name in enumerate(args.engines):
+            # 每个引擎在全新进程中评测，避免共用已加载的分词模型而低估加载时间
+            with mp.get_context('spawn').Pool(1) as pool:
+                summary, sweep, scores = pool.apply(
+                    evaluate, (name, texts, labels, thresholds, args.model, args.repeat))
+            summaries.append(summary)
+            print_summary(summary)
+            writer.writerows([name] + [f"{sweep[c][j]:.6g}" for c in columns]
+                             for j in range(len(thresholds)))
+            # 第一个引擎在 0.5 阈值下的判定结果写入结果文件
+            if i == 0:
+                with open(result_path, "w", encoding="utf-8") as f_result:
+                    f_result.write("\n".join("1" if s >= 0.5 else "-1" for s in scores))
+
+    with open(report_path, "w", encoding="utf-8") as f_report:
+        json.dump(summaries, f_report, ensure_ascii=False, indent=2)
 
-# 初始化情感分析模型# 加载位于train_model文件夹中的模型
-from snownlp import sentiment
-sentiment.load(os.path.join(parent_dir, "train_model", "my_sentiment.marshal"))
-from snownlp import SnowNLP
-
-# 处理数据并写入结果
-results = []
-with open(eva_data_path, "r", encoding="utf-8") as f_data:
-    for line in f_data:
-        s = SnowNLP(line.strip())
-        eva_label = 1 if s.sentiments >= 0.5 else -1
-        results.append(str(eva_label))
-
-# 一次性写入结果文件
-with open(result_path, "w", encoding="utf-8") as f_result:
-    f_result.write("\n".join(results))
-
-# 计算准确率
-true_labels = []
-with open(eva_label_path, "r", encoding="utf-8") as f_label:
-    true_labels = [line.strip() for line in f_label]
-
-correct_count = 0
-total_count = min(len(results), len(true_labels))
-
-for i in range(total_count):
-    if results[i] == true_labels[i]:
-        correct_count += 1
-
-accuracy = correct_count / total_count
-print(f"分析完成! 准确率: {accuracy:.2%} ({correct_count}/{total_count})")
\ No newline at end of file
+    if len(summaries) > 1:
+        print("\n==== 引擎对比 ====")
+        print(f"{'引擎':<10}{'加载(s)':>10}{'条/秒':>12}{'AUC':>8}{'准确率@0.5':>12}{'macro F1':>10}")
+        for s in summaries:
+            print(f"{s['engine']:<10}{s['load_time']:>10.3f}{s['throughput']:>12,.0f}"
+                  f"{s['auc']:>8.4f}{s['at_0.5']['accuracy']:>12.2%}{s['best_macro_f1']['macro_f1']:>10.3f}")
+    print(f"\n结果文件: {result_path}\n评测报告: {report_path}\n阈值扫描: {sweep_path}")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评论情感分数持久缓存
+
+以 (模型指纹, 评论文本哈希) 为键保存分数，存放在本地 SQLite 文件中。
+模型或分词方式变化时指纹随之变化，旧分数自动失效；
+重复运行和增量爬取只需对新评论打分。
+"""
+import os
+import sqlite3
+import hashlib
+import logging
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.path.join(SCRIPT_DIR, "sentiment_cache.sqlite")
+
+# SQLite 单条语句的参数个数上限较低，查询按批进行
+LOOKUP_BATCH = 500
+
+
+def text_key(text):
+    """评论文本的 16 字节哈希"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+class ScoreCache:
+    """按模型指纹隔离的分数缓存，批量查询、批量写回并统计命中率"""
+
+    def __init__(self, model_fingerprint, path=DEFAULT_CACHE_PATH):
+        self.model = model_fingerprint
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                score REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, keys):
+        """批量查询，返回 {哈希: 分数}（只含命中的键）"""
+        found = {}
+        keys = list(set(keys))
+        for start in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[start:start + LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(
+                f"SELECT text_hash, score FROM scores WHERE model = ? AND text_hash IN ({placeholders})",
+                [self.model, *batch]
+            )
+            found.update(rows)
+        return found
+
+    def store(self, items):
+        """批量写回 (哈希, 分数)"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scores (model, text_hash, score) VALUES (?, ?, ?)",
+                ((self.model, key, score) for key, score in items)
+            )
+
+    def record(self, hits, misses):
+        self.hits += hits
+        self.misses += misses
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        logging.info(f"🗃️ 分数缓存命中 {self.hits}/{self.hits + self.misses} 条 ({self.hit_rate:.1%})")
+
+    def close(self):
+        self.conn.close()
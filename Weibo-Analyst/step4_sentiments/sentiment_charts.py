@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+情感分布图渲染
+
+分析阶段只输出结构化结果（sentiment_summary_{id}.json），这里再按批绘制饼图，
+可在进程池中并行，且不占用数据库连接；图表输入的哈希记在清单文件中，
+汇总数字没有变化时跳过重绘。
+"""
+import os
+import glob
+import json
+import hashlib
+import logging
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(SCRIPT_DIR, "sentiment_results")
+MANIFEST_NAME = "chart_manifest.json"
+
+# 饼图样式
+LABELS = ['正面', '中性', '负面']
+COLORS = ['#66b3ff', '#99ff99', '#ff9999']
+
+# -------------------- 全局字体配置 --------------------
+# 字体路径配置
+FONT_PATHS = [
+    os.path.join(SCRIPT_DIR, "fonts", "msyh.ttf"),
+    os.path.join(SCRIPT_DIR, "fonts", "simhei.ttf"),
+    os.path.join(SCRIPT_DIR, "msyh.ttf"),
+    "/usr/share/fonts/truetype/microsoft/msyh.ttf",
+    "/usr/share/fonts/truetype/msyh.ttf",
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc"
+]
+
+# 备选字体列表
+CHINESE_FONTS = [
+    'WenQuanYi Micro Hei', 
+    'WenQuanYi Zen Hei', 
+    'Noto Sans CJK SC',
+    'Microsoft YaHei', 
+    'SimHei', 
+    'KaiTi', 
+    'SimSun',
+    'DejaVu Sans'
+]
+
+# 字体查找结果缓存：记录上次选中的字体，下次启动直接使用，不再逐个探测
+FONT_CACHE_PATH = os.path.join(SCRIPT_DIR, "font_cache.json")
+
+chinese_font = None
+
+
+def _apply_font(font_name):
+    from matplotlib import rcParams
+    rcParams['font.family'] = 'sans-serif'
+    rcParams['font.sans-serif'] = [font_name]
+    rcParams['axes.unicode_minus'] = False
+
+
+def _load_font_cache():
+    """读取字体缓存；字体文件已不存在或候选列表变化时视为失效"""
+    try:
+        with open(FONT_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get('candidates') != FONT_PATHS + CHINESE_FONTS:
+        return None
+    if cached.get('path') and not os.path.exists(cached['path']):
+        return None
+    return cached
+
+
+def _save_font_cache(path=None, name=None):
+    try:
+        with open(FONT_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({'candidates': FONT_PATHS + CHINESE_FONTS, 'path': path, 'name': name},
+                      f, ensure_ascii=False)
+    except OSError as e:
+        logging.warning(f"⚠️ 字体缓存写入失败: {str(e)}")
+
+
+def setup_chinese_font():
+    """配置中文字体支持（首次调用时导入 matplotlib，结果缓存到 font_cache.json）"""
+    global chinese_font
+    if chinese_font is not None:
+        return chinese_font
+
+    import matplotlib.font_manager as fm
+
+    # 禁用所有 matplotlib 警告
+    warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib")
+    warnings.filterwarnings("ignore", category=UserWarning, module="matplotlib.font_manager")
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font", category=UserWarning)
+
+    cached = _load_font_cache()
+    if cached:
+        try:
+            if cached['path']:
+                fm.fontManager.addfont(cached['path'])
+                font_prop = fm.FontProperties(fname=cached['path'])
+            else:
+                font_prop = fm.FontProperties(family=cached['name'])
+            _apply_font(cached['name'])
+            logging.info(f"✅ 使用缓存的中文字体: {cached['path'] or cached['name']}")
+            chinese_font = font_prop
+            return font_prop
+        except Exception as e:
+            logging.warning(f"⚠️ 缓存的字体加载失败，重新查找: {str(e)}")
+    
+    # 尝试多种字体路径
+    for font_path in FONT_PATHS:
+        if os.path.exists(font_path):
+            try:
+                # 注册字体
+                fm.fontManager.addfont(font_path)
+                font_prop = fm.FontProperties(fname=font_path)
+                font_name = font_prop.get_name()
+                
+                # 设置全局字体
+                _apply_font(font_name)
+                
+                logging.info(f"✅ 使用中文字体文件: {font_path}")
+                _save_font_cache(font_path, font_name)
+                chinese_font = font_prop
+                return font_prop
+            except Exception as e:
+                logging.warning(f"⚠️ 字体文件 {font_path} 加载失败: {str(e)}")
+    
+    # 尝试使用系统字体
+    available_fonts = fm.get_font_names()
+    for font_name in CHINESE_FONTS:
+        if font_name in available_fonts:
+            try:
+                _apply_font(font_name)
+                logging.info(f"✅ 使用系统字体: {font_name}")
+                _save_font_cache(None, font_name)
+                chinese_font = fm.FontProperties(family=font_name)
+                return chinese_font
+            except:
+                continue
+    
+    # 使用通用回退方案
+    logging.warning("⚠️ 使用通用回退字体 DejaVu Sans")
+    _apply_font('DejaVu Sans')
+    chinese_font = fm.FontProperties(family='DejaVu Sans')
+    return chinese_font
+
+
+def summary_path(output_dir, weibo_id):
+    return os.path.join(output_dir, f"sentiment_summary_{weibo_id}.json")
+
+
+def chart_path(output_dir, weibo_id):
+    return os.path.join(output_dir, f"sentiment_{weibo_id}.png")
+
+
+def save_summary(result, output_dir=RESULTS_DIR):
+    """写出一条分析结果（含 weibo_id 与 SentimentAggregator.summary() 的内容）"""
+    path = summary_path(output_dir, result['weibo_id'])
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_summaries(output_dir=RESULTS_DIR):
+    """读取目录下所有分析结果"""
+    results = []
+    for path in sorted(glob.glob(os.path.join(output_dir, "sentiment_summary_*.json"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            results.append(json.load(f))
+    return results
+
+
+def chart_inputs(result):
+    """决定饼图内容的数字；只有它们变化时才需要重绘"""
+    return {
+        'weibo_id': result['weibo_id'],
+        'sizes': [result['positive'], result['neutral'], result['negative']],
+        'total': result['valid'],
+    }
+
+
+def chart_key(result):
+    data = json.dumps(chart_inputs(result), sort_keys=True).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def draw_pie(result, output_path):
+    """绘制一张情感分布饼图"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    setup_chinese_font()
+
+    inputs = chart_inputs(result)
+    weibo_id = inputs['weibo_id']
+    
+    plt.figure(figsize=(8, 6), dpi=100)
+    
+    # 使用更简洁的百分比显示
+    def format_percent(p):
+        return f'{p:.1f}%'
+    
+    wedges, texts, autotexts = plt.pie(
+        inputs['sizes'], 
+        labels=LABELS, 
+        colors=COLORS, 
+        autopct=format_percent,
+        shadow=True, 
+        startangle=90
+    )
+    
+    # 在饼图中心添加总数信息
+    plt.text(0, 0, f'总评论数: {inputs["total"]}', 
+             ha='center', va='center', 
+             fontsize=12)
+    
+    plt.axis('equal')
+    plt.title(f'微博ID {weibo_id} 评论情感分布', fontsize=14)
+    
+    # 添加图例
+    plt.legend(wedges, LABELS,
+              title="情感分类",
+              loc="center left",
+              bbox_to_anchor=(1, 0, 0.5, 1))
+    
+    # 保存图表
+    plt.tight_layout()
+    plt.savefig(output_path, bbox_inches='tight', dpi=300)
+    plt.close()
+    return output_path
+
+
+def _draw_task(args):
+    result, output_path = args
+    try:
+        return draw_pie(result, output_path)
+    except Exception as e:
+        logging.error(f"❌ 绘制 {output_path} 失败: {str(e)}")
+        return None
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def render_charts(results, output_dir=RESULTS_DIR, workers=1, force=False):
+    """按批绘制饼图，返回新绘制的图表路径
+
+    清单中记录的输入哈希与当前一致且图片仍在时跳过；workers > 1 时用进程池并行绘制。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+    tasks = []
+    for result in results:
+        path = chart_path(output_dir, result['weibo_id'])
+        key = chart_key(result)
+        if not force and manifest.get(str(result['weibo_id'])) == key and os.path.exists(path):
+            logging.info(f"⏭️ 微博ID {result['weibo_id']} 汇总未变化，跳过绘图")
+            continue
+        tasks.append((result, path, key))
+
+    if not tasks:
+        return []
+    jobs = [(result, path) for result, path, _ in tasks]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+            outputs = list(executor.map(_draw_task, jobs))
+    else:
+        outputs = [_draw_task(job) for job in jobs]
+
+    rendered = []
+    for (result, path, key), output in zip(tasks, outputs):
+        if output:
+            manifest[str(result['weibo_id'])] = key
+            rendered.append(output)
+            logging.info(f"💾 保存情感分析图表至: {output}")
+    _save_manifest(output_dir, manifest)
+    return rendered
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    parser = argparse.ArgumentParser(description='根据情感分析结果批量绘制饼图')
+    parser.add_argument('--input_dir', type=str, default=RESULTS_DIR,
+                        help='sentiment_summary_*.json 所在目录（图表也输出到此）')
+    parser.add_argument('--workers', type=int, default=1, help='绘图进程数')
+    parser.add_argument('--force', action='store_true', help='忽略清单，全部重绘')
+    args = parser.parse_args()
+
+    results = load_summaries(args.input_dir)
+    if not results:
+        logging.warning(f"⚠️ {args.input_dir} 中没有分析结果")
+    rendered = render_charts(results, args.input_dir, args.workers, args.force)
+    logging.info(f"🎉 绘制 {len(rendered)} 张图表，跳过 {len(results) - len(rendered)} 张")
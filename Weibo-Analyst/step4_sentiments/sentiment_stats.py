@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式情感统计
+
+一次遍历、固定内存地汇总情感分数：分档计数、均值方差、t-digest 分位数，
+以及按点赞数加权的同类统计。不同数据块、进程或时间窗口的汇总结果可以合并。
+"""
+import math
+
+import numpy as np
+
+# 情感分档阈值（与饼图一致）：> 0.6 正面，0.4~0.6 中性，< 0.4 负面
+POSITIVE_THRESHOLD = 0.6
+NEGATIVE_THRESHOLD = 0.4
+
+
+class Moments:
+    """带权均值与方差（West 增量算法，按块合并用 Chan 公式）"""
+
+    def __init__(self):
+        self.weight = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64)
+        w = weights.sum()
+        if w <= 0:
+            return
+        mean = np.dot(weights, values) / w
+        m2 = np.dot(weights, (values - mean) ** 2)
+        self._combine(w, mean, m2)
+
+    def _combine(self, w, mean, m2):
+        total = self.weight + w
+        delta = mean - self.mean
+        self.mean += delta * w / total
+        self.m2 += m2 + delta * delta * self.weight * w / total
+        self.weight = total
+
+    def merge(self, other):
+        if other.weight > 0:
+            self._combine(other.weight, other.mean, other.m2)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.weight if self.weight else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class TDigest:
+    """合并式 t-digest 分位数草图，质心数受 compression 限制，内存有界"""
+
+    def __init__(self, compression=100, buffer_size=None):
+        self.compression = compression
+        self.buffer_size = buffer_size or compression * 10
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self._buf_x = []
+        self._buf_w = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inv(self, k):
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._buf_x.append(values)
+        self._buf_w.append(weights)
+        if sum(len(b) for b in self._buf_x) >= self.buffer_size:
+            self._compress()
+
+    def _compress(self):
+        if not self._buf_x:
+            return
+        means = np.concatenate([self.means, *self._buf_x])
+        weights = np.concatenate([self.weights, *self._buf_w])
+        self._buf_x, self._buf_w = [], []
+        keep = weights > 0
+        means, weights = means[keep], weights[keep]
+        if means.size == 0:
+            return
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order].tolist(), weights[order].tolist()
+        total = sum(weights)
+
+        new_means, new_weights = [], []
+        cur_m, cur_w = means[0], weights[0]
+        q0 = 0.0
+        q_limit = self._k_inv(min(self._k(q0) + 1, self.compression / 4))
+        for m, w in zip(means[1:], weights[1:]):
+            if q0 + (cur_w + w) / total <= q_limit:
+                cur_w += w
+                cur_m += (m - cur_m) * w / cur_w
+            else:
+                new_means.append(cur_m)
+                new_weights.append(cur_w)
+                q0 += cur_w / total
+                q_limit = self._k_inv(min(self._k(q0) + 1, self.compression / 4))
+                cur_m, cur_w = m, w
+        new_means.append(cur_m)
+        new_weights.append(cur_w)
+        self.means = np.array(new_means)
+        self.weights = np.array(new_weights)
+
+    def merge(self, other):
+        other._compress()
+        if other.means.size:
+            self.update(other.means, other.weights)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """估计分位数，质心之间线性插值"""
+        self._compress()
+        if self.means.size == 0:
+            return float('nan')
+        if self.means.size == 1:
+            return float(self.means[0])
+        cum = np.cumsum(self.weights)
+        centers = cum - self.weights / 2
+        target = q * cum[-1]
+        xs = np.concatenate(([0.0], centers, [cum[-1]]))
+        ys = np.concatenate(([self.min], self.means, [self.max]))
+        return float(np.interp(target, xs, ys))
+
+
+class SentimentAggregator:
+    """单次遍历的情感汇总
+
+    点赞加权时每条评论的权重为 1 + like_count，未获赞的评论仍计入。
+    """
+
+    QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def __init__(self, compression=100):
+        self.total_comments = 0   # 含空评论
+        self.counts = np.zeros(3, dtype=np.int64)          # 正面 / 中性 / 负面
+        self.like_weights = np.zeros(3, dtype=np.float64)  # 各档的点赞加权数
+        self.moments = Moments()
+        self.weighted_moments = Moments()
+        self.digest = TDigest(compression)
+        self.weighted_digest = TDigest(compression)
+
+    def update(self, scores, likes=None):
+        """汇总一块分数；scores 中的 None 表示空评论"""
+        self.total_comments += len(scores)
+        if likes is None:
+            likes = [0] * len(scores)
+        pairs = [(s, l or 0) for s, l in zip(scores, likes) if s is not None]
+        if not pairs:
+            return
+        values = np.array([p[0] for p in pairs], dtype=np.float64)
+        weights = 1.0 + np.maximum(np.array([p[1] for p in pairs], dtype=np.float64), 0)
+
+        bucket = np.where(values > POSITIVE_THRESHOLD, 0,
+                          np.where(values >= NEGATIVE_THRESHOLD, 1, 2))
+        self.counts += np.bincount(bucket, minlength=3)
+        self.like_weights += np.bincount(bucket, weights=weights, minlength=3)
+        self.moments.update(values)
+        self.weighted_moments.update(values, weights)
+        self.digest.update(values)
+        self.weighted_digest.update(values, weights)
+
+    def merge(self, other):
+        """合并另一个汇总器（来自其它数据块、进程或时间窗口）"""
+        self.total_comments += other.total_comments
+        self.counts += other.counts
+        self.like_weights += other.like_weights
+        self.moments.merge(other.moments)
+        self.weighted_moments.merge(other.weighted_moments)
+        self.digest.merge(other.digest)
+        self.weighted_digest.merge(other.weighted_digest)
+        return self
+
+    @property
+    def total(self):
+        """有效评论数"""
+        return int(self.counts.sum())
+
+    @property
+    def positive(self):
+        return int(self.counts[0])
+
+    @property
+    def neutral(self):
+        return int(self.counts[1])
+
+    @property
+    def negative(self):
+        return int(self.counts[2])
+
+    @property
+    def mean(self):
+        return self.moments.mean
+
+    def summary(self):
+        """汇总结果字典"""
+        like_total = self.like_weights.sum()
+        return {
+            'total_comments': self.total_comments,
+            'valid': self.total,
+            'positive': self.positive,
+            'neutral': self.neutral,
+            'negative': self.negative,
+            'mean': float(self.moments.mean),
+            'std': self.moments.std,
+            'quantiles': {str(q): self.digest.quantile(q) for q in self.QUANTILES},
+            'weighted_mean': float(self.weighted_moments.mean),
+            'weighted_std': self.weighted_moments.std,
+            'weighted_quantiles': {str(q): self.weighted_digest.quantile(q) for q in self.QUANTILES},
+            'weighted_shares': (self.like_weights / like_total).tolist() if like_total else [0.0, 0.0, 0.0],
+        }
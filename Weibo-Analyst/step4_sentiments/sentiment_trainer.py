@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式情感模型训练
+
+按批读取标注文本，分词后用 NumPy 累加到稀疏词频表（词表 + 各类计数数组），
+不需要一次读入全部训练数据；已有模型可以 partial_fit 增量更新，无需从头训练。
+模型保存为目录下的 .npy 文件（有序词表 + 计数矩阵），可用 mmap 方式快速打开。
+计数规则与 SnowNLP 的 AddOneProb 相同，训练结果与 sentiment.train 一致。
+"""
+import os
+import sys
+import gzip
+import marshal
+import logging
+
+import numpy as np
+
+from bayes_scorer import BayesScorer, CLASSES, SCRIPT_DIR, snownlp_tokenize, read_marshal
+
+NEGATIVE_DICT = os.path.join(SCRIPT_DIR, "train_model", "negative_dict.txt")
+POSITIVE_DICT = os.path.join(SCRIPT_DIR, "train_model", "positive_dict.txt")
+DEFAULT_COUNTS_PATH = os.path.join(SCRIPT_DIR, "train_model", "my_sentiment.counts")
+
+# 标签写法统一映射到类别下标（0 不是合法标签，0/1 标注的文件会报错而不是被误读）
+LABELS = {'neg': 0, 'pos': 1, -1: 0, 1: 1, '-1': 0, '1': 1}
+
+
+def iter_labelled_file(path, label):
+    """逐行读取单一类别的训练文件，产生 (文本, 标签)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield line.strip(), label
+
+
+def iter_labelled_tsv(path):
+    """逐行读取 "标签<TAB>文本" 格式的标注文件"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            label, _, text = line.rstrip('\n').partition('\t')
+            if text:
+                yield text, label
+
+
+def iter_batches(pairs, batch_size):
+    batch = []
+    for pair in pairs:
+        batch.append(pair)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class SentimentTrainer:
+    """词频表训练器
+
+    words/index 按出现顺序记录词表，counts[k, i] 为词 i 在类别 k 中出现的次数。
+    计数数组按倍数扩容，每批新增的计数用 np.bincount 一次累加。
+    """
+
+    def __init__(self, tokenizer=snownlp_tokenize):
+        self.tokenizer = tokenizer
+        self.words = []
+        self.index = {}
+        self.counts = np.zeros((len(CLASSES), 1024), dtype=np.int64)
+        self.docs = np.zeros(len(CLASSES), dtype=np.int64)
+
+    @property
+    def vocab_size(self):
+        return len(self.words)
+
+    def _ensure_capacity(self, size):
+        capacity = self.counts.shape[1]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        grown = np.zeros((len(CLASSES), capacity), dtype=np.int64)
+        grown[:, :self.counts.shape[1]] = self.counts
+        self.counts = grown
+
+    def partial_fit_tokens(self, docs, labels):
+        """用已分词的文档增量更新词频；标签先全部检查，有未知标签时模型保持不变"""
+        classes = []
+        for label in labels:
+            k = LABELS.get(label)
+            if k is None:
+                raise ValueError(f"未知的标签: {label!r}，应为 pos/neg 或 1/-1")
+            classes.append(k)
+        index = self.index
+        words = self.words
+        ids = ([], [])
+        for tokens, k in zip(docs, classes):
+            self.docs[k] += 1
+            bucket = ids[k]
+            for w in tokens:
+                i = index.get(w)
+                if i is None:
+                    i = index[w] = len(words)
+                    words.append(w)
+                bucket.append(i)
+        self._ensure_capacity(len(words))
+        for k, bucket in enumerate(ids):
+            if bucket:
+                added = np.bincount(np.array(bucket, dtype=np.int64), minlength=len(words))
+                self.counts[k, :len(words)] += added
+        return self
+
+    def partial_fit(self, texts, labels, pool=None):
+        """对原始文本分词后增量更新；pool 不为空时并行分词"""
+        if pool is not None:
+            docs = pool.map(self.tokenizer, texts, chunksize=64)
+        else:
+            docs = [self.tokenizer(t) for t in texts]
+        return self.partial_fit_tokens(docs, labels)
+
+    def fit_stream(self, pairs, batch_size=2000, pool=None):
+        """按批消费 (文本, 标签) 流"""
+        for batch in iter_batches(pairs, batch_size):
+            texts = [t for t, _ in batch]
+            labels = [l for _, l in batch]
+            self.partial_fit(texts, labels, pool)
+            logging.info(f"📚 已训练 {int(self.docs.sum())} 条文本，词表 {self.vocab_size} 个词")
+        return self
+
+    def class_counts(self):
+        """(词表, 计数矩阵)，只含已出现的词"""
+        return np.array(self.words), self.counts[:, :len(self.words)]
+
+    def smoothed(self):
+        """按 SnowNLP AddOneProb 规则计算各类计数与总数
+
+        已出现的词计数为 出现次数 + 1；本类未出现的词取 none = 1，同样是 出现次数 + 1。
+        总数 = 出现次数之和 + 本类出现过的不同词数。
+        """
+        vocab, counts = self.class_counts()
+        totals = counts.sum(axis=1) + (counts > 0).sum(axis=1)
+        return vocab, counts + 1, totals
+
+    def to_scorer(self, **kwargs):
+        vocab, counts, totals = self.smoothed()
+        return BayesScorer.from_counts(vocab, counts, totals, **kwargs)
+
+    def save(self, path=DEFAULT_COUNTS_PATH):
+        """保存为目录：vocab.npy（有序词表）、counts.npy（各类出现次数）、docs.npy（各类文本数）"""
+        vocab, counts = self.class_counts()
+        order = np.argsort(vocab, kind='stable')
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vocab.npy"), vocab[order])
+        np.save(os.path.join(path, "counts.npy"), np.ascontiguousarray(counts[:, order]))
+        np.save(os.path.join(path, "docs.npy"), self.docs)
+        logging.info(f"💾 词频表已保存: {path} ({len(vocab)} 个词)")
+
+    @classmethod
+    def load(cls, path=DEFAULT_COUNTS_PATH, **kwargs):
+        """加载词频表以继续增量训练"""
+        trainer = cls(**kwargs)
+        vocab = np.load(os.path.join(path, "vocab.npy"))
+        counts = np.load(os.path.join(path, "counts.npy"))
+        trainer.words = vocab.tolist()
+        trainer.index = {w: i for i, w in enumerate(trainer.words)}
+        trainer._ensure_capacity(len(trainer.words))
+        trainer.counts[:, :len(trainer.words)] = counts
+        trainer.docs = np.load(os.path.join(path, "docs.npy"))
+        return trainer
+
+    @classmethod
+    def from_marshal(cls, path=None, **kwargs):
+        """由 SnowNLP marshal 模型还原词频表，作为增量训练的起点；path 为空时使用 SnowNLP 自带模型
+
+        AddOneProb 中已出现的词计数为 出现次数 + 1，减一即得出现次数；marshal 模型不记录文本数，docs 为 0
+        """
+        d = read_marshal(path)
+        trainer = cls(**kwargs)
+        for k, name in enumerate(CLASSES):
+            prob = d['d'][name]['d']
+            ids = []
+            for w in prob:
+                i = trainer.index.get(w)
+                if i is None:
+                    i = trainer.index[w] = len(trainer.words)
+                    trainer.words.append(w)
+                ids.append(i)
+            trainer._ensure_capacity(len(trainer.words))
+            trainer.counts[k, ids] = np.fromiter(prob.values(), dtype=np.int64, count=len(ids)) - 1
+        logging.info(f"📥 已从 marshal 模型导入词频表: {len(trainer.words)} 个词")
+        return trainer
+
+    def save_marshal(self, path):
+        """导出 SnowNLP 兼容的 marshal 模型（Python3 下自动加 .3 后缀）"""
+        vocab, counts = self.class_counts()
+        words = vocab.tolist()
+        d = {'d': {}}
+        for k, name in enumerate(CLASSES):
+            present = np.flatnonzero(counts[k])
+            d['d'][name] = {
+                'd': {words[i]: int(counts[k, i]) + 1 for i in present},
+                'total': float(counts[k].sum() + len(present)),
+                'none': 1,
+            }
+        d['total'] = sum(v['total'] for v in d['d'].values())
+        if sys.version_info[0] == 3 and not path.endswith('.3'):
+            path = path + '.3'
+        with gzip.open(path, 'wb') as f:
+            f.write(marshal.dumps(d))
+        logging.info(f"💾 SnowNLP 模型已导出: {path}")
+
+
+def load_counts_scorer(path=DEFAULT_COUNTS_PATH, **kwargs):
+    """以 mmap 方式打开词频表并构造打分器"""
+    vocab = np.load(os.path.join(path, "vocab.npy"), mmap_mode='r')
+    counts = np.load(os.path.join(path, "counts.npy"), mmap_mode='r')
+    totals = counts.sum(axis=1) + (counts > 0).sum(axis=1)
+    return BayesScorer.from_counts(vocab, counts + 1, totals, **kwargs)
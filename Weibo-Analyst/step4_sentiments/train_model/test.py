@@ -1,9 +1,16 @@
-from snownlp import sentiment, SnowNLP
+import os
+import sys
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+from bayes_scorer import BayesScorer
+from snownlp import SnowNLP
 
 # 不加载自定义模型，使用默认模型
 text = "这个商品真的很差劲，服务态度也很恶心"
 print("默认模型评分:", SnowNLP(text).sentiments)
 
-# 加载你自己的模型
-sentiment.load('/workspace/step4_sentiments/train_model/my_sentiment.marshal')
-print("自定义模型评分:", SnowNLP(text).sentiments)
+# 加载你自己的模型（只读 mmap 格式，由 train.py 或 bayes_scorer.py 导出）
+scorer = BayesScorer.load_mmap(os.path.join(current_dir, "my_sentiment.smodel"))
+print("自定义模型评分:", scorer.score([text])[0])
@@ -1,8 +1,62 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from snownlp import sentiment
+import os
+import sys
+import logging
+import argparse
+import multiprocessing as mp
+from itertools import chain
 
-#sentiment.train('negative_dict.txt', 'positive_dict.txt')
-sentiment.train('/workspace/step4_sentiments/train_model/negative_dict.txt', '/workspace/step4_sentiments/train_model/positive_dict.txt')
-sentiment.save('/workspace/step4_sentiments/train_model/my_sentiment.marshal')
\ No newline at end of file
+# 获取当前文件所在目录及父目录（step4_sentiments）
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+from sentiment_trainer import (SentimentTrainer, iter_labelled_file, iter_labelled_tsv,
+                               NEGATIVE_DICT, POSITIVE_DICT, DEFAULT_COUNTS_PATH)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+parser = argparse.ArgumentParser(description='训练情感模型（流式计数，支持增量更新）')
+parser.add_argument('--neg', type=str, default=NEGATIVE_DICT, help='负面训练文本，每行一条')
+parser.add_argument('--pos', type=str, default=POSITIVE_DICT, help='正面训练文本，每行一条')
+parser.add_argument('--update', type=str, nargs='*', default=[],
+                    help='增量训练：在已有词频表上追加 "标签<TAB>文本" 格式的标注文件（标签 pos/neg 或 1/-1）；'
+                         '词频表不存在时从 --marshal 指定的模型导入')
+parser.add_argument('--counts', type=str, default=DEFAULT_COUNTS_PATH, help='词频表目录')
+parser.add_argument('--marshal', type=str, default=os.path.join(current_dir, "my_sentiment.marshal"),
+                    help='同时导出 SnowNLP 兼容的 marshal 模型，空字符串表示不导出')
+parser.add_argument('--mmap', type=str, default=os.path.join(current_dir, "my_sentiment.smodel"),
+                    help='同时导出只读 mmap 模型，空字符串表示不导出')
+parser.add_argument('--batch_size', type=int, default=2000, help='每批训练文本数')
+parser.add_argument('--workers', type=int, default=1, help='分词进程数')
+args = parser.parse_args()
+
+if args.update and os.path.isdir(args.counts):
+    trainer = SentimentTrainer.load(args.counts)
+    pairs = chain.from_iterable(iter_labelled_tsv(p) for p in args.update)
+elif args.update:
+    # 还没有词频表时由已有的 marshal 模型导入，在其基础上增量训练
+    trainer = SentimentTrainer.from_marshal(args.marshal or None)
+    pairs = chain.from_iterable(iter_labelled_tsv(p) for p in args.update)
+else:
+    trainer = SentimentTrainer()
+    pairs = chain(iter_labelled_file(args.neg, 'neg'), iter_labelled_file(args.pos, 'pos'))
+
+pool = mp.Pool(args.workers) if args.workers > 1 else None
+try:
+    trainer.fit_stream(pairs, args.batch_size, pool)
+finally:
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+trainer.save(args.counts)
+if args.marshal:
+    trainer.save_marshal(args.marshal)
+if args.mmap:
+    trainer.to_scorer().save_mmap(args.mmap)
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+LDA 内存占用测试：每百万词的峰值 RSS
+
+每种配置在全新的子进程中运行：先生成合成语料的词 id 数组（短评论长度分布），记录当前 RSS，
+再构建模型状态，结束时用峰值 RSS 减去起点，换算为每百万词的占用（采样内核预先编译，JIT 开销不计入）。
+    legacy   原实现的数据结构：Document.words 为 Python int 列表，Z 为 numpy 标量的嵌套列表，
+             nd 为 int32、theta / phi 为预先分配的稠密 float64
+    compact  DocumentList（int32 词数组 + 偏移）、uint8/uint16 的 z 与 nd，
+             训练 2 轮后取 top-k 文档主题，theta 不常驻
+"""
+import sys
+import json
+import argparse
+import subprocess
+
+PROBE = """
+import json, resource
+import numpy as np
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+rng = np.random.default_rng(0)
+n_tokens, n_words, K, mode = {n_tokens}, {n_words}, {K}, {mode!r}
+lengths = rng.poisson(12, size=n_tokens // 12) + 6
+lengths = lengths[:np.searchsorted(np.cumsum(lengths), n_tokens) + 1]
+offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+np.cumsum(lengths, out=offsets[1:])
+tokens = np.minimum(rng.zipf(1.3, size=int(offsets[-1])) - 1, n_words - 1).astype(np.int32)
+
+from lda_topic_trainer import Document, DocumentList, LDAModel
+
+class Corpus:
+    pass
+
+corpus = Corpus()
+corpus.words_count, corpus.docs_count = n_words, len(lengths)
+corpus.id2word = {{i: str(i) for i in range(n_words)}}
+if mode == 'compact':
+    # 预先编译采样内核，JIT 的内存开销不计入
+    warm = Corpus()
+    warm.words_count, warm.docs_count = n_words, 1
+    warm.docs = DocumentList(tokens[:10], [0, 10])
+    LDAModel(warm, K=K, iterations=1).train()
+start = rss_mb()
+
+if mode == 'legacy':
+    docs = []
+    for lo, hi in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        doc = Document()
+        doc.words = tokens[lo:hi].tolist()
+        doc.length = len(doc.words)
+        docs.append(doc)
+    z = rng.integers(0, K, size=len(tokens))
+    Z = [list(z[lo:hi]) for lo, hi in zip(offsets[:-1], offsets[1:])]
+    nw = np.zeros((n_words, K), dtype=np.int32)
+    nd = np.zeros((len(docs), K), dtype=np.int32)
+    theta = np.zeros((len(docs), K))
+    phi = np.zeros((K, n_words))
+    np.add.at(nd, (np.repeat(np.arange(len(docs)), lengths), z), 1)
+    theta[:] = (nd + 0.1) / (nd.sum(axis=1, keepdims=True) + K * 0.1)
+else:
+    corpus.docs = DocumentList(tokens, offsets)
+    lda = LDAModel(corpus, K=K, iterations=2)
+    lda.train()
+    topics, weights = lda.doc_topics_topk(3)
+
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps([len(tokens), peak - start]))
+"""
+
+
+def measure(mode, n_tokens, n_words, K):
+    code = PROBE.format(mode=mode, n_tokens=n_tokens, n_words=n_words, K=K)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LDA 内存占用测试（每百万词峰值 RSS）')
+    parser.add_argument('--tokens', type=float, nargs='+', default=[1e6, 2e6, 4e6], help='语料词数')
+    parser.add_argument('--words', type=int, default=20000, help='词表大小')
+    parser.add_argument('--topics', type=int, default=15, help='主题数')
+    parser.add_argument('--modes', nargs='+', choices=['legacy', 'compact'], default=['legacy', 'compact'])
+    args = parser.parse_args()
+
+    print(f"{'布局':<10}{'词数':>12}{'峰值增量(MB)':>16}{'MB/百万词':>14}")
+    for n in args.tokens:
+        for mode in args.modes:
+            n_tokens, mb = measure(mode, int(n), args.words, args.topics)
+            print(f"{mode:<10}{n_tokens:>12,}{mb:>16.1f}{mb / (n_tokens / 1e6):>14.1f}")
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+LDA 采样状态检查点：断点续训与新评论的热启动
+
+检查点是单个 .npz 文件（不压缩，先写临时文件再原子替换），内容：
+    tokens / offsets          参与采样的词 id（int32）与文档边界
+    heldout_tokens / _doc_ids 留出词，恢复后留出困惑度保持可比
+    z                         主题分配，K <= 256 时存 uint8，否则 uint16
+    nwsum                     主题词数，载入时与由 z 重建的计数核对
+    vocab                     词表，UTF-8 编码、以 \\0 分隔
+    doc_hashes                每篇文档完整词序列的 64 位 blake2b 哈希，热启动时识别旧文档
+    params / rng_state        超参数、已完成迭代数与随机数生成器状态
+nw / nd 由 z 经 init_counts 精确重建，不重复存储。
+
+热启动（warm_start）：重新抓取评论后，词序列与检查点中某篇文档相同的文档沿用原有主题分配
+（同一文档内按词匹配，与词表 id 无关），其余词随机初始化；先只对这些新词采样 burn_in 轮，
+旧文档的计数保持不变，再按常规方式继续训练。
+"""
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from lda_topic_trainer import DocumentList, LDAModel
+from lda_sampler import gibbs_sweep, default_engine, topic_dtype
+
+
+class CheckpointCorpus:
+    """由检查点还原的语料，接口与 DataPreProcessing 相同（恢复训练时无需连接数据库）"""
+
+    def __init__(self, id2word, tokens, offsets, doc_hashes):
+        self.id2word = dict(enumerate(id2word))
+        self.word2id = {w: i for i, w in self.id2word.items()}
+        self.words_count = len(id2word)
+        self.docs_count = len(offsets) - 1
+        self.docs = DocumentList(tokens, offsets)
+        self.doc_hashes = doc_hashes
+
+
+def doc_hashes(corpus):
+    """每篇文档词序列（词本身而非 id）的 64 位哈希"""
+    cached = getattr(corpus, 'doc_hashes', None)
+    if cached is not None:
+        return cached
+    id2word = corpus.id2word
+    return np.array([int.from_bytes(hashlib.blake2b("\0".join(id2word[w] for w in d.words).encode("utf-8"),
+                                                    digest_size=8).digest(), 'little')
+                     for d in corpus.docs], dtype=np.uint64)
+
+
+def save_checkpoint(lda, path):
+    vocab = "\0".join(lda.dpre.id2word[i] for i in range(lda.dpre.words_count)).encode("utf-8")
+    rng_state = json.dumps(lda.rng.bit_generator.state).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f,
+                 tokens=np.asarray(lda.tokens, dtype=np.int32),
+                 offsets=np.asarray(lda.offsets, dtype=np.int64),
+                 heldout_tokens=np.asarray(lda.heldout_tokens, dtype=np.int32),
+                 heldout_doc_ids=np.asarray(lda.heldout_doc_ids, dtype=np.int32),
+                 z=np.asarray(lda.z, dtype=topic_dtype(lda.K)),
+                 nwsum=np.asarray(lda.nwsum, dtype=np.int32),
+                 vocab=np.frombuffer(vocab, dtype=np.uint8),
+                 doc_hashes=doc_hashes(lda.dpre),
+                 params=np.array([lda.K, lda.alpha, lda.beta, lda.iterations, lda.iteration, lda.topN]),
+                 rng_state=np.frombuffer(rng_state, dtype=np.uint8))
+    os.replace(tmp, path)
+
+
+def _read_arrays(path):
+    """把检查点中的数组全部读入内存后关闭文件，之后 save_checkpoint 可以替换同一文件"""
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def load_checkpoint(path, dpre=None):
+    """从检查点恢复 LDAModel，之后调用 train() 从中断处继续；dpre 为 None 时由检查点还原语料"""
+    data = _read_arrays(path)
+    K, alpha, beta, iterations, iteration, topN = data['params']
+    tokens, offsets = data['tokens'], data['offsets']
+    if dpre is None:
+        vocab = data['vocab'].tobytes().decode("utf-8")
+        id2word = vocab.split("\0") if vocab else []
+        dpre = CheckpointCorpus(id2word, tokens, offsets, data['doc_hashes'])
+
+    lda = LDAModel(dpre, K=int(K), alpha=float(alpha), beta=float(beta),
+                   iterations=int(iterations), topN=int(topN))
+    lda.tokens, lda.offsets = tokens, offsets
+    lda.doc_ids = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+    lda.heldout_tokens, lda.heldout_doc_ids = data['heldout_tokens'], data['heldout_doc_ids']
+    lda.set_assignments(data['z'])
+    if not np.array_equal(lda.nwsum, data['nwsum']):
+        raise ValueError(f"检查点计数与主题分配不一致: {path}")
+    lda.rng.bit_generator.state = json.loads(data['rng_state'].tobytes().decode("utf-8"))
+    lda.iteration = int(iteration)
+    print(f"载入检查点: {path} (已完成 {lda.iteration}/{lda.iterations} 轮)")
+    return lda
+
+
+def _reuse_assignments(old_keys, old_z, new_keys):
+    """按 (文档, 词) 键把旧的主题分配分给新词：同键的第 r 个新词取第 r 个旧分配，没有则为 -1"""
+    order = np.argsort(old_keys, kind='stable')
+    old_keys, old_z = old_keys[order], old_z[order]
+    new_order = np.argsort(new_keys, kind='stable')
+    sorted_new = new_keys[new_order]
+    # 同键内的序号
+    first = np.searchsorted(sorted_new, sorted_new, side='left')
+    rank = np.arange(len(sorted_new)) - first
+    start = np.searchsorted(old_keys, sorted_new, side='left')
+    stop = np.searchsorted(old_keys, sorted_new, side='right')
+    hit = start + rank < stop
+    z = np.full(len(new_keys), -1, dtype=np.int64)
+    z[new_order[hit]] = old_z[(start + rank)[hit]]
+    return z
+
+
+def warm_start(path, dpre, iterations=500, burn_in=50, holdout=0.0, engine=None, topN=20):
+    """用检查点热启动新语料：旧文档沿用主题分配，只对新文档/新词先做 burn_in 轮采样
+
+    返回 LDAModel，之后调用 train() 继续常规训练
+    """
+    old = _read_arrays(path)
+    K, alpha, beta, _, _, _ = old['params']
+    vocab = old['vocab'].tobytes().decode("utf-8")
+    old_id2word = vocab.split("\0") if vocab else []
+
+    lda = LDAModel(dpre, K=int(K), alpha=float(alpha), beta=float(beta),
+                   iterations=iterations, topN=topN, holdout=holdout)
+
+    # 新文档 -> 旧文档（按词序列哈希）
+    old_hashes = old['doc_hashes']
+    hash_order = np.argsort(old_hashes)
+    new_hashes = doc_hashes(dpre)
+    if len(old_hashes):
+        pos = np.minimum(np.searchsorted(old_hashes[hash_order], new_hashes), len(old_hashes) - 1)
+        matched = old_hashes[hash_order[pos]] == new_hashes
+        old_doc_of = np.where(matched, hash_order[pos], -1)
+    else:
+        matched = np.zeros(len(new_hashes), dtype=bool)
+        old_doc_of = np.full(len(new_hashes), -1)
+
+    # 旧分配的键：(对应的新文档, 新词表中的词 id)；只保留被匹配到的旧文档
+    new_doc_of_old = np.full(len(old_hashes), -1, dtype=np.int64)
+    new_doc_of_old[old_doc_of[matched]] = np.flatnonzero(matched)
+    old_doc_ids = np.repeat(np.arange(len(old['offsets']) - 1), np.diff(old['offsets']))
+    remap = np.array([dpre.word2id.get(w, -1) for w in old_id2word], dtype=np.int64)
+    old_docs = new_doc_of_old[old_doc_ids]
+    old_words = remap[old['tokens']] if len(remap) else np.empty(0, dtype=np.int64)
+    keep = (old_docs >= 0) & (old_words >= 0)
+    V = dpre.words_count
+    reused = _reuse_assignments(old_docs[keep] * V + old_words[keep], old['z'][keep].astype(np.int64),
+                                lda.doc_ids.astype(np.int64) * V + lda.tokens)
+
+    fresh = reused < 0
+    z = np.where(fresh, lda.z, reused)
+    lda.set_assignments(z)
+    print(f"热启动: 沿用 {int(matched.sum())}/{dpre.docs_count} 篇文档的分配, "
+          f"新采样词 {int(fresh.sum())}/{len(z)}")
+
+    burn_in_new(lda, np.flatnonzero(fresh), burn_in, engine)
+    return lda
+
+
+def burn_in_new(lda, token_idx, iterations, engine=None):
+    """只对指定位置的词采样若干轮，其余词的分配（及其计数）保持不变"""
+    if len(token_idx) == 0 or iterations <= 0:
+        return
+    engine = engine or default_engine(lda.K)
+    tokens = lda.tokens[token_idx]
+    doc_ids = lda.doc_ids[token_idx]
+    z = lda.z[token_idx]
+    for _ in range(iterations):
+        gibbs_sweep(tokens, doc_ids, z, lda.nw, lda.nd, lda.nwsum,
+                    lda.alpha, lda.beta, lda.dpre.words_count, lda.rng, engine)
+    lda.z[token_idx] = z
+    print(f"新词 burn-in 完成: {len(token_idx)} 个词, {iterations} 轮")
+
+
+def restore(path, dpre, iterations, K=None, alpha=None, beta=None, holdout=0.0, burn_in=50,
+            engine=None, topN=20):
+    """语料与检查点完全相同时精确恢复（训练未完成则断点续训，已完成则直接沿用），否则热启动
+
+    K / alpha / beta 与检查点不同时返回 None（调用方应重新训练），给出 None 的参数不比较
+    """
+    with np.load(path) as data:
+        params = data['params']
+        same_corpus = np.array_equal(data['doc_hashes'], doc_hashes(dpre))
+    ckpt_K, ckpt_alpha, ckpt_beta, ckpt_iterations, ckpt_iteration, _ = params
+    if ((K is not None and int(ckpt_K) != K)
+            or (alpha is not None and not np.isclose(ckpt_alpha, alpha))
+            or (beta is not None and not np.isclose(ckpt_beta, beta))):
+        print(f"检查点参数 (K={int(ckpt_K)}, alpha={ckpt_alpha:g}, beta={ckpt_beta:g}) 与当前设置 "
+              f"(K={K}, alpha={alpha}, beta={beta}) 不同，忽略检查点: {path}")
+        return None
+    if same_corpus:
+        lda = load_checkpoint(path, dpre)
+        if ckpt_iteration < ckpt_iterations:
+            lda.iterations = iterations
+        else:
+            print("语料未变且训练已完成，直接使用检查点中的结果")
+        return lda
+    return warm_start(path, dpre, iterations, burn_in, holdout, engine, topN)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+近似分布式 LDA（AD-LDA，Newman et al. 2009）
+
+单个语料的文档按词数均分为若干分片，每个工作进程负责一个分片：
+    1. 从共享内存中的全局 nw / nwsum 快照复制一份局部计数；
+    2. 在本分片上做一轮 Gibbs 采样（z 与 nd 按文档划分，直接原地写共享内存）；
+    3. 把 局部 nw - 快照 写入自己的增量缓冲区。
+主进程等所有分片完成后把增量累加回全局 nw / nwsum，作为下一轮的快照。
+各分片在同一轮内看不到彼此的更新，这是 AD-LDA 的近似之处；分片越少、语料越大，影响越小。
+
+随机数按 (种子, 迭代, 分片) 派生，结果与进程调度无关，可复现。
+"""
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from lda_sampler import gibbs_sweep, default_engine
+
+_worker = {}
+
+
+def to_shared(arr):
+    """把数组复制到新建的共享内存块，返回 (共享内存, 视图, 描述)"""
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    view[...] = arr
+    return shm, view, (shm.name, arr.shape, arr.dtype.str)
+
+
+def attach_shared(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _init_worker(specs, alpha, beta, n_words, engine, seed):
+    for key, spec in specs.items():
+        _worker[key] = attach_shared(spec)
+    _worker['params'] = (alpha, beta, n_words, engine, seed)
+
+
+def _sweep_shard(task):
+    it, shard, lo, hi = task
+    arrays = {key: value[1] for key, value in _worker.items() if key != 'params'}
+    alpha, beta, n_words, engine, seed = _worker['params']
+    snapshot = arrays['nw']
+    nw = snapshot.copy()
+    nwsum = arrays['nwsum'].copy()
+    rng = np.random.default_rng([seed, it, shard])
+    gibbs_sweep(arrays['tokens'][lo:hi], arrays['doc_ids'][lo:hi], arrays['z'][lo:hi],
+                nw, arrays['nd'], nwsum, alpha, beta, n_words, rng, engine)
+    np.subtract(nw, snapshot, out=arrays['delta'][shard])
+    return shard
+
+
+def shard_bounds(offsets, n_shards):
+    """按词数均分且落在文档边界上的分片 [(起始词, 结束词), ...]"""
+    targets = np.linspace(0, offsets[-1], n_shards + 1)
+    cuts = offsets[np.searchsorted(offsets, targets)]
+    cuts[0], cuts[-1] = 0, offsets[-1]
+    return [(int(lo), int(hi)) for lo, hi in zip(cuts[:-1], cuts[1:]) if hi > lo]
+
+
+def train_distributed(lda, workers, engine=None, seed=42):
+    """用 AD-LDA 训练 LDAModel：结果写回 lda 的 z / nw / nd / nwsum 并计算 theta、phi"""
+    engine = engine or default_engine(lda.K)
+    bounds = shard_bounds(lda.offsets, workers)
+    print(f"开始AD-LDA训练 [主题数={lda.K}, 迭代={lda.iterations}, 分片={len(bounds)}, 采样器={engine}]...")
+    start_time = time.time()
+
+    delta = np.zeros((len(bounds),) + lda.nw.shape, dtype=lda.nw.dtype)
+    blocks, specs = [], {}
+    for key, arr in (('tokens', lda.tokens), ('doc_ids', lda.doc_ids), ('z', lda.z),
+                     ('nd', lda.nd), ('nw', lda.nw), ('nwsum', lda.nwsum), ('delta', delta)):
+        shm, view, specs[key] = to_shared(arr)
+        blocks.append(shm)
+        if key != 'delta':
+            # 训练期间模型直接使用共享内存视图，_report 等可读取最新计数
+            setattr(lda, key, view)
+        else:
+            delta = view
+
+    try:
+        with mp.Pool(len(bounds), initializer=_init_worker,
+                     initargs=(specs, lda.alpha, lda.beta, lda.dpre.words_count, engine, seed)) as pool:
+            for it in range(lda.iteration, lda.iterations):
+                pool.map(_sweep_shard, [(it, s, lo, hi) for s, (lo, hi) in enumerate(bounds)])
+                step = delta.sum(axis=0)
+                lda.nw += step
+                lda.nwsum += step.sum(axis=0)
+                if lda._report(it, start_time):
+                    break
+    finally:
+        # 复制回普通数组后释放共享内存
+        for key in ('tokens', 'doc_ids', 'z', 'nd', 'nw', 'nwsum'):
+            setattr(lda, key, np.array(getattr(lda, key)))
+        delta = None
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    lda.compute_theta_phi()
+    lda.save_checkpoint()
+    print(f"训练完成! 总用时: {time.time()-start_time:.1f}秒")
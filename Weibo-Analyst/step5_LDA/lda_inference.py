@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+主题模型批量推断：为新评论估计文档-主题分布 θ，不重新训练
+
+载入训练结果目录中的 phi.npy（φ，旧版本为 topic_word_matrix.npz）与 vocab.txt（或训练检查点），
+一批评论分词、映射为词 id 后展平成连续数组，θ 的估计有两种方式：
+    variational  固定 φ 的变分更新，整批在稀疏矩阵上向量化迭代（默认，速度快、结果确定）
+        γ_dk ← α + Σ_w n_dw · φ_kw·exp(ψ(γ_dk)) / Σ_j φ_jw·exp(ψ(γ_dj))
+    gibbs        固定 φ 的折叠 Gibbs 采样（fold-in），burn-in 之后对 nd 取平均
+不在词表中的词忽略；没有有效词的评论得到均匀分布。
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+from scipy import sparse
+from scipy.special import digamma
+
+from lda_sampler import foldin_sweep
+from lda_results import load_results
+
+METHODS = ('variational', 'gibbs')
+
+
+class TopicInferencer:
+    def __init__(self, phi, id2word, alpha=0.1, tokenize=None, seed=42):
+        """phi: K × 词数 的主题-词分布；id2word: 与 phi 的列对应的词列表"""
+        self.phi = np.asarray(phi, dtype=np.float64)
+        self.phi_t = np.ascontiguousarray(self.phi.T)
+        self.K = self.phi.shape[0]
+        self.alpha = alpha
+        self.word2id = {w: i for i, w in enumerate(id2word)}
+        self.rng = np.random.default_rng(seed)
+        self._tokenize = tokenize
+
+    @property
+    def tokenize(self):
+        # 默认分词器（jieba + 停用词）按需创建：直接传入词 id 推断时不需要加载
+        if self._tokenize is None:
+            from lda_topic_trainer import DataPreProcessing
+            self._tokenize = DataPreProcessing("").process_text
+        return self._tokenize
+
+    @classmethod
+    def load(cls, result_dir, alpha=None, tokenize=None):
+        """从 LDAModel.save_results / OnlineLDA.save_results 的输出目录载入；alpha 默认取训练时的值"""
+        if not os.path.exists(os.path.join(result_dir, "vocab.txt")):
+            raise FileNotFoundError(f"{result_dir} 中没有 vocab.txt，请用当前版本重新训练，"
+                                    f"或改用 from_checkpoint 载入训练检查点")
+        results = load_results(result_dir, mmap=False)
+        return cls(results.phi, results.id2word, alpha or results.meta.get('alpha', 0.1), tokenize)
+
+    @classmethod
+    def from_checkpoint(cls, path, tokenize=None):
+        """从训练检查点（lda_checkpoint）载入，φ 由主题分配计数计算"""
+        from lda_checkpoint import load_checkpoint
+        lda = load_checkpoint(path)
+        lda.compute_theta_phi()
+        return cls.from_model(lda, tokenize)
+
+    @classmethod
+    def from_model(cls, lda, tokenize=None):
+        return cls(lda.phi, [lda.dpre.id2word[i] for i in range(lda.dpre.words_count)],
+                   lda.alpha, tokenize)
+
+    def encode(self, texts):
+        """评论列表 -> (tokens, doc_ids)，词表外的词丢弃"""
+        word2id = self.word2id
+        ids = [[word2id[w] for w in self.tokenize(t) if w in word2id] if t else [] for t in texts]
+        lengths = np.fromiter((len(d) for d in ids), dtype=np.int64, count=len(ids))
+        tokens = np.fromiter((w for d in ids for w in d), dtype=np.int32, count=int(lengths.sum()))
+        doc_ids = np.repeat(np.arange(len(ids), dtype=np.int32), lengths)
+        return tokens, doc_ids
+
+    def infer(self, texts, method='variational', **kwargs):
+        """推断一批评论的 θ，形如 (评论数, K)"""
+        tokens, doc_ids = self.encode(texts)
+        return self.infer_tokens(tokens, doc_ids, len(texts), method, **kwargs)
+
+    def infer_tokens(self, tokens, doc_ids, n_docs, method='variational', **kwargs):
+        if method == 'variational':
+            return self._variational(tokens, doc_ids, n_docs, **kwargs)
+        if method == 'gibbs':
+            return self._gibbs(tokens, doc_ids, n_docs, **kwargs)
+        raise ValueError(f"未知的推断方法: {method}")
+
+    def _variational(self, tokens, doc_ids, n_docs, max_iter=100, tol=1e-3):
+        keys, counts = np.unique(doc_ids.astype(np.int64) * len(self.word2id) + tokens,
+                                 return_counts=True)
+        rows, cols = np.divmod(keys, max(len(self.word2id), 1))
+        uniq, local = np.unique(cols, return_inverse=True)
+        X = sparse.csr_matrix((counts.astype(np.float64), (rows, local)), shape=(n_docs, len(uniq)))
+        row_of = np.repeat(np.arange(n_docs), np.diff(X.indptr))
+        beta = self.phi[:, uniq]
+
+        gamma = np.full((n_docs, self.K), self.alpha + X.sum(axis=1).A / self.K)
+        for _ in range(max_iter):
+            exp_theta = np.exp(digamma(gamma) - digamma(gamma.sum(axis=1, keepdims=True)))
+            phinorm = np.einsum('nk,kn->n', exp_theta[row_of], beta[:, X.indices]) + 1e-100
+            ratio = sparse.csr_matrix((X.data / phinorm, X.indices, X.indptr), shape=X.shape)
+            new_gamma = self.alpha + exp_theta * (ratio @ beta.T)
+            change = np.abs(new_gamma - gamma).mean() if n_docs else 0.0
+            gamma = new_gamma
+            if change < tol:
+                break
+        return gamma / gamma.sum(axis=1, keepdims=True)
+
+    def _gibbs(self, tokens, doc_ids, n_docs, iterations=50, burn_in=20):
+        z = self.rng.integers(0, self.K, size=len(tokens), dtype=np.int32)
+        nd = np.bincount(doc_ids.astype(np.int64) * self.K + z,
+                         minlength=n_docs * self.K).reshape(n_docs, self.K).astype(np.int32)
+        acc = np.zeros((n_docs, self.K))
+        for it in range(iterations):
+            foldin_sweep(tokens, doc_ids, z, nd, self.phi_t, self.alpha, self.rng)
+            if it >= burn_in:
+                acc += nd
+        samples = max(iterations - burn_in, 1)
+        acc = acc / samples + self.alpha
+        return acc / acc.sum(axis=1, keepdims=True)
+
+
+if __name__ == '__main__':
+    from lda_online import iter_file_comments
+
+    parser = argparse.ArgumentParser(description='用训练好的主题模型推断新评论的主题分布')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--model_dir', type=str, help='训练结果目录（含 phi.npy 与 vocab.txt）')
+    source.add_argument('--checkpoint', type=str, help='训练检查点 checkpoint.npz')
+    parser.add_argument('--input', type=str, required=True, help='文本文件，每行一条评论（空行得到均匀分布，输出行与输入行一一对应）')
+    parser.add_argument('--output', type=str, required=True,
+                        help='输出文件：.npy 为 评论数 × K 的 float32 矩阵，其他扩展名写 CSV，每行一条评论的主题分布')
+    parser.add_argument('--method', choices=METHODS, default='variational', help='推断方法')
+    parser.add_argument('--batch_size', type=int, default=1000, help='每批评论数')
+    args = parser.parse_args()
+
+    if args.model_dir:
+        inferencer = TopicInferencer.load(args.model_dir)
+    else:
+        inferencer = TopicInferencer.from_checkpoint(args.checkpoint)
+
+    start_time = time.time()
+    total = 0
+    if args.output.endswith(".npy"):
+        # 先数出评论数，按批直接写入内存映射的 .npy
+        n_comments = sum(len(texts) for texts in iter_file_comments(args.input, args.batch_size, keep_blank=True))
+        out = np.lib.format.open_memmap(args.output, mode="w+", dtype=np.float32,
+                                        shape=(n_comments, inferencer.K))
+        for texts in iter_file_comments(args.input, args.batch_size, keep_blank=True):
+            out[total:total + len(texts)] = inferencer.infer(texts, args.method)
+            total += len(texts)
+        out.flush()
+        del out
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for texts in iter_file_comments(args.input, args.batch_size, keep_blank=True):
+                theta = inferencer.infer(texts, args.method)
+                np.savetxt(f, theta, delimiter=",", fmt="%.6f")
+                total += len(texts)
+    elapsed = time.time() - start_time
+    print(f"推断完成: {total} 条评论, 用时 {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} 条/秒)")
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+LDA 训练过程的收敛指标与提前停止
+
+    联合对数似然 log p(w, z)（Griffiths & Steyvers 2004），只依赖计数矩阵，用 gammaln 按块向量化计算：
+        K·[lnΓ(Vβ) - V·lnΓ(β)] + Σ_k [Σ_w lnΓ(nw[w,k] + β) - lnΓ(nwsum[k] + Vβ)]
+      + D·[lnΓ(Kα) - K·lnΓ(α)] + Σ_d [Σ_k lnΓ(nd[d,k] + α) - lnΓ(ndsum[d] + Kα)]
+    困惑度 exp(-平均 log Σ_k θ_dk φ_kw)，按块计算，每块只由 nd / ndsum 算出涉及文档的 θ，
+    不构造 词数×K 或 文档数×K 的临时数组；
+    留出困惑度使用训练时留出的词（文档补全评估：每篇文档的一部分词不参与采样）。
+    主题一致性按每个主题前 N 个词在文档中的共现计算（D(w) 为含词 w 的文档数）：
+        UMass  Σ_{i<j} log((D(w_i, w_j) + 1) / D(w_j))，w_j 排名更靠前（Mimno et al. 2011）
+        NPMI   各词对 log(P(w_i, w_j) / (P(w_i)·P(w_j))) / -log P(w_i, w_j) 的平均，从不共现记为 -1
+"""
+import os
+import csv
+
+import numpy as np
+from scipy import sparse
+from scipy.special import gammaln
+
+
+def _gammaln_sum(counts, offset, chunk_size=65536):
+    """Σ lnΓ(counts + offset)，按行分块累加，临时数组不超过 chunk_size 个元素"""
+    rows = max(1, chunk_size // max(counts.shape[1], 1))
+    total = 0.0
+    for lo in range(0, counts.shape[0], rows):
+        total += gammaln(counts[lo:lo + rows] + offset).sum()
+    return total
+
+
+def log_likelihood(nw, nd, nwsum, ndsum, alpha, beta):
+    """联合对数似然 log p(w, z)"""
+    n_words, K = nw.shape
+    n_docs = nd.shape[0]
+    word_part = (K * (gammaln(n_words * beta) - n_words * gammaln(beta))
+                 + _gammaln_sum(nw, beta) - gammaln(nwsum + n_words * beta).sum())
+    doc_part = (n_docs * (gammaln(K * alpha) - K * gammaln(alpha))
+                + _gammaln_sum(nd, alpha) - gammaln(ndsum + K * alpha).sum())
+    return float(word_part + doc_part)
+
+
+def token_log_prob(tokens, doc_ids, nd, ndsum, alpha, phi, chunk_size=65536):
+    """Σ_i log Σ_k θ[doc_i, k] φ[k, w_i]，θ 只按每块涉及的文档由 nd / ndsum 计算"""
+    K = nd.shape[1]
+    total = 0.0
+    for lo in range(0, len(tokens), chunk_size):
+        w = tokens[lo:lo + chunk_size]
+        d = doc_ids[lo:lo + chunk_size]
+        theta = (nd[d] + alpha) / (ndsum[d][:, None] + K * alpha)
+        total += np.log(np.einsum('ik,ki->i', theta, phi[:, w])).sum()
+    return float(total)
+
+
+def perplexity(tokens, doc_ids, nd, ndsum, alpha, phi):
+    if len(tokens) == 0:
+        return float('nan')
+    return float(np.exp(-token_log_prob(tokens, doc_ids, nd, ndsum, alpha, phi) / len(tokens)))
+
+
+def doc_word_incidence(tokens, offsets, n_words):
+    """文档-词出现矩阵（文档数 × 词数，按列存储的 CSC，值为 1），同一文档内重复出现只计一次"""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_docs = len(offsets) - 1
+    doc_ids = np.repeat(np.arange(n_docs, dtype=np.int64), np.diff(offsets))
+    keys = np.unique(np.asarray(tokens, dtype=np.int64) * n_docs + doc_ids)
+    words, docs = np.divmod(keys, max(n_docs, 1))
+    indptr = np.zeros(n_words + 1, dtype=np.int64)
+    np.cumsum(np.bincount(words, minlength=n_words), out=indptr[1:])
+    return sparse.csc_matrix((np.ones(len(keys), dtype=np.int32), docs.astype(np.int32), indptr),
+                             shape=(n_docs, n_words))
+
+
+def topic_coherence(incidence, top_words, measure='npmi'):
+    """每个主题的一致性，top_words 形如 (K, N)，每行按概率降序"""
+    n_docs = incidence.shape[0]
+    N = top_words.shape[1]
+    i, j = np.triu_indices(N, k=1)  # i < j：j 为排名靠后的词
+    scores = np.empty(len(top_words))
+    for k, words in enumerate(top_words):
+        sub = incidence[:, words]
+        co = (sub.T @ sub).toarray().astype(np.float64)
+        df = np.diag(co)
+        if measure == 'umass':
+            scores[k] = np.sum(np.log((co[j, i] + 1) / np.maximum(df[i], 1)))
+        elif measure == 'npmi':
+            p_ij = co[i, j] / n_docs
+            p_i, p_j = df[i] / n_docs, df[j] / n_docs
+            with np.errstate(divide='ignore', invalid='ignore'):
+                npmi = np.log(p_ij / (p_i * p_j)) / -np.log(p_ij)
+            npmi[p_ij == 0] = -1.0
+            npmi[p_ij == 1] = 1.0
+            scores[k] = npmi.mean()
+        else:
+            raise ValueError(f"未知的一致性指标: {measure}")
+    return scores
+
+
+class EarlyStopping:
+    """连续 patience 次评估的相对改进都小于 tol 时停止（至少训练 min_iter 轮）
+
+    metric: 'log_likelihood'（越大越好）或 'heldout_perplexity' / 'perplexity'（越小越好）
+    """
+
+    def __init__(self, metric='log_likelihood', tol=1e-3, patience=3, min_iter=50):
+        self.metric = metric
+        self.tol = tol
+        self.patience = patience
+        self.min_iter = min_iter
+        self.best = None
+        self.stale = 0
+
+    def update(self, iteration, metrics):
+        value = metrics[self.metric]
+        if self.metric == 'log_likelihood':
+            value = -value
+        if self.best is None or (self.best - value) > self.tol * abs(self.best):
+            self.stale = 0
+        else:
+            self.stale += 1
+        if self.best is None or value < self.best:
+            self.best = value
+        return iteration >= self.min_iter and self.stale >= self.patience
+
+
+class TrainingMonitor:
+    """每 eval_every 轮计算一次指标，写入指标文件（CSV），并按提前停止规则判断是否结束训练"""
+
+    COLUMNS = ['iteration', 'elapsed', 'log_likelihood', 'perplexity',
+               'heldout_perplexity', 'topic_entropy']
+
+    def __init__(self, eval_every=10, early_stopping=None, metrics_path=None, resume_iteration=0):
+        """resume_iteration > 0（从检查点继续训练）且指标文件已存在时，保留其中不晚于该轮的记录，
+        并用它们重建提前停止的状态，与未中断的训练一致；否则新建指标文件"""
+        self.eval_every = eval_every
+        self.early_stopping = early_stopping
+        self.metrics_path = metrics_path
+        self.history = []
+        if not metrics_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(metrics_path)), exist_ok=True)
+        if resume_iteration > 0 and os.path.exists(metrics_path):
+            self._resume(resume_iteration)
+        else:
+            with open(metrics_path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f).writerow(self.COLUMNS)
+
+    def _resume(self, resume_iteration):
+        with open(self.metrics_path, "r", encoding="utf-8", newline="") as f:
+            for record in csv.DictReader(f):
+                row = {c: float(record[c]) for c in self.COLUMNS}
+                row['iteration'] = int(row['iteration'])
+                # 检查点之后的评估来自被丢弃的采样状态，不保留
+                if row['iteration'] > resume_iteration:
+                    break
+                self.history.append(row)
+                if self.early_stopping is not None:
+                    self.early_stopping.update(row['iteration'], row)
+        with open(self.metrics_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.COLUMNS)
+            writer.writerows([row[c] for c in self.COLUMNS] for row in self.history)
+
+    def evaluate(self, lda, iteration, elapsed):
+        lda.compute_theta_phi()
+        row = {
+            'iteration': iteration,
+            'elapsed': round(elapsed, 3),
+            'log_likelihood': log_likelihood(lda.nw, lda.nd, lda.nwsum, lda.ndsum, lda.alpha, lda.beta),
+            'perplexity': perplexity(lda.tokens, lda.doc_ids, lda.nd, lda.ndsum, lda.alpha, lda.phi),
+            'heldout_perplexity': perplexity(lda.heldout_tokens, lda.heldout_doc_ids,
+                                             lda.nd, lda.ndsum, lda.alpha, lda.phi),
+            'topic_entropy': float(lda.topic_entropy()),
+        }
+        self.history.append(row)
+        if self.metrics_path:
+            with open(self.metrics_path, "a", encoding="utf-8", newline="") as f:
+                csv.writer(f).writerow([row[c] for c in self.COLUMNS])
+        return row
+
+    def step(self, lda, it, elapsed):
+        """第 it 轮（从 0 开始）结束时调用，返回是否提前停止"""
+        if self.eval_every <= 0 or (it + 1) % self.eval_every:
+            return False
+        row = self.evaluate(lda, it + 1, elapsed)
+        print(f"评估 {it+1} | 对数似然: {row['log_likelihood']:.4e} | 困惑度: {row['perplexity']:.1f} | "
+              f"留出困惑度: {row['heldout_perplexity']:.1f}")
+        return self.early_stopping is not None and self.early_stopping.update(it + 1, row)
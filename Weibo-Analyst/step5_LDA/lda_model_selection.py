@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+主题数（及 α / β）选择：一次预处理，多进程并行训练参数网格
+
+评论表只分词、建词表一次，词 id 数组、文档边界和文档-词出现矩阵放入共享内存，
+每个工作进程直接在共享数组上构造语料训练一组 (K, α, β)，不重复预处理、不复制语料。
+所有配置使用相同的留出词（LDAModel 的留出划分由固定种子决定），留出困惑度可直接比较；
+训练以留出困惑度提前停止，之后计算：
+    log_likelihood / perplexity / heldout_perplexity   见 lda_metrics
+    umass / npmi                                        各主题前 topN 个词的一致性均值
+结果写入 model_selection.csv（每个配置一行）与 model_selection.json（另含各主题关键词与一致性）。
+困惑度通常随 K 单调下降，选择时以 NPMI 为主、留出困惑度为辅。
+"""
+import os
+import csv
+import json
+import time
+import argparse
+import itertools
+import multiprocessing as mp
+
+import numpy as np
+from scipy import sparse
+
+from lda_topic_trainer import DocumentList, LDAModel
+from lda_metrics import TrainingMonitor, EarlyStopping, doc_word_incidence, topic_coherence
+from lda_distributed import to_shared, attach_shared
+from lda_results import top_words
+from lda_sampler import flatten_docs
+
+COLUMNS = ['K', 'alpha', 'beta', 'iterations', 'elapsed', 'log_likelihood', 'perplexity',
+           'heldout_perplexity', 'umass', 'npmi']
+
+_worker = {}
+
+
+class SharedCorpus:
+    """共享内存中的语料，接口与 DataPreProcessing 相同"""
+
+    def __init__(self, tokens, offsets, id2word):
+        self.docs = DocumentList(tokens, offsets)
+        self.id2word = dict(enumerate(id2word))
+        self.words_count = len(id2word)
+        self.docs_count = len(self.docs)
+
+
+def _init_worker(specs, id2word, settings):
+    arrays = {}
+    for key, spec in specs.items():
+        shm, arrays[key] = attach_shared(spec)
+        _worker.setdefault('blocks', []).append(shm)
+    _worker['corpus'] = SharedCorpus(arrays['tokens'], arrays['offsets'], id2word)
+    _worker['incidence'] = sparse.csc_matrix(
+        (arrays['data'], arrays['indices'], arrays['indptr']),
+        shape=(len(arrays['offsets']) - 1, len(id2word)))
+    _worker['settings'] = settings
+
+
+def _train_config(config):
+    K, alpha, beta = config
+    corpus, incidence = _worker['corpus'], _worker['incidence']
+    s = _worker['settings']
+    start_time = time.time()
+    lda = LDAModel(corpus, K=K, alpha=alpha, beta=beta, iterations=s['iterations'],
+                   topN=s['topN'], holdout=s['holdout'])
+    metric = 'heldout_perplexity' if s['holdout'] > 0 else 'log_likelihood'
+    monitor = TrainingMonitor(s['eval_every'], EarlyStopping(metric))
+    lda.train(monitor=monitor)
+    row = monitor.evaluate(lda, lda.iteration, time.time() - start_time)
+
+    top = top_words(lda.phi, s['topN'])
+    umass = topic_coherence(incidence, top, 'umass')
+    npmi = topic_coherence(incidence, top, 'npmi')
+    if s['save_dir']:
+        lda.save_results(os.path.join(s['save_dir'], config_name(config)))
+    return {
+        'K': K, 'alpha': alpha, 'beta': beta, 'iterations': lda.iteration,
+        'elapsed': round(time.time() - start_time, 1),
+        'log_likelihood': row['log_likelihood'], 'perplexity': row['perplexity'],
+        'heldout_perplexity': row['heldout_perplexity'],
+        'umass': float(umass.mean()), 'npmi': float(npmi.mean()),
+        'topics': [{'words': [corpus.id2word[int(w)] for w in words],
+                    'umass': float(u), 'npmi': float(n)}
+                   for words, u, n in zip(top, umass, npmi)],
+    }
+
+
+def config_name(config):
+    K, alpha, beta = config
+    return f"K{K}_a{alpha:g}_b{beta:g}"
+
+
+def select_models(corpus, topics, alphas=(0.1,), betas=(0.01,), workers=None, iterations=500,
+                  holdout=0.1, eval_every=10, topN=10, save_dir=None):
+    """并行训练 topics × alphas × betas 的参数网格，返回每个配置的指标（按网格顺序）
+
+    corpus: DataPreProcessing（已 parse_data）或任何有 docs / id2word / words_count 的语料；
+    save_dir 不为空时每个配置的完整结果（save_results）保存到 save_dir/K{K}_a{α}_b{β}
+    """
+    grid = list(itertools.product(topics, alphas, betas))
+    workers = min(workers or mp.cpu_count(), len(grid))
+    tokens, _, offsets = flatten_docs(corpus.docs)
+    incidence = doc_word_incidence(tokens, offsets, corpus.words_count)
+    id2word = [corpus.id2word[i] for i in range(corpus.words_count)]
+    settings = {'iterations': iterations, 'holdout': holdout, 'eval_every': eval_every,
+                'topN': topN, 'save_dir': save_dir}
+    print(f"模型选择: {len(grid)} 组参数, {workers} 个进程, 语料 {len(tokens)} 词 / {len(offsets) - 1} 篇文档")
+
+    blocks, specs = [], {}
+    for key, arr in (('tokens', tokens), ('offsets', offsets), ('data', incidence.data),
+                     ('indices', incidence.indices), ('indptr', incidence.indptr)):
+        shm, _, specs[key] = to_shared(arr)
+        blocks.append(shm)
+
+    start_time = time.time()
+    rows = {}
+    try:
+        # 主题数大的配置耗时长，先提交，减少最后只剩一个进程在跑的时间
+        order = sorted(grid, key=lambda c: -c[0])
+        with mp.Pool(workers, initializer=_init_worker, initargs=(specs, id2word, settings)) as pool:
+            for row in pool.imap_unordered(_train_config, order):
+                rows[(row['K'], row['alpha'], row['beta'])] = row
+                print(f"完成 {config_name((row['K'], row['alpha'], row['beta']))} | "
+                      f"留出困惑度: {row['heldout_perplexity']:.1f} | UMass: {row['umass']:.3f} | "
+                      f"NPMI: {row['npmi']:.3f} | 用时: {row['elapsed']:.1f}s")
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    print(f"模型选择完成! 总用时: {time.time()-start_time:.1f}秒")
+    return [rows[c] for c in grid]
+
+
+def best_config(rows):
+    """NPMI 最高的配置；NPMI 相差不到 0.01 时取留出困惑度较低者"""
+    top = max(r['npmi'] for r in rows)
+    close = [r for r in rows if r['npmi'] >= top - 0.01]
+    return min(close, key=lambda r: (r['heldout_perplexity'], -r['npmi']))
+
+
+def save_report(rows, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "model_selection.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow([row[c] for c in COLUMNS])
+    best = best_config(rows)
+    with open(os.path.join(output_dir, "model_selection.json"), "w", encoding="utf-8") as f:
+        json.dump({'best': {c: best[c] for c in COLUMNS}, 'models': rows}, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'K':>4}{'alpha':>8}{'beta':>8}{'迭代':>6}{'留出困惑度':>12}{'UMass':>9}{'NPMI':>8}")
+    for row in rows:
+        mark = " *" if row is best else ""
+        print(f"{row['K']:>4}{row['alpha']:>8g}{row['beta']:>8g}{row['iterations']:>6}"
+              f"{row['heldout_perplexity']:>12.1f}{row['umass']:>9.3f}{row['npmi']:>8.3f}{mark}")
+    print(f"推荐配置: {config_name((best['K'], best['alpha'], best['beta']))}，报告保存在: {output_dir}")
+    return best
+
+
+if __name__ == '__main__':
+    from lda_topic_trainer import DataPreProcessing
+
+    parser = argparse.ArgumentParser(description='并行训练多组主题数/超参数，按一致性与困惑度选择模型')
+    parser.add_argument('--table', type=str, required=True, help='评论表名')
+    parser.add_argument('--topics', type=int, nargs='+', default=[5, 10, 15, 20, 30], help='候选主题数')
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.1], help='候选 alpha')
+    parser.add_argument('--betas', type=float, nargs='+', default=[0.01], help='候选 beta')
+    parser.add_argument('--iterations', type=int, default=500, help='最大迭代次数（收敛后提前停止）')
+    parser.add_argument('--holdout', type=float, default=0.1, help='留出词比例')
+    parser.add_argument('--topn', type=int, default=10, help='计算一致性的每主题关键词数')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认 CPU 核数')
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='报告目录，默认 results/<表名>/model_selection')
+    parser.add_argument('--save_models', action='store_true', help='同时保存每个配置的完整训练结果')
+    args = parser.parse_args()
+
+    dpre = DataPreProcessing(args.table)
+    if not dpre.parse_data():
+        print(f"表 {args.table} 无有效数据，退出")
+        exit(1)
+    output_dir = args.output_dir or os.path.join("results", args.table, "model_selection")
+    rows = select_models(dpre, args.topics, args.alphas, args.betas, args.workers, args.iterations,
+                         args.holdout, topN=args.topn, save_dir=output_dir if args.save_models else None)
+    save_report(rows, output_dir)
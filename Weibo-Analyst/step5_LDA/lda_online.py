@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+在线变分贝叶斯 LDA（Hoffman et al. 2010, Online Learning for Latent Dirichlet Allocation）
+
+评论按小批量从数据库流式游标（SSCursor）或文本文件读入，每批做一次 E 步（批内向量化）
+和一次随机自然梯度 M 步：
+    λ ← (1-ρ)·λ + ρ·(η + D/|B| · sstats),   ρ = (τ0 + t)^(-κ)
+内存只与 词表大小 × 主题数 有关，与语料规模无关；模型可保存，之后有新评论时继续 partial_fit。
+模型记录每张评论表已读到的 id，再次从同一张表训练时只读取之后新增的评论。
+
+词表随数据增长：一个词累计出现 min_count 次后才分配 id（对应 DataPreProcessing 中词频 >= 3 的过滤），
+新词在 λ 中追加一列。
+"""
+import os
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from scipy.special import digamma
+
+from lda_topic_trainer import DataPreProcessing, DB_CONFIG
+
+
+def iter_table_comments(table_name, batch_size=1000, after_id=0):
+    """用服务端游标按 id 顺序逐批读取 id > after_id 的评论，不把整张表载入内存
+
+    产生 (本批最后一行的 id, 评论列表)
+    """
+    import pymysql
+    conn = pymysql.connect(cursorclass=pymysql.cursors.SSCursor, **DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT id, comment FROM {table_name} WHERE id > %s ORDER BY id", (after_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows[-1][0], [row[1] for row in rows if row[1]]
+    finally:
+        conn.close()
+
+
+def iter_file_comments(path, batch_size=1000, keep_blank=False):
+    """逐批读取文本文件，每行一条评论；keep_blank 为 True 时空行保留为空字符串，输出与输入逐行对应"""
+    batch = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line or keep_blank:
+                batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def dirichlet_expectation(a):
+    """E[log X]，X ~ Dir(a)，按最后一维"""
+    return digamma(a) - digamma(a.sum(axis=-1, keepdims=True))
+
+
+class StreamingVocabulary:
+    """增量词表：候选词累计出现 min_count 次后分配 id；候选表过大时淘汰只出现一次的词"""
+
+    def __init__(self, min_count=3, max_size=None, max_pending=200000):
+        self.min_count = min_count
+        self.max_size = max_size
+        self.max_pending = max_pending
+        self.word2id = {}
+        self.id2word = []
+        self.pending = Counter()
+
+    def __len__(self):
+        return len(self.id2word)
+
+    def update(self, token_lists):
+        """统计一批文档的词频，返回本批新加入词表的词数"""
+        before = len(self.id2word)
+        for tokens in token_lists:
+            for word in tokens:
+                if word in self.word2id:
+                    continue
+                self.pending[word] += 1
+                if self.pending[word] >= self.min_count and (
+                        self.max_size is None or len(self.id2word) < self.max_size):
+                    del self.pending[word]
+                    self.word2id[word] = len(self.id2word)
+                    self.id2word.append(word)
+        if len(self.pending) > self.max_pending:
+            self.pending = Counter({w: c for w, c in self.pending.items() if c > 1})
+        return len(self.id2word) - before
+
+    def encode(self, token_lists, min_doc_len=1):
+        """文档 -> (行号, 词 id, 次数) 的稀疏三元组；词表外的词丢弃，过短的文档跳过
+
+        返回 (rows, cols, counts, kept)，kept 为保留下来的文档在输入中的下标
+        """
+        word2id = self.word2id
+        ids, lengths, kept = [], [], []
+        for i, tokens in enumerate(token_lists):
+            doc = [word2id[w] for w in tokens if w in word2id]
+            if len(doc) >= min_doc_len:
+                ids.extend(doc)
+                lengths.append(len(doc))
+                kept.append(i)
+        doc_index = np.repeat(np.arange(len(kept), dtype=np.int64), lengths)
+        keys, counts = np.unique(doc_index * max(len(word2id), 1) + np.array(ids, dtype=np.int64),
+                                 return_counts=True)
+        rows, cols = np.divmod(keys, max(len(word2id), 1))
+        return rows, cols, counts.astype(np.float64), np.array(kept, dtype=np.int64)
+
+
+class OnlineLDA:
+    def __init__(self, K=15, alpha=0.1, eta=0.01, tau0=10.0, kappa=0.7, total_docs=None,
+                 min_count=3, max_vocab=None, min_doc_len=6, topN=20, seed=42, tokenize=None):
+        """
+        tau0, kappa: 学习率 ρ = (tau0 + t)^(-kappa)；评论表规模通常只有数千到数万条，tau0 取较小值收敛更快
+        total_docs: 语料总文档数 D 的估计；为 None 时使用目前已见到的文档数（持续流入的评论）
+        min_doc_len: 保留文档的最少有效词数（与 DataPreProcessing 的长度 > 5 一致）
+        tokenize: 文本 -> 词列表；默认使用 DataPreProcessing 的 jieba 分词与停用词过滤
+        """
+        self.K = K
+        self.alpha = alpha
+        self.eta = eta
+        self.tau0 = tau0
+        self.kappa = kappa
+        self.total_docs = total_docs
+        self.min_doc_len = min_doc_len
+        self.topN = topN
+        self.rng = np.random.default_rng(seed)
+        self.vocab = StreamingVocabulary(min_count, max_vocab)
+        self.tokenize = tokenize or DataPreProcessing("").process_text
+
+        self.lam = np.empty((K, 0))
+        self.exp_elog_beta = np.empty((K, 0))
+        self.updates = 0
+        self.docs_seen = 0
+        self.last_ids = {}  # 评论表名 -> 已训练到的最大 id
+
+    @property
+    def words_count(self):
+        return len(self.vocab)
+
+    def _grow(self):
+        """词表新增的词在 λ 中追加列（随机初始化，与首批的初始化方式相同）"""
+        added = self.words_count - self.lam.shape[1]
+        if added > 0:
+            init = self.rng.gamma(100.0, 0.01, (self.K, added))
+            self.lam = np.hstack([self.lam, init])
+            self.exp_elog_beta = np.exp(dirichlet_expectation(self.lam))
+
+    def _e_step(self, rows, cols, counts, n_docs, max_iter=100, tol=1e-3):
+        """批内向量化的变分 E 步，返回 (gamma, 批内词 id, 对应列的充分统计量)"""
+        uniq, local = np.unique(cols, return_inverse=True)
+        X = sparse.csr_matrix((counts, (rows, local)), shape=(n_docs, len(uniq)))
+        row_of = np.repeat(np.arange(n_docs), np.diff(X.indptr))
+        exp_beta = self.exp_elog_beta[:, uniq]
+
+        gamma = self.rng.gamma(100.0, 0.01, (n_docs, self.K))
+        exp_theta = np.exp(dirichlet_expectation(gamma))
+        for _ in range(max_iter):
+            phinorm = np.einsum('nk,kn->n', exp_theta[row_of], exp_beta[:, X.indices]) + 1e-100
+            ratio = sparse.csr_matrix((X.data / phinorm, X.indices, X.indptr), shape=X.shape)
+            new_gamma = self.alpha + exp_theta * (ratio @ exp_beta.T)
+            change = np.abs(new_gamma - gamma).mean()
+            gamma = new_gamma
+            exp_theta = np.exp(dirichlet_expectation(gamma))
+            if change < tol:
+                break
+
+        phinorm = np.einsum('nk,kn->n', exp_theta[row_of], exp_beta[:, X.indices]) + 1e-100
+        ratio = sparse.csr_matrix((X.data / phinorm, X.indices, X.indptr), shape=X.shape)
+        sstats = (ratio.T @ exp_theta).T * exp_beta
+        return gamma, uniq, sstats
+
+    def _encode(self, texts, update_vocab):
+        token_lists = [self.tokenize(t) for t in texts if t]
+        if update_vocab:
+            self.vocab.update(token_lists)
+            self._grow()
+        return self.vocab.encode(token_lists, self.min_doc_len)
+
+    def partial_fit(self, texts):
+        """用一批评论更新模型，返回 (有效文档数, 该批更新前的困惑度估计)"""
+        rows, cols, counts, kept = self._encode(texts, update_vocab=True)
+        n_docs = len(kept)
+        if n_docs == 0:
+            return 0, float('nan')
+
+        gamma, uniq, sstats = self._e_step(rows, cols, counts, n_docs)
+        perplexity = self._perplexity(gamma, rows, cols, counts)
+
+        self.docs_seen += n_docs
+        D = self.total_docs or self.docs_seen
+        rho = (self.tau0 + self.updates) ** -self.kappa
+        self.lam *= 1 - rho
+        self.lam += rho * self.eta
+        self.lam[:, uniq] += rho * D / n_docs * sstats
+        self.exp_elog_beta = np.exp(dirichlet_expectation(self.lam))
+        self.updates += 1
+        return n_docs, perplexity
+
+    def fit_stream(self, batches, log_every=10):
+        """消费批次迭代器直到耗尽"""
+        start_time = time.time()
+        for i, texts in enumerate(batches):
+            n_docs, perplexity = self.partial_fit(texts)
+            if (i + 1) % log_every == 0 or i == 0:
+                print(f"批次 {i+1} | 有效文档 {n_docs} | 累计文档 {self.docs_seen} | "
+                      f"词表 {self.words_count} | 困惑度 {perplexity:.1f} | 用时 {time.time()-start_time:.1f}s")
+        print(f"在线训练完成! 共 {self.updates} 次更新, 文档 {self.docs_seen}, 总用时: {time.time()-start_time:.1f}秒")
+        return self
+
+    def fit_table(self, table_name, batch_size=1000, log_every=10):
+        """从评论表中上次读到的位置继续训练，只使用新增的评论"""
+        after_id = self.last_ids.get(table_name, 0)
+        if after_id:
+            print(f"表 {table_name} 已训练到 id {after_id}，只读取新增评论")
+
+        def batches():
+            for last_id, texts in iter_table_comments(table_name, batch_size, after_id):
+                yield texts
+                self.last_ids[table_name] = int(last_id)
+
+        return self.fit_stream(batches(), log_every)
+
+    def _perplexity(self, gamma, rows, cols, counts):
+        """用当前 λ 和该批 gamma 估计每词困惑度（在 M 步之前计算，相当于对新数据的预测困惑度）"""
+        theta = gamma / gamma.sum(axis=1, keepdims=True)
+        phi = self.lam[:, cols] / self.lam.sum(axis=1, keepdims=True)
+        p = np.einsum('nk,kn->n', theta[rows], phi)
+        return float(np.exp(-(counts * np.log(p)).sum() / counts.sum()))
+
+    def transform(self, texts):
+        """推断文档-主题分布（不更新模型），返回 (theta, 保留文档的下标)"""
+        rows, cols, counts, kept = self._encode(texts, update_vocab=False)
+        if len(kept) == 0:
+            return np.empty((0, self.K)), kept
+        gamma, _, _ = self._e_step(rows, cols, counts, len(kept))
+        return gamma / gamma.sum(axis=1, keepdims=True), kept
+
+    @property
+    def phi(self):
+        return self.lam / self.lam.sum(axis=1, keepdims=True)
+
+    def save(self, path):
+        """保存模型（λ、词表与候选词计数、学习率进度、各评论表已读到的 id），之后可 load 后继续 partial_fit
+
+        通过文件句柄写入，path 不会被补上 .npz 后缀
+        """
+        pending_words = list(self.vocab.pending)
+        tables = list(self.last_ids)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, lam=self.lam,
+                     vocab=np.array(self.vocab.id2word, dtype=object),
+                     pending_words=np.array(pending_words, dtype=object),
+                     pending_counts=np.array([self.vocab.pending[w] for w in pending_words], dtype=np.int64),
+                     tables=np.array(tables, dtype=object),
+                     last_ids=np.array([self.last_ids[t] for t in tables], dtype=np.int64),
+                     params=np.array([self.K, self.alpha, self.eta, self.tau0, self.kappa,
+                                      self.total_docs or 0, self.vocab.min_count, self.min_doc_len,
+                                      self.updates, self.docs_seen], dtype=np.float64))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, tokenize=None, max_vocab=None):
+        with np.load(path, allow_pickle=True) as data:
+            K, alpha, eta, tau0, kappa, total_docs, min_count, min_doc_len, updates, docs_seen = data['params']
+            model = cls(int(K), alpha, eta, tau0, kappa, int(total_docs) or None, int(min_count),
+                        max_vocab, int(min_doc_len), tokenize=tokenize)
+            model.vocab.id2word = list(data['vocab'])
+            model.vocab.word2id = {w: i for i, w in enumerate(model.vocab.id2word)}
+            model.vocab.pending = Counter(dict(zip(data['pending_words'], data['pending_counts'].tolist())))
+            model.lam = data['lam']
+            if 'tables' in data:
+                model.last_ids = dict(zip(data['tables'].tolist(), data['last_ids'].tolist()))
+        model.exp_elog_beta = np.exp(dirichlet_expectation(model.lam))
+        model.updates = int(updates)
+        model.docs_seen = int(docs_seen)
+        return model
+
+    def save_results(self, output_dir):
+        """输出与 LDAModel.save_results 相同格式的结果目录（不含文档主题分布）"""
+        from lda_results import save_results
+        weights = self.lam.sum(axis=1) - self.eta * self.words_count
+        save_results(output_dir, self.phi, self.vocab.id2word, weights / weights.sum(),
+                     meta={'alpha': self.alpha, 'eta': self.eta, 'updates': self.updates}, topN=self.topN)
+        print(f"结果保存到: {output_dir}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='在线变分贝叶斯 LDA（流式小批量训练，可增量更新）')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--table', type=str, help='评论表名（服务端游标流式读取，载入的模型只读取上次之后新增的评论）')
+    source.add_argument('--input', type=str, help='文本文件，每行一条评论')
+    parser.add_argument('--model', type=str, default=None,
+                        help='模型文件（npz 格式，按原样使用文件名）；已存在时载入后继续训练，训练结束后保存到此处')
+    parser.add_argument('--output_dir', type=str, default=None, help='主题关键词输出目录')
+    parser.add_argument('--topics', type=int, default=15, help='主题数（新建模型时有效）')
+    parser.add_argument('--batch_size', type=int, default=1000, help='每批评论数')
+    parser.add_argument('--total_docs', type=int, default=None,
+                        help='语料总文档数估计（默认使用已见文档数）')
+    parser.add_argument('--max_vocab', type=int, default=None, help='词表上限')
+    args = parser.parse_args()
+
+    if args.model and os.path.exists(args.model):
+        lda = OnlineLDA.load(args.model, max_vocab=args.max_vocab)
+        print(f"载入模型: {args.model} (已更新 {lda.updates} 次, 词表 {lda.words_count})")
+    else:
+        lda = OnlineLDA(K=args.topics, total_docs=args.total_docs, max_vocab=args.max_vocab)
+
+    if args.table:
+        lda.fit_table(args.table, args.batch_size)
+    else:
+        lda.fit_stream(iter_file_comments(args.input, args.batch_size))
+
+    if args.model:
+        lda.save(args.model)
+        print(f"模型已保存: {args.model}")
+    if args.output_dir:
+        lda.save_results(args.output_dir)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+LDA 结果的紧凑表示与二进制读写
+
+评论通常只涉及少数几个主题，稠密的 文档数 × K 矩阵大部分是平滑项 α 带来的小值。
+这里每篇文档只保留概率最高的 k 个主题：编号用 uint8/uint16，概率用 float32，
+按块由 nd 计算，不需要先生成稠密的 theta。
+
+结果目录（save_results 写入，load_results 读取，.npy 均可内存映射按需读取）：
+    phi.npy                 主题-词分布，K × 词数，float32
+    topic_weights.npy       各主题占全部词的比例
+    doc_topic_ids.npy       每篇文档前 k 个主题的编号，文档数 × k，按概率降序
+    doc_topic_weights.npy   对应的概率，float32
+    theta.npy               （可选）完整的文档-主题分布，文档数 × K，float32，按块写入
+    vocab.txt               词表，第 i 行对应 phi 的第 i 列
+    topics_keywords.txt     各主题关键词（供人阅读）
+    meta.json               主题数、超参数、文档数、词数等
+旧版本输出的 topic_word_matrix.npz / doc_topics.csv 也可由 load_results 读取。
+"""
+import os
+import json
+
+import numpy as np
+from scipy import sparse
+
+from lda_sampler import topic_dtype
+
+
+def topk_doc_topics(nd, ndsum, alpha, k=3, chunk_size=65536):
+    """每篇文档概率最高的 k 个主题，返回 (topics, weights)，形如 (文档数, k)，按概率降序
+
+    同一文档内 theta ∝ nd + α，直接在计数上用 argpartition 选出前 k 个
+    """
+    n_docs, K = nd.shape
+    k = min(k, K)
+    topics = np.empty((n_docs, k), dtype=topic_dtype(K))
+    weights = np.empty((n_docs, k), dtype=np.float32)
+    for lo in range(0, n_docs, chunk_size):
+        counts = nd[lo:lo + chunk_size]
+        top = np.argpartition(counts, K - k, axis=1)[:, K - k:] if k < K else \
+            np.broadcast_to(np.arange(K), counts.shape).copy()
+        top_counts = np.take_along_axis(counts, top, axis=1)
+        # nd 可能是无符号类型，取负之前先转为有符号
+        keys = top_counts.astype(np.int64) if top_counts.dtype.kind == 'u' else top_counts
+        order = np.argsort(-keys, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_counts = np.take_along_axis(top_counts, order, axis=1)
+        topics[lo:lo + chunk_size] = top
+        weights[lo:lo + chunk_size] = (top_counts + alpha) / (ndsum[lo:lo + chunk_size, None] + K * alpha)
+    return topics, weights
+
+
+def top_words(phi, n=20):
+    """每个主题概率最高的 n 个词 id，形如 (K, n)，按概率降序；argpartition 避免整行排序"""
+    K, n_words = phi.shape
+    n = min(n, n_words)
+    top = np.argpartition(phi, n_words - n, axis=1)[:, n_words - n:]
+    order = np.argsort(-np.take_along_axis(phi, top, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(top, order, axis=1)
+
+
+def topk_to_sparse(topics, weights, K):
+    """top-k 结果 -> scipy CSR 稀疏矩阵（文档数 × K）"""
+    n_docs, k = topics.shape
+    indptr = np.arange(0, n_docs * k + 1, k, dtype=np.int64)
+    return sparse.csr_matrix((weights.ravel(), topics.ravel().astype(np.int32), indptr), shape=(n_docs, K))
+
+
+def write_topics_keywords(path, phi, id2word, topic_weights, topN=20):
+    """主题关键词文本：每个主题的权重及前 topN 个词与概率"""
+    top = top_words(phi, topN)
+    with open(path, "w", encoding="utf-8") as f:
+        for k in range(phi.shape[0]):
+            f.write(f"主题#{k} (权重: {topic_weights[k]:.3f}):\n")
+            for i in top[k]:
+                f.write(f"  {id2word[i]}: {phi[k, i]:.4f}\n")
+            f.write("\n")
+
+
+def save_dense_theta(path, nd, ndsum, alpha, chunk_size=65536):
+    """按块由 nd 计算完整 theta 写入 .npy（float32），不在内存中生成整个矩阵"""
+    n_docs, K = nd.shape
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n_docs, K))
+    for lo in range(0, n_docs, chunk_size):
+        out[lo:lo + chunk_size] = (nd[lo:lo + chunk_size] + alpha) / (ndsum[lo:lo + chunk_size, None] + K * alpha)
+    out.flush()
+    del out
+
+
+def save_results(output_dir, phi, id2word, topic_weights, doc_topics=None, meta=None, topN=20):
+    """写入二进制结果目录；doc_topics 为 topk_doc_topics 的返回值 (topics, weights)"""
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "phi.npy"), np.asarray(phi, dtype=np.float32))
+    np.save(os.path.join(output_dir, "topic_weights.npy"), np.asarray(topic_weights, dtype=np.float32))
+    if doc_topics is not None:
+        topics, weights = doc_topics
+        np.save(os.path.join(output_dir, "doc_topic_ids.npy"), topics)
+        np.save(os.path.join(output_dir, "doc_topic_weights.npy"), weights)
+    with open(os.path.join(output_dir, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(id2word))
+    write_topics_keywords(os.path.join(output_dir, "topics_keywords.txt"), phi, id2word, topic_weights, topN)
+    meta = dict(meta or {})
+    meta.update(K=int(phi.shape[0]), n_words=int(phi.shape[1]))
+    if doc_topics is not None:
+        meta.update(n_docs=int(doc_topics[0].shape[0]), topk=int(doc_topics[0].shape[1]))
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+class LDAResults:
+    """load_results 的返回值：phi、词表与 top-k 文档主题，未保存的部分为 None（旧版本输出没有词表时以词 id 代替）"""
+
+    def __init__(self, phi, id2word, topic_weights=None, doc_topic_ids=None, doc_topic_weights=None,
+                 theta=None, meta=None):
+        self.phi = phi
+        self.id2word = id2word if id2word is not None else [str(i) for i in range(phi.shape[1])]
+        self.word2id = {w: i for i, w in enumerate(self.id2word)}
+        self.topic_weights = topic_weights
+        self.doc_topic_ids = doc_topic_ids
+        self.doc_topic_weights = doc_topic_weights
+        self.theta = theta
+        self.meta = meta or {}
+        self.K = phi.shape[0]
+
+    def top_words(self, topic, n=20):
+        """主题 topic 的前 n 个词 [(词, 概率), ...]"""
+        row = np.asarray(self.phi[topic])
+        return [(self.id2word[i], float(row[i])) for i in top_words(row[None, :], n)[0]]
+
+    def doc_topics(self, doc):
+        """第 doc 篇文档的 [(主题, 概率), ...]，按概率降序"""
+        return list(zip(self.doc_topic_ids[doc].tolist(), self.doc_topic_weights[doc].tolist()))
+
+    def doc_topic_matrix(self):
+        """top-k 文档主题的稀疏矩阵（文档数 × K，CSR）"""
+        return topk_to_sparse(np.asarray(self.doc_topic_ids), np.asarray(self.doc_topic_weights), self.K)
+
+    def topic_docs(self, topic, n=20):
+        """以 topic 为主要主题之一、概率最高的 n 篇文档 [(文档, 概率), ...]"""
+        weights = np.where(self.doc_topic_ids == topic, self.doc_topic_weights, 0).max(axis=1)
+        n = min(n, int(np.count_nonzero(weights)))
+        top = np.argpartition(-weights, n - 1)[:n] if n else np.empty(0, dtype=np.int64)
+        top = top[np.argsort(-weights[top], kind='stable')]
+        return [(int(m), float(weights[m])) for m in top]
+
+
+def load_results(result_dir, mmap=True, topk=3):
+    """读取 save_results 的输出目录；mmap 为 True 时 .npy 以只读内存映射方式打开
+
+    旧格式（topic_word_matrix.npz、doc_topics.csv）会在读取时换算为相同的表示，文档主题保留前 topk 个；
+    没有 vocab.txt 时 id2word 为词 id 字符串
+    """
+    def path(name):
+        return os.path.join(result_dir, name)
+
+    def load(name):
+        return np.load(path(name), mmap_mode="r" if mmap else None) if os.path.exists(path(name)) else None
+
+    id2word = None
+    if os.path.exists(path("vocab.txt")):
+        with open(path("vocab.txt"), "r", encoding="utf-8") as f:
+            id2word = f.read().split("\n")
+    meta = {}
+    if os.path.exists(path("meta.json")):
+        with open(path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+    phi = load("phi.npy")
+    if phi is None:
+        phi = np.load(path("topic_word_matrix.npz"))['data']
+    ids, weights = load("doc_topic_ids.npy"), load("doc_topic_weights.npy")
+    if ids is None and os.path.exists(path("doc_topics.csv")):
+        theta = np.loadtxt(path("doc_topics.csv"), delimiter=",", ndmin=2)
+        # α = 0、ndsum = 1 时 topk_doc_topics 的权重就是 theta 本身
+        ids, weights = topk_doc_topics(theta, np.ones(len(theta)), 0.0, topk)
+    return LDAResults(phi, id2word, load("topic_weights.npy"), ids, weights, load("theta.npy"), meta)
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+LDA 坍缩 Gibbs 采样内核
+
+语料展平为连续的 词id / 文档id 数组，每轮迭代一次性预先抽取全部均匀随机数，
+按累积和做逆 CDF 采样，条件分布与 LDAModel 原始逐词循环完全相同：
+    p(z=k) ∝ (nw[w,k] + β) · (nd[m,k] + α) / (nwsum[k] + Vβ)
+安装了 numba 时内核编译为机器码；否则退化为逐词 NumPy 向量运算（仍比 rng.choice 快）。
+
+主题数较大时可用 SparseLDA 内核（Yao et al. 2009），把条件分布拆成三个桶：
+    s = Σ_k αβ / (nwsum[k] + Vβ)                    平滑桶，与文档和词无关，增量维护
+    r = Σ_{k∈文档} nd[m,k]·β / (nwsum[k] + Vβ)       文档桶，只含文档中出现的主题
+    q = Σ_{k∈词} (nd[m,k] + α)·nw[w,k] / (nwsum[k] + Vβ)   词桶，只含该词出现过的主题
+大部分概率质量落在 q 桶，每个词的开销取决于文档/词实际出现的主题数而不是 K。
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """没有 numba 时的占位装饰器"""
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def topic_dtype(K):
+    """主题编号的最小存储类型"""
+    return np.uint8 if K <= 256 else np.uint16 if K <= 65536 else np.int32
+
+
+def count_dtype(max_count):
+    """取值不超过 max_count 的计数的最小存储类型"""
+    return np.uint8 if max_count < 256 else np.uint16 if max_count < 65536 else np.int32
+
+
+def flatten_docs(docs):
+    """Document 列表 -> (tokens, doc_ids, offsets)，均为连续数组；DocumentList 直接使用其数组"""
+    if hasattr(docs, 'offsets'):
+        doc_ids = np.repeat(np.arange(len(docs), dtype=np.int32), np.diff(docs.offsets))
+        return docs.tokens, doc_ids, docs.offsets
+    lengths = np.fromiter((len(d.words) for d in docs), dtype=np.int64, count=len(docs))
+    offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    tokens = np.fromiter((w for d in docs for w in d.words), dtype=np.int32, count=int(offsets[-1]))
+    doc_ids = np.repeat(np.arange(len(docs), dtype=np.int32), lengths)
+    return tokens, doc_ids, offsets
+
+
+def init_counts(tokens, doc_ids, z, n_words, n_docs, K):
+    """由主题分配向量化地构造计数矩阵 (nw, nd, nwsum, ndsum)
+
+    nd 按最长文档的词数选用 uint8/uint16（评论通常很短），其余为 int32
+    """
+    nwsum = np.bincount(z, minlength=K)
+    ndsum = np.bincount(doc_ids, minlength=n_docs)
+    nw = np.zeros((n_words, K), dtype=np.int32)
+    nd = np.zeros((n_docs, K), dtype=count_dtype(int(ndsum.max()) if n_docs else 0))
+    # 分块计数：每块只对其覆盖的文档范围做 bincount，避免 文档数 × K 的 int64 临时数组
+    for lo in range(0, len(tokens), SWEEP_CHUNK):
+        zc = z[lo:lo + SWEEP_CHUNK]
+        nw += np.bincount(tokens[lo:lo + SWEEP_CHUNK].astype(np.int64) * K + zc,
+                          minlength=n_words * K).reshape(n_words, K).astype(np.int32)
+        dc = doc_ids[lo:lo + SWEEP_CHUNK]
+        d0, d1 = int(dc.min()), int(dc.max()) + 1
+        nd[d0:d1] += np.bincount((dc - d0).astype(np.int64) * K + zc,
+                                 minlength=(d1 - d0) * K).reshape(d1 - d0, K).astype(nd.dtype)
+    return nw, nd, nwsum.astype(np.int32), ndsum.astype(np.int32)
+
+
+@njit(cache=True, nogil=True)
+def _sweep_numba(tokens, doc_ids, z, nw, nd, nwsum, alpha, beta, vbeta, uniforms):
+    K = nwsum.shape[0]
+    cdf = np.empty(K, dtype=np.float64)
+    for i in range(tokens.shape[0]):
+        w = tokens[i]
+        m = doc_ids[i]
+        t = z[i]
+        nw[w, t] -= 1
+        nd[m, t] -= 1
+        nwsum[t] -= 1
+
+        total = 0.0
+        for k in range(K):
+            total += (nw[w, k] + beta) * (nd[m, k] + alpha) / (nwsum[k] + vbeta)
+            cdf[k] = total
+        u = uniforms[i] * total
+        t = 0
+        while t < K - 1 and cdf[t] <= u:
+            t += 1
+
+        z[i] = t
+        nw[w, t] += 1
+        nd[m, t] += 1
+        nwsum[t] += 1
+
+
+def _sweep_numpy(tokens, doc_ids, z, nw, nd, nwsum, alpha, beta, vbeta, uniforms):
+    K = nwsum.shape[0]
+    last = K - 1
+    for i in range(tokens.shape[0]):
+        w = tokens[i]
+        m = doc_ids[i]
+        t = z[i]
+        nw[w, t] -= 1
+        nd[m, t] -= 1
+        nwsum[t] -= 1
+
+        cdf = np.cumsum((nw[w] + beta) * (nd[m] + alpha) / (nwsum + vbeta))
+        t = min(int(np.searchsorted(cdf, uniforms[i] * cdf[-1], side='right')), last)
+
+        z[i] = t
+        nw[w, t] += 1
+        nd[m, t] += 1
+        nwsum[t] += 1
+
+
+@njit(cache=True, nogil=True)
+def _list_remove(items, pos, length, k):
+    """从 (items, pos) 表示的无序集合中删除 k，返回新长度"""
+    i = pos[k]
+    length -= 1
+    last = items[length]
+    items[i] = last
+    pos[last] = i
+    pos[k] = -1
+    return length
+
+
+@njit(cache=True, nogil=True)
+def _word_topic_sets(nw):
+    """每个词出现过的主题集合（无序数组 + 位置索引 + 长度），供 _sweep_sparse 增量维护"""
+    n_words, K = nw.shape
+    wt_items = np.empty((n_words, K), dtype=np.int32)
+    wt_pos = np.full((n_words, K), -1, dtype=np.int32)
+    wt_len = np.zeros(n_words, dtype=np.int32)
+    for w in range(n_words):
+        for k in range(K):
+            if nw[w, k] > 0:
+                wt_items[w, wt_len[w]] = k
+                wt_pos[w, k] = wt_len[w]
+                wt_len[w] += 1
+    return wt_items, wt_pos, wt_len
+
+
+@njit(cache=True, nogil=True)
+def _sweep_sparse(tokens, doc_ids, z, nw, nd, nwsum, alpha, beta, vbeta, uniforms,
+                  wt_items, wt_pos, wt_len):
+    K = nw.shape[1]
+    ab = alpha * beta
+
+    denom = np.empty(K, dtype=np.float64)
+    s = 0.0
+    for k in range(K):
+        denom[k] = 1.0 / (nwsum[k] + vbeta)
+        s += ab * denom[k]
+    # q_coef[k] = (nd[m,k] + α) / (nwsum[k] + Vβ)，不在文档中的主题为 α / (nwsum[k] + Vβ)
+    q_coef = alpha * denom
+    dt_items = np.empty(K, dtype=np.int32)
+    dt_pos = np.full(K, -1, dtype=np.int32)
+    dt_len = 0
+    q_vals = np.empty(K, dtype=np.float64)
+
+    current = -1
+    r = 0.0
+    for i in range(tokens.shape[0]):
+        w = tokens[i]
+        m = doc_ids[i]
+        if m != current:
+            # 换文档：复位上一篇文档的主题，建立本文档的主题集合与 r 桶
+            for j in range(dt_len):
+                k = dt_items[j]
+                dt_pos[k] = -1
+                q_coef[k] = alpha * denom[k]
+            dt_len = 0
+            r = 0.0
+            for k in range(K):
+                if nd[m, k] > 0:
+                    dt_items[dt_len] = k
+                    dt_pos[k] = dt_len
+                    dt_len += 1
+                    r += nd[m, k] * beta * denom[k]
+                    q_coef[k] = (nd[m, k] + alpha) * denom[k]
+            current = m
+
+        # 移除当前词
+        t = z[i]
+        s -= ab * denom[t]
+        r -= nd[m, t] * beta * denom[t]
+        nw[w, t] -= 1
+        nd[m, t] -= 1
+        nwsum[t] -= 1
+        denom[t] = 1.0 / (nwsum[t] + vbeta)
+        s += ab * denom[t]
+        r += nd[m, t] * beta * denom[t]
+        q_coef[t] = (nd[m, t] + alpha) * denom[t]
+        if nd[m, t] == 0:
+            dt_len = _list_remove(dt_items, dt_pos, dt_len, t)
+        if nw[w, t] == 0:
+            wt_len[w] = _list_remove(wt_items[w], wt_pos[w], wt_len[w], t)
+
+        # q 桶只遍历该词出现过的主题
+        q = 0.0
+        for j in range(wt_len[w]):
+            k = wt_items[w, j]
+            q += q_coef[k] * nw[w, k]
+            q_vals[j] = q
+
+        u = uniforms[i] * (s + r + q)
+        if u < q:
+            j = 0
+            while j < wt_len[w] - 1 and q_vals[j] <= u:
+                j += 1
+            t = wt_items[w, j]
+        elif u < q + r and dt_len > 0:
+            # 文档主题集合为空时 r 只剩浮点误差，落到 s 桶
+            u -= q
+            acc = 0.0
+            t = dt_items[dt_len - 1]
+            for j in range(dt_len):
+                k = dt_items[j]
+                acc += nd[m, k] * beta * denom[k]
+                if acc > u:
+                    t = k
+                    break
+        else:
+            u -= q + r
+            acc = 0.0
+            t = K - 1
+            for k in range(K):
+                acc += ab * denom[k]
+                if acc > u:
+                    t = k
+                    break
+
+        # 加入新主题
+        s -= ab * denom[t]
+        r -= nd[m, t] * beta * denom[t]
+        nw[w, t] += 1
+        nd[m, t] += 1
+        nwsum[t] += 1
+        denom[t] = 1.0 / (nwsum[t] + vbeta)
+        s += ab * denom[t]
+        r += nd[m, t] * beta * denom[t]
+        q_coef[t] = (nd[m, t] + alpha) * denom[t]
+        if nd[m, t] == 1:
+            dt_items[dt_len] = t
+            dt_pos[t] = dt_len
+            dt_len += 1
+        if nw[w, t] == 1:
+            wt_items[w, wt_len[w]] = t
+            wt_pos[w, t] = wt_len[w]
+            wt_len[w] += 1
+        z[i] = t
+
+
+@njit(cache=True, nogil=True)
+def _foldin_numba(tokens, doc_ids, z, nd, phi_t, alpha, uniforms):
+    K = nd.shape[1]
+    cdf = np.empty(K, dtype=np.float64)
+    for i in range(tokens.shape[0]):
+        w = tokens[i]
+        m = doc_ids[i]
+        nd[m, z[i]] -= 1
+
+        total = 0.0
+        for k in range(K):
+            total += phi_t[w, k] * (nd[m, k] + alpha)
+            cdf[k] = total
+        u = uniforms[i] * total
+        t = 0
+        while t < K - 1 and cdf[t] <= u:
+            t += 1
+
+        z[i] = t
+        nd[m, t] += 1
+
+
+def _foldin_numpy(tokens, doc_ids, z, nd, phi_t, alpha, uniforms):
+    last = nd.shape[1] - 1
+    for i in range(tokens.shape[0]):
+        m = doc_ids[i]
+        nd[m, z[i]] -= 1
+        cdf = np.cumsum(phi_t[tokens[i]] * (nd[m] + alpha))
+        t = min(int(np.searchsorted(cdf, uniforms[i] * cdf[-1], side='right')), last)
+        z[i] = t
+        nd[m, t] += 1
+
+
+def foldin_sweep(tokens, doc_ids, z, nd, phi_t, alpha, rng):
+    """固定主题-词分布的折叠采样（推断新文档）：p(z=k) ∝ φ[k,w] · (nd[m,k] + α)
+
+    phi_t 为 φ 的转置（词数 × K，C 连续），原地更新 z 与 nd
+    """
+    uniforms = rng.random(tokens.shape[0])
+    if HAVE_NUMBA:
+        _foldin_numba(tokens, doc_ids, z, nd, phi_t, alpha, uniforms)
+    else:
+        _foldin_numpy(tokens, doc_ids, z, nd, phi_t, alpha, uniforms)
+
+
+ENGINES = ('numba', 'numpy', 'sparse')
+
+# 主题数达到该值时默认使用 SparseLDA 内核
+SPARSE_MIN_TOPICS = 50
+
+# 每次调用采样内核处理的词数
+SWEEP_CHUNK = 1 << 20
+
+
+def default_engine(K=None):
+    if not HAVE_NUMBA:
+        if K is not None and K >= SPARSE_MIN_TOPICS:
+            print(f"警告: 未安装 numba，主题数 {K} 无法使用 SparseLDA 采样器，改用较慢的 numpy 采样器"
+                  f"（pip install numba）")
+        return 'numpy'
+    return 'sparse' if K is not None and K >= SPARSE_MIN_TOPICS else 'numba'
+
+
+def gibbs_sweep(tokens, doc_ids, z, nw, nd, nwsum, alpha, beta, n_words, rng, engine=None):
+    """对全部词做一轮坍缩 Gibbs 采样，原地更新 z 与计数矩阵
+
+    engine: numba（稠密，K 较小时最快）/ numpy（无 numba 时的回退）/
+    sparse（SparseLDA 分桶采样，适合 100 个以上主题；需要 numba，词须按文档连续排列）
+    """
+    engine = engine or default_engine()
+    if engine in ('numba', 'sparse') and not HAVE_NUMBA:
+        raise ValueError(f"采样器 {engine} 需要安装 numba（pip install numba），或改用 numpy 采样器")
+    kernel = {'sparse': _sweep_sparse, 'numba': _sweep_numba}.get(engine, _sweep_numpy)
+    vbeta = n_words * beta
+    # SparseLDA 的词-主题集合每轮只建一次，各块沿用（块之间 nw 只由内核修改）
+    extra = _word_topic_sets(nw) if kernel is _sweep_sparse else ()
+    # 均匀随机数分块抽取（与一次抽取的序列相同），内存不随词数增长
+    for lo in range(0, tokens.shape[0], SWEEP_CHUNK):
+        hi = min(lo + SWEEP_CHUNK, tokens.shape[0])
+        kernel(tokens[lo:hi], doc_ids[lo:hi], z[lo:hi], nw, nd, nwsum, alpha, beta, vbeta,
+               rng.random(hi - lo), *extra)
@@ -7,6 +7,10 @@ import random
 import time
 from collections import defaultdict, Counter
 import multiprocessing as mp
+from array import array
+
+from lda_sampler import flatten_docs, init_counts, gibbs_sweep, default_engine, topic_dtype
+from lda_metrics import TrainingMonitor, EarlyStopping
 
 # 数据库配置
 DB_CONFIG = {
@@ -23,6 +27,40 @@ class Document:
         self.words = []
         self.length = 0
 
+class Segments:
+    """按 offsets 切分的连续数组：segments[m] 是第 m 段的视图，按需创建，不预先保存切片对象"""
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, m):
+        return self.data[self.offsets[m]:self.offsets[m + 1]]
+
+class DocumentList:
+    """文档序列的紧凑存储：全部词 id 存在一个 int32 数组中，offsets[m]:offsets[m+1] 为第 m 篇文档
+
+    按下标或迭代取出的 Document 的 words 是该数组的视图，不复制
+    """
+    def __init__(self, tokens, offsets):
+        self.tokens = np.asarray(tokens, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, m):
+        doc = Document()
+        doc.words = self.tokens[self.offsets[m]:self.offsets[m + 1]]
+        doc.length = len(doc.words)
+        return doc
+
+    def __iter__(self):
+        for m in range(len(self)):
+            yield self[m]
+
 class DataPreProcessing:
     def __init__(self, table_name):
         self.docs_count = 0
@@ -82,7 +120,9 @@ class DataPreProcessing:
         self.word2id = {}
         self.id2word = {}
         
-        # 第二遍扫描：构建文档和词表
+        # 第二遍扫描：构建文档和词表（词 id 直接追加到连续的 int32 数组）
+        all_words = array('i')
+        offsets = array('q', [0])
         for comment in comments:
             if not comment:
                 continue
@@ -91,29 +131,32 @@ class DataPreProcessing:
             if not tokens:
                 continue
                 
-            doc = Document()
+            words = []
             for word in tokens:
                 if word in valid_words:
                     if word not in self.word2id:
                         word_id = len(self.word2id)
                         self.word2id[word] = word_id
                         self.id2word[word_id] = word
-                    doc.words.append(self.word2id[word])
+                    words.append(self.word2id[word])
             
-            doc.length = len(doc.words)
-            if doc.length > 5:  # 过滤短文档
-                self.docs.append(doc)
+            if len(words) > 5:  # 过滤短文档
+                all_words.extend(words)
+                offsets.append(len(all_words))
+        self.docs = DocumentList(np.frombuffer(all_words, dtype=np.int32),
+                                 np.frombuffer(offsets, dtype=np.int64))
         
         # 更新最终词表大小
         self.words_count = len(self.word2id)
         self.docs_count = len(self.docs)
         
         print(f"表: {self.table_name} | 过滤后词数: {self.words_count}")
-        print(f"有效文档数: {self.docs_count} (平均长度: {sum(d.length for d in self.docs)//self.docs_count if self.docs_count > 0 else 0})")
+        print(f"有效文档数: {self.docs_count} (平均长度: {len(all_words)//self.docs_count if self.docs_count > 0 else 0})")
         return self.docs_count > 0  # 返回是否有有效数据
 
 class LDAModel:
-    def __init__(self, dpre, K=10, alpha=0.1, beta=0.01, iterations=1000, topN=20):
+    def __init__(self, dpre, K=10, alpha=0.1, beta=0.01, iterations=1000, topN=20, holdout=0.0):
+        """holdout: 随机留出该比例的词不参与采样，用于计算留出困惑度（文档补全评估）"""
         self.dpre = dpre
         self.K = K
         self.alpha = alpha
@@ -122,92 +165,156 @@ class LDAModel:
         self.topN = topN
         self.rng = np.random.default_rng(42)
         
-        # 稀疏矩阵存储
-        self.nw = np.zeros((dpre.words_count, K), dtype=np.int32)
-        self.nd = np.zeros((dpre.docs_count, K), dtype=np.int32)
-        self.nwsum = np.zeros(K, dtype=np.int32)
-        self.ndsum = np.zeros(dpre.docs_count, dtype=np.int32)
-        self.Z = []
-
-        # 初始化主题分配
+        # 语料展平为连续数组：tokens[i] 为第 i 个词，doc_ids[i] 为其所在文档
+        self.tokens, self.doc_ids, self.offsets = flatten_docs(dpre.docs)
+        self.heldout_tokens = self.tokens[:0]
+        self.heldout_doc_ids = self.doc_ids[:0]
+        if holdout > 0:
+            mask = self.rng.random(len(self.tokens)) < holdout
+            self.heldout_tokens, self.heldout_doc_ids = self.tokens[mask], self.doc_ids[mask]
+            self.tokens, self.doc_ids = self.tokens[~mask], self.doc_ids[~mask]
+            self.offsets = np.zeros(dpre.docs_count + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.doc_ids, minlength=dpre.docs_count), out=self.offsets[1:])
+        self.monitor = None
+        self.checkpoint_path = None
+        self.checkpoint_every = 0
+        self.iteration = 0  # 已完成的迭代次数，从检查点恢复时继续计数
+
+        # 初始化主题分配（随机均匀），计数矩阵向量化构造
         print(f"初始化主题分配 [主题数={K}]...")
-        for m, doc in enumerate(dpre.docs):
-            z_current = []
-            for w in doc.words:
-                topic = self.rng.integers(0, K)
-                z_current.append(topic)
-                self.nw[w, topic] += 1
-                self.nd[m, topic] += 1
-                self.nwsum[topic] += 1
-            self.ndsum[m] = doc.length
-            self.Z.append(z_current)
-
-        self.theta = np.zeros((dpre.docs_count, K))
-        self.phi = np.zeros((K, dpre.words_count))
-
-    def train(self):
-        print(f"开始LDA训练 [主题数={self.K}, 迭代={self.iterations}]...")
+        self.set_assignments(self.rng.integers(0, K, size=len(self.tokens), dtype=np.int32))
+        self.phi = None
+
+    def set_assignments(self, z):
+        """设置主题分配并重建计数矩阵；z 按主题数存为 uint8/uint16"""
+        self.z = np.ascontiguousarray(z, dtype=topic_dtype(self.K))
+        self.nw, self.nd, self.nwsum, self.ndsum = init_counts(
+            self.tokens, self.doc_ids, self.z, self.dpre.words_count, self.dpre.docs_count, self.K)
+
+    @property
+    def Z(self):
+        """Z[m] 是 z 中第 m 篇文档的视图，修改会直接反映到 z"""
+        return Segments(self.z, self.offsets)
+
+    def train(self, engine=None, workers=1, monitor=None, checkpoint_path=None, checkpoint_every=50):
+        """坍缩 Gibbs 采样训练，iterations 为最大迭代次数
+
+        engine: 'numba'（默认，需安装 numba）/ 'numpy' 为展平数组上的快速采样内核，
+        'sparse' 为 SparseLDA 分桶采样（主题数较多时默认使用），
+        'loop' 为原始的逐词循环 + rng.choice 实现（用于对照测试）。
+        workers > 1 时把文档分片到多个进程做 AD-LDA 近似分布式采样（见 lda_distributed）。
+        monitor: lda_metrics.TrainingMonitor，定期计算似然/困惑度、写指标文件并判断提前停止。
+        checkpoint_path: 每 checkpoint_every 轮及训练结束时保存检查点（见 lda_checkpoint），
+        进程中断后可用 load_checkpoint 恢复并继续 train，从第 self.iteration 轮接着迭代。
+        """
+        self.monitor = monitor
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        if engine == 'loop' and len(self.heldout_tokens):
+            raise ValueError("逐词循环实现不支持留出词")
+        if workers > 1:
+            from lda_distributed import train_distributed
+            return train_distributed(self, workers, engine)
+        engine = engine or default_engine(self.K)
+        print(f"开始LDA训练 [主题数={self.K}, 迭代={self.iterations}, 采样器={engine}]...")
         start_time = time.time()
         
-        for it in range(self.iterations):
-            for m in range(self.dpre.docs_count):
-                doc = self.dpre.docs[m]
-                for n in range(doc.length):
-                    w = doc.words[n]
-                    topic = self.Z[m][n]
-                    
-                    # 移除当前词计数
-                    self.nw[w, topic] -= 1
-                    self.nd[m, topic] -= 1
-                    self.nwsum[topic] -= 1
-                    
-                    # 计算主题概率分布
-                    p_topic = (self.nw[w, :] + self.beta) * (self.nd[m, :] + self.alpha)
-                    p_topic /= (self.nwsum + self.dpre.words_count * self.beta) * (self.ndsum[m] + self.K * self.alpha)
-                    
-                    # 归一化并采样新主题
-                    p_topic /= np.sum(p_topic)
-                    new_topic = self.rng.choice(self.K, p=p_topic)
-                    
-                    # 更新计数
-                    self.Z[m][n] = new_topic
-                    self.nw[w, new_topic] += 1
-                    self.nd[m, new_topic] += 1
-                    self.nwsum[new_topic] += 1
-
-            if (it + 1) % 50 == 0 or it == 0:
-                elapsed = time.time() - start_time
-                print(f"迭代 {it+1}/{self.iterations} | 用时: {elapsed:.1f}s | 主题分布熵: {self.topic_entropy():.3f}")
+        for it in range(self.iteration, self.iterations):
+            if engine == 'loop':
+                self._sweep_loop()
+            else:
+                gibbs_sweep(self.tokens, self.doc_ids, self.z, self.nw, self.nd, self.nwsum,
+                            self.alpha, self.beta, self.dpre.words_count, self.rng, engine)
+            if self._report(it, start_time):
+                break
 
         self.compute_theta_phi()
+        self.save_checkpoint()
         print(f"训练完成! 总用时: {time.time()-start_time:.1f}秒")
 
+    def _sweep_loop(self):
+        """原始实现：逐词计算条件分布并用 rng.choice 采样"""
+        Z = self.Z
+        for m in range(self.dpre.docs_count):
+            doc = self.dpre.docs[m]
+            for n in range(doc.length):
+                w = doc.words[n]
+                topic = Z[m][n]
+                
+                # 移除当前词计数
+                self.nw[w, topic] -= 1
+                self.nd[m, topic] -= 1
+                self.nwsum[topic] -= 1
+                
+                # 计算主题概率分布
+                p_topic = (self.nw[w, :] + self.beta) * (self.nd[m, :] + self.alpha)
+                p_topic /= (self.nwsum + self.dpre.words_count * self.beta) * (self.ndsum[m] + self.K * self.alpha)
+                
+                # 归一化并采样新主题
+                p_topic /= np.sum(p_topic)
+                new_topic = self.rng.choice(self.K, p=p_topic)
+                
+                # 更新计数
+                Z[m][n] = new_topic
+                self.nw[w, new_topic] += 1
+                self.nd[m, new_topic] += 1
+                self.nwsum[new_topic] += 1
+
+    def _report(self, it, start_time):
+        """第 it 轮结束：打印进度、按间隔保存检查点；配置了 monitor 时按间隔评估，返回是否提前停止"""
+        self.iteration = it + 1
+        elapsed = time.time() - start_time
+        if (it + 1) % 50 == 0 or it == 0:
+            print(f"迭代 {it+1}/{self.iterations} | 用时: {elapsed:.1f}s | 主题分布熵: {self.topic_entropy():.3f}")
+        if self.checkpoint_every and (it + 1) % self.checkpoint_every == 0:
+            self.save_checkpoint()
+        if self.monitor is not None and self.monitor.step(self, it, elapsed):
+            print(f"已收敛，第 {it+1} 轮提前停止")
+            # 迭代预算收缩到当前轮，之后保存的检查点记为训练已完成
+            self.iterations = self.iteration
+            return True
+        return False
+
+    def save_checkpoint(self, path=None):
+        path = path or self.checkpoint_path
+        if path:
+            from lda_checkpoint import save_checkpoint
+            save_checkpoint(self, path)
+
     def topic_entropy(self):
         """计算主题分布熵以监控收敛"""
         topic_dist = self.nwsum / np.sum(self.nwsum)
         return -np.sum(topic_dist * np.log(topic_dist + 1e-9))
 
     def compute_theta_phi(self):
-        """计算文档-主题和主题-词分布"""
-        self.theta = (self.nd + self.alpha) / (self.ndsum[:, None] + self.K * self.alpha)
+        """计算主题-词分布；文档-主题分布 theta 在访问时由 nd 计算，不常驻内存"""
         self.phi = (self.nw.T + self.beta) / (self.nwsum[:, None] + self.dpre.words_count * self.beta)
 
-    def save_results(self, output_dir):
+    @property
+    def theta(self):
+        """稠密的文档-主题分布（文档数 × K，float64），每次访问重新计算"""
+        return (self.nd + self.alpha) / (self.ndsum[:, None] + self.K * self.alpha)
+
+    def doc_topics_topk(self, k=3):
+        """每篇文档概率最高的 k 个主题，见 lda_results.topk_doc_topics"""
+        from lda_results import topk_doc_topics
+        return topk_doc_topics(self.nd, self.ndsum, self.alpha, k)
+
+    def save_results(self, output_dir, topk=3, dense_theta=False):
+        """保存结果目录（格式见 lda_results）：文档主题只保留前 topk 个，dense_theta 为 True 时另存完整 theta.npy"""
+        from lda_results import save_results, save_dense_theta
         os.makedirs(output_dir, exist_ok=True)
         print(f"保存结果到: {output_dir}")
         
-        # 1. 主题关键词
-        with open(os.path.join(output_dir, "topics_keywords.txt"), "w", encoding="utf-8") as f:
-            for k in range(self.K):
-                top_indices = np.argsort(self.phi[k])[::-1][:self.topN]
-                top_words = [(self.dpre.id2word[i], self.phi[k, i]) for i in top_indices]
-                f.write(f"主题#{k} (权重: {self.nwsum[k]/np.sum(self.nwsum):.3f}):\n")
-                for word, prob in top_words:
-                    f.write(f"  {word}: {prob:.4f}\n")
-                f.write("\n")
+        # 1. 主题关键词、主题-词矩阵、词表与文档主题分布（二进制，可内存映射读取）
+        id2word = [self.dpre.id2word[i] for i in range(self.dpre.words_count)]
+        meta = {'alpha': self.alpha, 'beta': self.beta, 'iterations': self.iteration}
+        save_results(output_dir, self.phi, id2word, self.nwsum / np.sum(self.nwsum),
+                     self.doc_topics_topk(topk), meta, self.topN)
         
-        # 2. 文档主题分布
-        np.savetxt(os.path.join(output_dir, "doc_topics.csv"), self.theta, delimiter=",")
+        # 2. 完整的文档主题分布（可选，按块写入）
+        if dense_theta:
+            save_dense_theta(os.path.join(output_dir, "theta.npy"), self.nd, self.ndsum, self.alpha)
         
         # 3. 主题可视化 (TSNE降维)
         try:
@@ -227,13 +334,19 @@ class LDAModel:
         except ImportError:
             print("警告: 缺少sklearn/matplotlib, 跳过可视化")
         
-        # 4. 主题-词矩阵 (稀疏存储)
-        np.savez_compressed(os.path.join(output_dir, "topic_word_matrix.npz"), data=self.phi)
-        
         print(f"结果保存完成! 包含: 主题关键词/文档分布/可视化")
 
-def process_table(table_name, output_base_dir, K=10, iterations=500):
-    """处理单个评论表的函数"""
+def process_table(table_name, output_base_dir, K=10, iterations=500, workers=1,
+                  eval_every=10, holdout=0.0, warm=True):
+    """处理单个评论表的函数（workers > 1 时表内 AD-LDA 多进程训练）
+
+    每 eval_every 轮计算对数似然和困惑度，写入 metrics.csv；对数似然连续几次不再上升时提前停止。
+    holdout > 0 时随机留出该比例的词计算留出困惑度并据此提前停止，但留出词不参与最终模型
+    （phi、文档主题分布只来自其余的词），仅用于评估，默认关闭。
+    训练状态定期保存到 checkpoint.npz；warm 为 True 且检查点已存在、K 与超参数相同时，
+    语料未变则从中断处继续（已训练完成则直接沿用），有新评论则沿用旧文档的主题分配热启动；
+    K 或超参数改变时忽略检查点重新训练。
+    """
     print(f"\n{'='*60}")
     print(f"处理表: {table_name}")
     print(f"{'='*60}")
@@ -251,15 +364,25 @@ def process_table(table_name, output_base_dir, K=10, iterations=500):
             print(f"表 {table_name} 无有效数据，跳过")
             return
         
-        # 自动调整迭代次数
+        # 最大迭代次数，实际在收敛后提前停止
         actual_iter = max(100, min(iterations, 1000))  # 确保在合理范围内
-        if dpre.docs_count > 10000:
-            actual_iter = 300
         
         # 训练LDA模型
-        lda = LDAModel(dpre, K=K, alpha=0.1, beta=0.01, 
-                      iterations=actual_iter, topN=15)
-        lda.train()
+        checkpoint_path = os.path.join(output_dir, "checkpoint.npz")
+        lda = None
+        if warm and os.path.exists(checkpoint_path):
+            from lda_checkpoint import restore
+            lda = restore(checkpoint_path, dpre, actual_iter, K, 0.1, 0.01, holdout=holdout, topN=15)
+        if lda is None:
+            lda = LDAModel(dpre, K=K, alpha=0.1, beta=0.01, 
+                          iterations=actual_iter, topN=15, holdout=holdout)
+        if lda.iteration < lda.iterations:
+            metric = 'heldout_perplexity' if holdout > 0 else 'log_likelihood'
+            monitor = TrainingMonitor(eval_every, EarlyStopping(metric),
+                                      os.path.join(output_dir, "metrics.csv"), lda.iteration)
+            lda.train(workers=workers, monitor=monitor, checkpoint_path=checkpoint_path)
+        else:
+            lda.compute_theta_phi()
         lda.save_results(output_dir)
         
         print(f"{table_name} 处理完成! 结果保存在: {output_dir}")
@@ -271,6 +394,9 @@ if __name__ == "__main__":
     OUTPUT_BASE_DIR = "/workspace/step5_LDA/results"
     N_TOPICS = 15
     N_ITER = 500
+    # 单表训练进程数：> 1 时各表依次处理、每张表的文档分片到多个进程（AD-LDA），
+    # 适合少数大表；为 1 时按表并行
+    N_WORKERS = 1
     
     # 获取所有评论表
     try:
@@ -290,6 +416,11 @@ if __name__ == "__main__":
         print("未找到评论表，退出程序")
         exit(1)
     
+    if N_WORKERS > 1:
+        for table in comment_tables:
+            process_table(table, OUTPUT_BASE_DIR, N_TOPICS, N_ITER, N_WORKERS)
+        exit(0)
+
     # 创建进程池并行处理
     pool = mp.Pool(processes=min(mp.cpu_count(), len(comment_tables)))
     